@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for Marketplace Token Leak Hunter.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
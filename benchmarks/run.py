@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+run.py - Scanner benchmark harness with a regression gate.
+
+Generates a synthetic corpus, then times scan_path over the directory,
+scan_file over the in-memory contents, every rule on its own and the
+report writers. Throughput is printed as files/sec and MB/sec.
+
+Timings are divided by a fixed calibration workload measured on the
+same machine, so the stored baseline compares across hosts of different
+speed. With --check, any gated benchmark slower than baseline * (1 +
+tolerance) fails the run with exit code 1.
+
+Usage:
+    python -m benchmarks.run                     # report only
+    python -m benchmarks.run --check             # fail on regressions
+    python -m benchmarks.run --update-baseline   # record a new baseline
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Add repository root to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.corpus import (  # noqa: E402
+    DEFAULT_CONFIG,
+    corpus_config,
+    generate_corpus,
+)
+from src.engine import RuleSet  # noqa: E402
+from src.report import (  # noqa: E402
+    CsvReportSink,
+    JsonLinesSink,
+    JsonReportSink,
+    write_findings,
+)
+from src.rules import Allowlist, get_rules  # noqa: E402
+from src.scan_repo import scan_file, scan_path  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Allowed slowdown over the baseline before --check fails (0.5 = 50%)
+DEFAULT_TOLERANCE = 0.5
+
+# Benchmarks compared against the baseline; per-rule costs are reported only
+GATED = ["scan_path", "scan_file", "report_writers"]
+
+# Synthetic findings pushed through the report writers
+REPORT_FINDINGS = 20000
+
+
+def best_of(func: Callable[[], Any], repeat: int) -> float:
+    """Return the fastest of repeat wall-clock runs of func, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate(repeat: int) -> float:
+    """
+    Time a fixed regex and string workload that stands in for machine speed.
+
+    Returns:
+        Seconds for one calibration run (best of repeat)
+    """
+    text = "const value = config.token || 'FAKE_abcdefghijklmnop';\n" * 20000
+    pattern = re.compile(r"[A-Za-z0-9_]{16,}")
+
+    def workload():
+        pattern.findall(text)
+        sum(len(line) for line in text.split("\n"))
+        json.dumps([{"line": i, "value": str(i)} for i in range(20000)])
+
+    return best_of(workload, repeat)
+
+
+def _load_corpus(root: str, files: List[str]) -> List[Any]:
+    contents = []
+    for rel_path in files:
+        with open(os.path.join(root, rel_path), "r", encoding="utf-8") as f:
+            contents.append((rel_path, f.read()))
+    return contents
+
+
+def _report_findings(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "path": f"src/pkg_{i // 100}/file_{i:05d}.ts",
+            "line": i % 500 + 1,
+            "rule_id": "gh_token_ghp",
+            "desc": "GitHub personal access token",
+            "match": "ghp_***REDACTED***FAKE",
+            "score": 95 if i % 3 else 60,
+            "snippet": f'  GH_TOKEN="ghp_FAKE{i:032d}"',
+        }
+        for i in range(count)
+    ]
+
+
+def run_benchmarks(
+    config: Dict[str, Any], repeat: int = 3, report_findings: int = REPORT_FINDINGS
+) -> Dict[str, Any]:
+    """
+    Generate the corpus and run every benchmark.
+
+    Args:
+        config: Corpus parameters overriding DEFAULT_CONFIG
+        repeat: Runs per benchmark; the fastest one counts
+        report_findings: Synthetic findings written by the report benchmark
+
+    Returns:
+        Results with the corpus config, calibration time and, per benchmark,
+        seconds, throughput and cost relative to the calibration
+    """
+    config = corpus_config(config)
+    results: Dict[str, Any] = {"config": config, "benchmarks": {}, "rules": {}}
+    results["calibration_seconds"] = calibrate(repeat)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        corpus_dir = os.path.join(tmpdir, "corpus")
+        files = generate_corpus(corpus_dir, config)
+        contents = _load_corpus(corpus_dir, files)
+        total_mb = sum(len(text.encode("utf-8")) for _, text in contents) / 1e6
+        rules = RuleSet(get_rules())
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+
+        def record(name: str, seconds: float, count: int, mb: float) -> None:
+            # Recalibrate next to each benchmark so CPU frequency and noisy
+            # neighbours affect both sides of the ratio alike
+            calibration = calibrate(repeat)
+            results["benchmarks"][name] = {
+                "seconds": seconds,
+                "items_per_sec": count / seconds,
+                "mb_per_sec": mb / seconds,
+                "cost": seconds / calibration,
+            }
+
+        seconds = best_of(lambda: scan_path(corpus_dir, allowlist), repeat)
+        record("scan_path", seconds, len(files), total_mb)
+
+        def scan_contents():
+            for rel_path, text in contents:
+                scan_file(rel_path, text, rules, allowlist)
+
+        record("scan_file", best_of(scan_contents, repeat), len(files), total_mb)
+
+        for rule in rules.rules:
+            single = RuleSet([rule])
+
+            def run_rule():
+                for _, text in contents:
+                    for _match in single.iter_matches(text):
+                        pass
+
+            seconds = best_of(run_rule, repeat)
+            results["rules"][rule["id"]] = {
+                "seconds": seconds,
+                "ms_per_mb": 1000 * seconds / total_mb,
+            }
+
+        findings = _report_findings(report_findings)
+        out_dir = os.path.join(tmpdir, "reports")
+        os.makedirs(out_dir)
+
+        def write_reports():
+            write_findings(
+                findings,
+                [
+                    JsonReportSink(os.path.join(out_dir, "report.json")),
+                    CsvReportSink(os.path.join(out_dir, "report.csv")),
+                    JsonLinesSink(os.path.join(out_dir, "report.jsonl")),
+                ],
+            )
+
+        # Report writers announce each file on stdout; keep the table readable
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            seconds = best_of(write_reports, repeat)
+        report_mb = sum(
+            os.path.getsize(os.path.join(out_dir, name)) for name in os.listdir(out_dir)
+        )
+        record("report_writers", seconds, len(findings), report_mb / 1e6)
+
+    return results
+
+
+def check_regressions(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """
+    Compare relative costs with the baseline.
+
+    Args:
+        results: Output of run_benchmarks
+        baseline: Previously stored results
+        tolerance: Allowed slowdown as a fraction of the baseline cost
+
+    Returns:
+        One message per gated benchmark that regressed
+    """
+    regressions = []
+    for name in GATED:
+        expected = baseline["benchmarks"].get(name)
+        if expected is None:
+            continue
+        cost = results["benchmarks"][name]["cost"]
+        limit = expected["cost"] * (1 + tolerance)
+        if cost > limit:
+            regressions.append(
+                f"{name}: cost {cost:.2f} exceeds baseline {expected['cost']:.2f} "
+                f"by more than {tolerance:.0%}"
+            )
+    return regressions
+
+
+def print_results(results: Dict[str, Any], baseline: Dict[str, Any] = None) -> None:
+    """Print the benchmark table and the costliest rules."""
+    config = results["config"]
+    print(
+        f"Corpus: {config['files']} files of ~{config['file_size'] // 1024} KB, "
+        f"{config['minified']} minified, {config['lockfiles']} lockfiles, "
+        f"{config['long_lines']} long-line logs (seed {config['seed']})"
+    )
+    print(f"Calibration: {results['calibration_seconds'] * 1000:.1f} ms\n")
+
+    print(
+        f"{'benchmark':<16}{'seconds':>10}{'items/s':>12}{'MB/s':>10}{'cost':>8}{'baseline':>10}"
+    )
+    for name, bench in results["benchmarks"].items():
+        expected = ""
+        if baseline and name in baseline.get("benchmarks", {}):
+            expected = f"{baseline['benchmarks'][name]['cost']:.2f}"
+        print(
+            f"{name:<16}{bench['seconds']:>10.3f}{bench['items_per_sec']:>12.0f}"
+            f"{bench['mb_per_sec']:>10.2f}{bench['cost']:>8.2f}{expected:>10}"
+        )
+
+    print("\nPer-rule cost (ms per MB of corpus):")
+    ranked = sorted(results["rules"].items(), key=lambda item: -item[1]["ms_per_mb"])
+    for rule_id, cost in ranked:
+        print(f"  {rule_id:<24}{cost['ms_per_mb']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the token leak scanner.")
+    for key, default in DEFAULT_CONFIG.items():
+        parser.add_argument(
+            f"--{key.replace('_', '-')}",
+            type=type(default),
+            default=default,
+            help=f"Corpus parameter (default: {default})",
+        )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per benchmark (default: 3)"
+    )
+    parser.add_argument(
+        "--baseline", default=BASELINE_PATH, help="Baseline results file"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="Exit 1 if a gated benchmark regressed"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed slowdown over the baseline (default: 0.5 = 50%%)",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write the results as the new baseline",
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+
+    args = parser.parse_args()
+    config = {key: getattr(args, key) for key in DEFAULT_CONFIG}
+
+    results = run_benchmarks(config, args.repeat)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if args.check:
+        if baseline is None:
+            print(f"Error: Baseline {args.baseline} not found.", file=sys.stderr)
+            sys.exit(3)
+        if baseline["config"] != results["config"]:
+            print(
+                "Error: Corpus parameters differ from the baseline; rerun with the "
+                "baseline's parameters or --update-baseline.",
+                file=sys.stderr,
+            )
+            sys.exit(3)
+
+        regressions = check_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("\n⛔ Performance regression:", file=sys.stderr)
+            for message in regressions:
+                print(f"  - {message}", file=sys.stderr)
+            sys.exit(1)
+        print("\n✓ No performance regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -46,6 +46,7 @@ setup(
     python_requires=">=3.11",
     install_requires=requirements,
     extras_require={
+        "yaml": ["pyyaml>=6.0"],
         "dev": [
             "pytest>=7.4.0",
             "pytest-cov>=4.1.0",
@@ -0,0 +1,115 @@
+"""
+archive.py - Streaming readers for packaged marketplace artifacts.
+
+Yields the members of .vsix/.zip and .tar/.tgz packages as readers over
+the decompression stream, descending into nested archives up to a depth
+limit. Nothing is extracted to disk: tar members are read in one pass,
+and only a nested zip (which needs random access) is buffered in memory.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import io
+import sys
+import tarfile
+import zipfile
+import zlib
+from typing import BinaryIO, Iterator, Tuple
+
+from src.utils import BINARY_SNIFF_SIZE, DEFAULT_ARCHIVE_DEPTH, archive_kind
+
+# Separates an archive's path from a member path in reported locations
+MEMBER_SEPARATOR = "!"
+
+# Errors of a corrupt, truncated or unsupported archive or member
+ARCHIVE_ERRORS = (
+    zipfile.BadZipFile,
+    zipfile.LargeZipFile,
+    tarfile.TarError,
+    EOFError,
+    OSError,
+    zlib.error,
+    NotImplementedError,
+)
+
+
+def iter_archive_members(
+    archive_path: str,
+    f: BinaryIO,
+    depth: int = DEFAULT_ARCHIVE_DEPTH,
+    buffer_limit: int = 16 * 1024 * 1024,
+) -> Iterator[Tuple[str, int, BinaryIO]]:
+    """
+    Stream the regular file members of an archive.
+
+    Members that are archives themselves are opened in turn while depth
+    allows, and their members reported as 'outer!inner!file'. A corrupt
+    archive ends its own listing with a warning; members already yielded
+    and the enclosing archive are unaffected.
+
+    Args:
+        archive_path: Path of the archive, prefixed to member paths
+        f: Binary stream of the archive (must be seekable for zip files)
+        depth: Archive levels to open, including this one
+        buffer_limit: Largest nested zip read into memory, in bytes
+
+    Yields:
+        (archive_path!member_path, size, reader) for each file; a reader is
+        only valid until the next item is requested
+    """
+    kind = archive_kind(archive_path)
+    try:
+        if kind == "zip":
+            members = _iter_zip(f)
+        elif kind == "tar":
+            members = _iter_tar(f)
+        else:
+            return
+
+        for name, size, reader in members:
+            member_path = archive_path + MEMBER_SEPARATOR + name
+            nested = archive_kind(name) if depth > 1 else None
+            if nested is None:
+                yield member_path, size, reader
+                continue
+
+            if nested == "zip":
+                if size > buffer_limit:
+                    print(
+                        f"Warning: Skipping nested archive {member_path} "
+                        f"({size} bytes, over the in-memory limit)",
+                        file=sys.stderr,
+                    )
+                    continue
+                reader = io.BytesIO(reader.read())
+            yield from iter_archive_members(
+                member_path, reader, depth - 1, buffer_limit
+            )
+    except ARCHIVE_ERRORS as e:
+        print(f"Warning: Could not read archive {archive_path}: {e}", file=sys.stderr)
+
+
+def _iter_zip(f: BinaryIO) -> Iterator[Tuple[str, int, BinaryIO]]:
+    with zipfile.ZipFile(f) as archive:
+        for info in archive.infolist():
+            # Directories and encrypted members have no scannable content
+            if info.is_dir() or info.flag_bits & 0x1:
+                continue
+            # ZipExtFile.peek returns at most 512 bytes; a buffered reader
+            # shows the binary, encoding and minified checks a full head
+            with archive.open(info) as member:
+                reader = io.BufferedReader(member, BINARY_SNIFF_SIZE)
+                yield info.filename, info.file_size, reader
+
+
+def _iter_tar(f: BinaryIO) -> Iterator[Tuple[str, int, BinaryIO]]:
+    # Stream mode reads the (possibly compressed) archive front to back once
+    with tarfile.open(fileobj=f, mode="r|*") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            reader = archive.extractfile(member)
+            if reader is not None:
+                name = member.name[2:] if member.name.startswith("./") else member.name
+                yield name, member.size, reader
@@ -0,0 +1,168 @@
+"""
+batch.py - Target enumeration and checkpoints for batch scans.
+
+Lists the repositories of a GitHub organization (or user) or reads them
+from a file, and records finished targets in an append-only checkpoint
+so an interrupted sweep resumes where it stopped.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from typing import Dict, List, Sequence, Union
+
+CHECKPOINT_FILENAME = "checkpoint.jsonl"
+
+
+def list_org_repos(org: str, github_token: Union[str, Sequence[str]]) -> List[str]:
+    """
+    List every repository of an organization, or of a user account.
+
+    Args:
+        org: Organization or user login
+        github_token: GitHub API token, or a pool of tokens
+
+    Returns:
+        Repository full names ('owner/name') in API order
+
+    Raises:
+        SystemExit on API errors
+    """
+    import requests
+
+    from src.remote import GITHUB_API, create_session
+
+    session = create_session(github_token)
+    repos: List[str] = []
+
+    try:
+        for kind in ("orgs", "users"):
+            page = 1
+            while True:
+                resp = session.get(
+                    f"{GITHUB_API}/{kind}/{org}/repos",
+                    params={"per_page": 100, "page": page, "type": "all"},
+                    timeout=30,
+                )
+                if resp.status_code == 404 and kind == "orgs" and page == 1:
+                    break
+                resp.raise_for_status()
+
+                items = resp.json()
+                if not items:
+                    return repos
+                repos.extend(item["full_name"] for item in items)
+                page += 1
+    except requests.exceptions.RequestException as e:
+        print(f"Error listing repositories of {org}: {e}", file=sys.stderr)
+        sys.exit(3)
+    finally:
+        session.close()
+
+    return repos
+
+
+def read_targets_file(path: str) -> List[str]:
+    """
+    Read scan targets, one per line.
+
+    Each line is a local directory or an 'owner/name' repository. Blank
+    lines and lines starting with '#' are ignored; duplicates are dropped.
+
+    Args:
+        path: Path to the targets file
+
+    Returns:
+        Targets in file order
+
+    Raises:
+        SystemExit if the file cannot be read
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+    except (IOError, OSError) as e:
+        print(f"Error reading repos file {path}: {e}", file=sys.stderr)
+        sys.exit(3)
+
+    targets = [line for line in lines if line and not line.startswith("#")]
+    return list(dict.fromkeys(targets))
+
+
+def report_name(target: str) -> str:
+    """
+    Derive a unique report file stem from a target.
+
+    The readable part loses leading dots and slashes, so a short hash of
+    the normalized target keeps distinct targets (../x and x, or owner/name
+    and a local owner__name) from sharing a report, while ./x and x, the
+    same directory, still do.
+
+    Examples:
+        owner/name -> owner__name-<hash>
+        ./extensions/my-ext -> extensions__my-ext-<hash>
+    """
+    normalized = os.path.normpath(target).replace(os.sep, "/")
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:8]
+    name = normalized.strip("./").replace("/", "__")
+    return (re.sub(r"[^A-Za-z0-9._-]+", "_", name) or "root") + "-" + digest
+
+
+class Checkpoint:
+    """
+    Append-only record of finished batch targets.
+
+    Each finished target is one JSON line, flushed and synced as soon as
+    it is recorded, so a crash or interrupt loses at most the targets that
+    were still running. Targets that failed are not recorded and are
+    retried on the next run.
+    """
+
+    def __init__(self, out_dir: str):
+        self.path = os.path.join(out_dir, CHECKPOINT_FILENAME)
+        os.makedirs(out_dir, exist_ok=True)
+        self.done = self.load(out_dir)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    @staticmethod
+    def load(out_dir: str) -> Dict[str, Dict]:
+        """
+        Read the finished targets recorded in out_dir.
+
+        Returns:
+            Checkpoint entries by target; empty if there is no checkpoint
+        """
+        done: Dict[str, Dict] = {}
+        path = os.path.join(out_dir, CHECKPOINT_FILENAME)
+        if not os.path.exists(path):
+            return done
+
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn final line from an interrupted write
+                    continue
+                done[entry["target"]] = entry
+        return done
+
+    def __contains__(self, target: str) -> bool:
+        return target in self.done
+
+    def record(self, target: str, report: str, findings: int) -> None:
+        """Mark a target finished with its report file and finding count."""
+        entry = {"target": target, "report": report, "findings": findings}
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done[target] = entry
+
+    def close(self) -> None:
+        """Close the checkpoint file."""
+        self._file.close()
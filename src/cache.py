@@ -0,0 +1,235 @@
+"""
+cache.py - On-disk result cache for incremental rescans.
+
+Stores per-file scan results in SQLite keyed by the SHA-256 of the file
+content (or a git blob SHA) plus a fingerprint of the rule set and
+allowlist, so unchanged files are not re-matched on the next scan. Also
+keeps ETags of GitHub API responses for conditional remote requests.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, List, Optional, Tuple
+
+from src.engine import RuleSet
+from src.rules import Allowlist
+
+# Bump when the stored record layout or matching semantics change
+CACHE_VERSION = 6
+
+CACHE_FILENAME = "scan-cache.sqlite"
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """Return the cache directory, honouring XDG_CACHE_HOME."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "marketplace-token-leak-hunter")
+
+
+def scan_fingerprint(rules: RuleSet, allowlist: Allowlist) -> str:
+    """
+    Fingerprint everything besides file content that affects scan results.
+
+    Args:
+        rules: Compiled rule set
+        allowlist: Allowlist index
+
+    Returns:
+        Hex digest identifying this rule set and allowlist combination
+    """
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode("utf-8"))
+
+    for rule in rules.rules:
+        pattern = rule["pattern"]
+        parts = [
+            rule["id"],
+            rule["description"],
+            pattern.pattern,
+            str(pattern.flags),
+            str(rule["score"]),
+            str(bool(rule.get("multiline"))),
+            "\x02".join(rule.get("paths") or ()),
+            "\x02".join(rule.get("keywords") or ()),
+        ]
+        digest.update("\x00".join(parts).encode("utf-8") + b"\x01")
+
+    for entry in sorted(allowlist.tokens):
+        digest.update(b"t" + entry.encode("utf-8") + b"\x01")
+    for entry in sorted(allowlist.digests):
+        digest.update(b"d" + entry.encode("utf-8") + b"\x01")
+
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    SQLite-backed cache of per-content scan records.
+
+    Entries are keyed by (scan fingerprint, content digest) and carry their
+    serialized size and last use time, so evict() can trim the database
+    back under max_bytes in least-recently-used order. Writes are batched
+    until flush(); the database runs in WAL mode so pool workers can share
+    it.
+
+    The same database holds the last ETag and body of GitHub API responses
+    by URL, which do not depend on the fingerprint; they count towards
+    max_bytes and are evicted along with the results.
+
+    Records carry finding snippets, so the directory is created private
+    (0700) and the database files are kept readable by their owner only.
+    """
+
+    def __init__(
+        self,
+        fingerprint: str,
+        cache_dir: Optional[str] = None,
+        max_bytes: int = DEFAULT_CACHE_SIZE,
+    ):
+        self.fingerprint = fingerprint
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.path = os.path.join(self.cache_dir, CACHE_FILENAME)
+
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+        # SQLite gives the WAL files the database's mode; fix up older caches
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.chmod(self.path + suffix, 0o600)
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " fingerprint TEXT NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " records TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (fingerprint, digest))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)"
+        )
+        # Superseded by api_responses, which is sized for eviction
+        self._conn.execute("DROP TABLE IF EXISTS responses")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS api_responses ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT NOT NULL,"
+            " body TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, digest: str) -> Optional[List[Any]]:
+        """
+        Look up stored records for a content digest.
+
+        Returns:
+            The records stored by put(), or None on a cache miss
+        """
+        row = self._conn.execute(
+            "SELECT records FROM results WHERE fingerprint = ? AND digest = ?",
+            (self.fingerprint, digest),
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._conn.execute(
+            "UPDATE results SET last_used = ? WHERE fingerprint = ? AND digest = ?",
+            (time.time(), self.fingerprint, digest),
+        )
+        return json.loads(row[0])
+
+    def put(self, digest: str, records: List[Any]) -> None:
+        """Store JSON-serializable records for a content digest."""
+        payload = json.dumps(records, separators=(",", ":"), ensure_ascii=False)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+            (self.fingerprint, digest, payload, len(payload), time.time()),
+        )
+
+    def get_response(self, url: str) -> Optional[Tuple[str, Any]]:
+        """
+        Look up the last stored API response for a URL.
+
+        Returns:
+            (etag, decoded JSON body), or None if the URL was never stored
+        """
+        row = self._conn.execute(
+            "SELECT etag, body FROM api_responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._conn.execute(
+            "UPDATE api_responses SET last_used = ? WHERE url = ?", (time.time(), url)
+        )
+        return row[0], json.loads(row[1])
+
+    def put_response(self, url: str, etag: str, body: Any) -> None:
+        """Store an API response body under its URL and ETag."""
+        payload = json.dumps(body, separators=(",", ":"))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO api_responses VALUES (?, ?, ?, ?, ?)",
+            (url, etag, payload, len(payload), time.time()),
+        )
+
+    def flush(self) -> None:
+        """Commit pending writes."""
+        self._conn.commit()
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache fits max_bytes.
+
+        Results and API responses share the budget and one LRU order.
+
+        Returns:
+            Number of entries removed
+        """
+        self.flush()
+        total = self._conn.execute(
+            "SELECT (SELECT COALESCE(SUM(size), 0) FROM results)"
+            " + (SELECT COALESCE(SUM(size), 0) FROM api_responses)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        rows = self._conn.execute(
+            "SELECT fingerprint, digest, size, last_used FROM results"
+            " UNION ALL SELECT NULL, url, size, last_used FROM api_responses"
+            " ORDER BY last_used"
+        ).fetchall()
+        for fingerprint, key, size, _last_used in rows:
+            if total <= self.max_bytes:
+                break
+            if fingerprint is None:
+                self._conn.execute("DELETE FROM api_responses WHERE url = ?", (key,))
+            else:
+                self._conn.execute(
+                    "DELETE FROM results WHERE fingerprint = ? AND digest = ?",
+                    (fingerprint, key),
+                )
+            total -= size
+            removed += 1
+
+        self._conn.commit()
+        return removed
+
+    def close(self) -> None:
+        """Commit pending writes and close the database."""
+        self._conn.commit()
+        self._conn.close()
@@ -0,0 +1,515 @@
+"""
+daemon.py - Long-running scan server for editors and git hooks.
+
+Keeps the compiled rules, the allowlist and the findings of every file in
+a workspace in memory, polls the workspace for modified files and
+rescans only those. Clients send one JSON request per line over a Unix
+socket (or a loopback TCP port) and get one JSON response per line, with
+findings in the shape scan_file produces. The socket is owner-only; TCP
+requests must carry the token the daemon writes to an owner-only file.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import hmac
+import json
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.cache import default_cache_dir
+from src.engine import RuleSet
+from src.rules import Allowlist
+from src.scan_repo import DEFAULT_MEMORY_LIMIT, scan_file, scan_local_file
+from src.utils import BINARY_SNIFF_SIZE, is_generated_content
+from src.walker import FileWalker
+
+# Seconds between polls of the workspace for modified files
+DEFAULT_WATCH_INTERVAL = 1.0
+
+# Largest request line accepted from a client (buffers are sent inline)
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+# Bind addresses accepted for TCP serving; the API reads workspace files
+LOOPBACK_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+Address = Union[str, Tuple[str, int]]
+
+
+def token_path(port: int, token_dir: Optional[str] = None) -> str:
+    """
+    Return the file holding the access token of a daemon serving on port.
+
+    Args:
+        port: TCP port the daemon serves on
+        token_dir: Directory of token files (defaults to the cache directory)
+    """
+    return os.path.join(token_dir or default_cache_dir(), f"daemon-{port}.token")
+
+
+def _write_token(path: str, token: str) -> None:
+    """Write a token to a file only its owner can read."""
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(path, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+
+
+def parse_address(value: str) -> Address:
+    """
+    Parse a --serve address.
+
+    Args:
+        value: Unix socket path, 'PORT' or 'HOST:PORT' on a loopback host
+
+    Returns:
+        Socket path, or (host, port) for TCP
+
+    Raises:
+        ValueError if a TCP address is not on a loopback host
+    """
+    host, sep, port = value.rpartition(":")
+    if not sep and value.isdigit():
+        return ("127.0.0.1", int(value))
+    if sep and port.isdigit() and "/" not in value:
+        host = host.strip("[]")
+        if host not in LOOPBACK_HOSTS:
+            raise ValueError(f"refusing to serve on non-loopback host '{host}'")
+        return (host, int(port))
+    return value
+
+
+def send_request(
+    address: Address,
+    request: Dict[str, Any],
+    timeout: float = 30.0,
+    token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Send one request to a running daemon and wait for its response.
+
+    Args:
+        address: Socket path or (host, port), as returned by parse_address
+        request: Request object, e.g. {"op": "scan", "paths": ["a.js"]}
+        timeout: Seconds to wait for the connection and the response
+        token: Access token for a TCP address (read from token_path when
+            not given)
+
+    Returns:
+        Decoded response object
+
+    Raises:
+        OSError if a TCP token is needed and its file cannot be read
+    """
+    if isinstance(address, str):
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        if token is None:
+            with open(token_path(address[1]), "r", encoding="utf-8") as f:
+                token = f.read().strip()
+        request = {**request, "token": token}
+        conn = socket.socket(
+            socket.AF_INET6 if ":" in address[0] else socket.AF_INET,
+            socket.SOCK_STREAM,
+        )
+    with conn:
+        conn.settimeout(timeout)
+        conn.connect(address)
+        with conn.makefile("rwb") as stream:
+            stream.write(json.dumps(request).encode("utf-8") + b"\n")
+            stream.flush()
+            return json.loads(stream.readline())
+
+
+class ScanDaemon:
+    """
+    In-memory findings index of one workspace.
+
+    Each file is indexed with the (mtime, size) it had when scanned; poll()
+    walks the workspace and rescans only files whose stamp changed. Scans
+    run outside the index lock, so requests are answered while a poll is
+    rescanning. An allowlist edit invalidates the whole index.
+    """
+
+    def __init__(
+        self,
+        root_path: str,
+        rules: RuleSet,
+        allowlist: Allowlist,
+        walker: Optional[FileWalker] = None,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    ):
+        """
+        Args:
+            root_path: Workspace directory to index and watch
+            rules: Compiled rule set, kept warm for the daemon's lifetime
+            allowlist: Allowlist index, reloaded when its file changes
+            walker: File walker with the scan's filters (defaults to FileWalker())
+            memory_limit: Approximate per-file memory bound in bytes
+        """
+        self.root_path = os.path.abspath(root_path)
+        self.rules = rules
+        self.allowlist = allowlist
+        self.walker = walker or FileWalker()
+        self.memory_limit = memory_limit
+        self.polls = 0
+        self.last_poll: Optional[float] = None
+        # rel_path -> ((mtime_ns, size), findings), in walk order
+        self._index: Dict[str, Tuple[Tuple[int, int], List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    def _check_allowlist(self) -> None:
+        if self.allowlist.refresh():
+            with self._lock:
+                self._index.clear()
+
+    def _scan(
+        self, full_path: str, rel_path: str, stat: os.stat_result
+    ) -> List[Dict[str, Any]]:
+        findings = scan_local_file(
+            full_path,
+            rel_path,
+            self.rules,
+            self.allowlist,
+            self.memory_limit,
+            size=stat.st_size,
+        )
+        with self._lock:
+            self._index[rel_path] = ((stat.st_mtime_ns, stat.st_size), findings)
+        return findings
+
+    def poll(self) -> int:
+        """
+        Rescan files added or modified since the last poll; drop deleted ones.
+
+        Returns:
+            Number of files rescanned
+        """
+        self._check_allowlist()
+        with self._lock:
+            previous = dict(self._index)
+
+        walked = []
+        rescanned = 0
+        for full_path, rel_path, stat in self.walker.walk_stat(self.root_path):
+            walked.append(rel_path)
+            entry = previous.get(rel_path)
+            if entry is None or entry[0] != (stat.st_mtime_ns, stat.st_size):
+                self._scan(full_path, rel_path, stat)
+                rescanned += 1
+
+        with self._lock:
+            # Rebuild in walk order, dropping files that disappeared
+            self._index = {
+                rel_path: self._index[rel_path]
+                for rel_path in walked
+                if rel_path in self._index
+            }
+            self.polls += 1
+            self.last_poll = time.time()
+        return rescanned
+
+    def watch(self, stop: threading.Event, interval: float) -> None:
+        """Poll every interval seconds until stop is set."""
+        while not stop.wait(interval):
+            try:
+                self.poll()
+            except Exception as e:  # keep watching after unexpected errors
+                print(f"Warning: Workspace poll failed: {e}", file=sys.stderr)
+
+    def _relative(self, path: str) -> Tuple[str, str]:
+        """Resolve a client path to (full_path, rel_path) inside the workspace."""
+        full_path = os.path.abspath(os.path.join(self.root_path, path))
+        rel_path = os.path.relpath(full_path, self.root_path)
+        if rel_path == os.curdir or rel_path.split(os.sep)[0] == os.pardir:
+            raise ValueError(f"path is outside the workspace: {path}")
+        return full_path, rel_path.replace(os.sep, "/")
+
+    def scan_paths(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """
+        Return findings for workspace files, rescanning any that changed.
+
+        Args:
+            paths: File paths, relative to the workspace or absolute
+
+        Returns:
+            Findings of the files in request order
+        """
+        self._check_allowlist()
+        findings: List[Dict[str, Any]] = []
+        for path in paths:
+            full_path, rel_path = self._relative(path)
+            if not os.path.isfile(full_path):
+                raise ValueError(f"not a file: {path}")
+            try:
+                stat = os.stat(full_path)
+            except OSError as e:
+                raise ValueError(f"cannot read {path}: {e.strerror}") from None
+
+            with self._lock:
+                entry = self._index.get(rel_path)
+            if entry is not None and entry[0] == (stat.st_mtime_ns, stat.st_size):
+                findings.extend(entry[1])
+            else:
+                findings.extend(self._scan(full_path, rel_path, stat))
+        return findings
+
+    def scan_buffer(self, path: str, content: str) -> List[Dict[str, Any]]:
+        """
+        Scan unsaved content as if it were the file at path; nothing is indexed.
+
+        Args:
+            path: Path reported in findings and used for rule scopes
+            content: Buffer content
+
+        Returns:
+            Findings for the buffer
+        """
+        self._check_allowlist()
+        if "\x00" in content[:BINARY_SNIFF_SIZE]:
+            return []
+        head = content[:BINARY_SNIFF_SIZE].encode("utf-8", errors="ignore")
+        return scan_file(
+            path,
+            content,
+            self.rules,
+            self.allowlist,
+            sampled=is_generated_content(path, head, size=len(content)),
+        )
+
+    def findings(self) -> List[Dict[str, Any]]:
+        """Return the indexed findings of the whole workspace in walk order."""
+        with self._lock:
+            return [
+                finding
+                for _stamp, findings in self._index.values()
+                for finding in findings
+            ]
+
+    def status(self) -> Dict[str, Any]:
+        """Return index statistics."""
+        with self._lock:
+            return {
+                "root": self.root_path,
+                "files": len(self._index),
+                "findings": sum(len(entry[1]) for entry in self._index.values()),
+                "polls": self.polls,
+                "last_poll": self.last_poll,
+            }
+
+    def handle(self, request: Any) -> Dict[str, Any]:
+        """
+        Answer one decoded client request.
+
+        Requests are objects with an 'op' of 'ping', 'status', 'findings' or
+        'scan'. A scan carries either 'paths' (workspace files) or 'path'
+        and 'content' (an unsaved buffer).
+
+        Returns:
+            Response object with 'ok', and 'findings' or 'error'
+        """
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "request must be a JSON object"}
+
+        op = request.get("op")
+        try:
+            if op == "ping":
+                return {"ok": True}
+            if op == "status":
+                return {"ok": True, **self.status()}
+            if op == "findings":
+                return {"ok": True, "findings": self.findings()}
+            if op == "scan":
+                if "content" in request:
+                    findings = self.scan_buffer(
+                        str(request.get("path", "<buffer>")), str(request["content"])
+                    )
+                else:
+                    paths = request.get("paths")
+                    if not isinstance(paths, list):
+                        raise ValueError("scan needs 'paths' or 'content'")
+                    findings = self.scan_paths([str(path) for path in paths])
+                return {"ok": True, "findings": findings}
+        except ValueError as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": False, "error": f"unknown op: {op}"}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Reads JSON request lines and writes one JSON response line for each."""
+
+    def handle(self) -> None:
+        daemon: ScanDaemon = self.server.scan_daemon  # type: ignore[attr-defined]
+        token: Optional[str] = getattr(self.server, "token", None)
+        while True:
+            line = self.rfile.readline(MAX_REQUEST_SIZE)
+            if not line:
+                return
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"ok": False, "error": f"invalid JSON: {e}"}
+            else:
+                if token is None or self._authorized(request, token):
+                    response = daemon.handle(request)
+                else:
+                    response = {"ok": False, "error": "invalid or missing token"}
+            try:
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            except OSError:
+                return
+
+    @staticmethod
+    def _authorized(request: Any, token: str) -> bool:
+        """Check a request's token in constant time."""
+        if not isinstance(request, dict):
+            return False
+        given = str(request.get("token", "")).encode("utf-8")
+        return hmac.compare_digest(given, token.encode("utf-8"))
+
+
+if hasattr(socket, "AF_UNIX"):
+
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _TCP6Server(_TCPServer):
+    address_family = socket.AF_INET6
+
+
+def make_server(
+    daemon: ScanDaemon, address: Address, token_dir: Optional[str] = None
+) -> socketserver.BaseServer:
+    """
+    Bind a threaded server for daemon, without starting it.
+
+    A Unix socket is created with owner-only permissions; a stale socket
+    left by a daemon that died is replaced, a live one is an error.
+
+    Any local user can connect to a loopback port, so a TCP server gets a
+    random token (server.token), written to token_path(port, token_dir)
+    readable by its owner only, and refuses requests without it.
+
+    Args:
+        daemon: Index that answers the requests
+        address: Socket path or loopback (host, port)
+        token_dir: Directory for the TCP token file (defaults to the cache
+            directory)
+
+    Raises:
+        OSError if the address is in use or cannot be bound
+    """
+    server: socketserver.BaseServer
+    if isinstance(address, str):
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix sockets are not supported here; serve on a port")
+        if os.path.exists(address):
+            try:
+                send_request(address, {"op": "ping"}, timeout=1.0)
+            except (OSError, ValueError):
+                os.unlink(address)
+            else:
+                raise OSError(f"a daemon is already serving on {address}")
+        # Create the socket owner-only, leaving no window to connect in
+        previous = os.umask(0o077)
+        try:
+            server = _UnixServer(address, _RequestHandler)
+        finally:
+            os.umask(previous)
+        os.chmod(address, 0o600)
+    else:
+        if ":" in address[0]:
+            server = _TCP6Server(address, _RequestHandler)
+        else:
+            server = _TCPServer(address, _RequestHandler)
+        token = secrets.token_urlsafe(32)
+        server.token = token  # type: ignore[attr-defined]
+        server.token_file = token_path(  # type: ignore[attr-defined]
+            server.server_address[1], token_dir
+        )
+        try:
+            _write_token(server.token_file, token)  # type: ignore[attr-defined]
+        except OSError:
+            server.server_close()
+            raise
+
+    server.scan_daemon = daemon  # type: ignore[attr-defined]
+    return server
+
+
+def _interrupt(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def serve(
+    daemon: ScanDaemon,
+    address: Address,
+    watch_interval: float = DEFAULT_WATCH_INTERVAL,
+) -> None:
+    """
+    Index the workspace, then answer requests and watch it until interrupted.
+
+    The address is bound before indexing, so a busy address fails at once
+    and clients connecting early wait for the first index to finish.
+
+    Args:
+        daemon: Workspace index
+        address: Socket path or loopback (host, port)
+        watch_interval: Seconds between polls for modified files
+    """
+    server = make_server(daemon, address)
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        # Stop on SIGTERM as on Ctrl+C, so the socket file is removed
+        signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        started = time.perf_counter()
+        daemon.poll()
+        status = daemon.status()
+        print(
+            f"Indexed {status['files']} file(s) with {status['findings']} "
+            f"finding(s) in {time.perf_counter() - started:.2f}s",
+            file=sys.stderr,
+        )
+
+        watcher = threading.Thread(
+            target=daemon.watch, args=(stop, watch_interval), daemon=True
+        )
+        watcher.start()
+
+        where = address if isinstance(address, str) else f"{address[0]}:{address[1]}"
+        print(
+            f"Serving {daemon.root_path} on {where}; press Ctrl+C to stop",
+            file=sys.stderr,
+        )
+        if hasattr(server, "token_file"):
+            print(f"Access token written to {server.token_file}", file=sys.stderr)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        for path in (address, getattr(server, "token_file", None)):
+            if isinstance(path, str):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
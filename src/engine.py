@@ -0,0 +1,673 @@
+"""
+engine.py - Compiled rule-set matching engine.
+
+Prefilters file content with literal rule keywords so that full regexes
+only run for rules whose anchors actually occur in the text, then runs
+each candidate pattern once over the whole buffer and maps match offsets
+back to line numbers. Minified and generated content can instead be
+sampled: patterns only run in windows around keyword occurrences.
+
+ASCII rule sets are also compiled as bytes patterns and matched against
+raw file bytes, so callers only decode the matches they report. Buffers
+holding non-ASCII bytes are matched as text instead, since bytes patterns
+only treat ASCII as whitespace, word or digit characters.
+
+Rules scoped with 'paths' are dispatched per file: the subset of rules
+that applies to a path is looked up in a table keyed by which scopes its
+file name and directory match, both memoised, so per-file regex work only
+covers rules that can apply.
+
+Patterns, match-length bounds and the combined fallback are all computed
+on first use, and compiled rule sets are cached per process, so startup
+stays cheap however many rules are loaded.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import re
+import time
+from bisect import bisect_left
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Dict,
+    Iterator,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from src.rules import get_rules, pack_signature, path_boost
+from src.walker import IgnorePattern, parse_patterns
+
+if TYPE_CHECKING:
+    from src.profiler import Profiler
+
+# Cap on the match length assumed for patterns with unbounded repeats; used
+# as the chunk overlap when streaming large files
+MAX_MATCH_LENGTH = 4096
+
+# Entries kept in each of the file-name and directory memos of a RuleSet
+MAX_PATH_MEMO = 4096
+
+# Content to match: decoded text, or raw bytes for byte-level matching
+Buffer = Union[str, bytes]
+
+# Escapes with no bytes-pattern equivalent (\uXXXX, \UXXXXXXXX, \N{...})
+_WIDE_ESCAPE = re.compile(r"\\[uUN]")
+
+
+# Leading global inline-flag groups, such as (?i) or (?is)
+_GLOBAL_FLAGS = re.compile(r"\(\?([aiLmsux]+)\)")
+
+# Inline letters of the flags a scoped group can carry
+_FLAG_LETTERS = (
+    (re.ASCII, "a"),
+    (re.IGNORECASE, "i"),
+    (re.MULTILINE, "m"),
+    (re.DOTALL, "s"),
+    (re.VERBOSE, "x"),
+)
+
+
+def _global_flags(pattern: re.Pattern) -> Tuple[str, str]:
+    """Return a pattern's global flags as inline letters, and its bare source."""
+    letters = {letter for flag, letter in _FLAG_LETTERS if pattern.flags & flag}
+    source = pattern.pattern
+    match = _GLOBAL_FLAGS.match(source)
+    while match is not None:
+        letters.update(match.group(1))
+        source = source[match.end() :]
+        match = _GLOBAL_FLAGS.match(source)
+    # Unicode is the default for text; L is only valid for bytes patterns
+    letters -= {"u", "L"}
+    return "".join(sorted(letters)), source
+
+
+def _scoped_pattern(pattern: re.Pattern) -> str:
+    """
+    Return a pattern's source wrapped so it can join an alternation.
+
+    Global inline flags such as a leading (?i) or (?s) are only legal at the
+    start of an expression, so they and the pattern's compile flags are
+    converted into a scoped group.
+    """
+    letters, source = _global_flags(pattern)
+    if "x" in letters:
+        # End a trailing verbose comment before the closing parenthesis
+        source += "\n"
+    return f"(?{letters}:{source})"
+
+
+def ignores_case(pattern: re.Pattern) -> bool:
+    """Check if a pattern matches case-insensitively as a whole."""
+    return "i" in _global_flags(pattern)[0]
+
+
+def byte_pattern(pattern: re.Pattern) -> re.Pattern:
+    """
+    Compile an ASCII pattern for matching raw bytes.
+
+    Whitespace, digit and word classes (and word boundaries) then only see
+    ASCII characters, so iter_matches only uses them on ASCII buffers.
+    """
+    return re.compile(pattern.pattern.encode("ascii"), pattern.flags & ~re.UNICODE)
+
+
+def is_byte_safe(source: str) -> bool:
+    """Check if a pattern or keyword can be matched against raw bytes."""
+    return source.isascii() and _WIDE_ESCAPE.search(source) is None
+
+
+def max_match_length(pattern: re.Pattern) -> int:
+    """
+    Return the longest text a pattern can match, capped at MAX_MATCH_LENGTH.
+
+    Falls back to the cap when the pattern cannot be analysed.
+    """
+    try:
+        from re import _parser
+
+        width = _parser.parse(pattern.pattern, pattern.flags).getwidth()[1]
+    except Exception:
+        return MAX_MATCH_LENGTH
+    return min(width, MAX_MATCH_LENGTH)
+
+
+class PathRules:
+    """
+    The rules that apply to one path, from RuleSet.for_path.
+
+    Holds the positions of the applicable rules in declaration order, the
+    cache-key suffix naming them, and the path's score boost, which is
+    only computed when a finding needs it.
+    """
+
+    __slots__ = ("path", "indices", "scope_key", "_boost")
+
+    def __init__(self, path: str, indices: Tuple[int, ...], scope_key: str):
+        self.path = path
+        self.indices = indices
+        self.scope_key = scope_key
+        self._boost: Optional[int] = None
+
+    @property
+    def boost(self) -> int:
+        """Score boost for findings in this path (see rules.path_boost)."""
+        if self._boost is None:
+            self._boost = path_boost(self.path)
+        return self._boost
+
+
+class RuleSet:
+    """
+    Detection rules compiled for single-pass candidate selection.
+
+    Rules declaring 'keywords' are anchored: they are only evaluated when
+    one of their literal keywords occurs in the text (in any case, for
+    case-insensitive rules, whose keywords are lower-cased and looked up in
+    a lower-cased copy of the text). All remaining rules
+    are gated together by one combined alternation, so a file that matches
+    none of them is rejected with a single regex search.
+
+    In sampled mode only anchored rules run, and only over the stretch of
+    text each keyword occurrence could belong to. Rules with 'paths' only
+    apply to files matching one of those .gitignore-style patterns; see
+    for_path.
+
+    Every method that takes text also accepts raw bytes, when byte_safe:
+    keywords and patterns are then matched in their bytes form and matched
+    text is yielded as bytes.
+    """
+
+    def __init__(self, rules: List[Dict], packs: Sequence[str] = ()):
+        """
+        Args:
+            rules: Detection rules, see get_rules()
+            packs: Rule-pack files the rules were loaded from, so pool
+                workers can rebuild the same set
+        """
+        self.rules = rules
+        self.packs = tuple(packs)
+        self.by_id = {rule["id"]: rule for rule in rules}
+        self._entries: List[
+            Tuple[Dict, Tuple[str, ...], Optional[List[IgnorePattern]]]
+        ] = []
+        self._unanchored = []
+        self._scopes: List[List[IgnorePattern]] = []
+        # Scope number of each scoped rule, by position in _entries
+        self._scoped: List[Tuple[int, int]] = []
+        # Rules whose keywords are matched against lower-cased text
+        self._folded: Set[str] = set()
+
+        for rule in rules:
+            keywords = tuple(rule.get("keywords") or ())
+            if keywords and ignores_case(rule["pattern"]):
+                keywords = tuple(keyword.lower() for keyword in keywords)
+                self._folded.add(rule["id"])
+            scope = parse_patterns(rule["paths"]) if rule.get("paths") else None
+            if scope is not None:
+                self._scoped.append((len(self._entries), len(self._scopes)))
+                self._scopes.append(scope)
+            self._entries.append((rule, keywords, scope))
+            if not keywords:
+                self._unanchored.append(rule)
+
+        # Dispatch table: scope bitmask -> (rule positions, cache-key suffix)
+        self._dispatch: Dict[int, Tuple[Tuple[int, ...], str]] = {}
+        self._name_masks: Dict[str, int] = {}
+        self._dir_masks: Dict[str, int] = {}
+        self._last_path: Optional[PathRules] = None
+        self._all = PathRules("", tuple(range(len(self._entries))), "")
+
+        self._spans: Dict[str, int] = {}
+        self._max_match_length: Optional[int] = None
+        self._fallback: Optional[re.Pattern] = None
+        self._byte_safe: Optional[bool] = None
+        self._byte_entries: Optional[
+            List[Tuple[Dict, Tuple[bytes, ...], Optional[List[IgnorePattern]]]]
+        ] = None
+        self._byte_patterns: Dict[str, re.Pattern] = {}
+        self._byte_fallback: Optional[re.Pattern] = None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def scope_key(self, path: str) -> str:
+        """
+        Return a cache-key suffix naming the path-scoped rules that apply.
+
+        Results for the same content differ between paths only through
+        scoped rules, so the suffix is empty when there are none.
+        """
+        return self.for_path(path).scope_key
+
+    def for_path(self, path: str) -> PathRules:
+        """
+        Return the rules that apply to a path, and its score boost.
+
+        A scope (a rule's 'paths') selects a file through its file name,
+        through one of its parent directories, or through a pattern
+        containing a slash that is matched against the whole path. The
+        first two only depend on the file name and the directory, so they
+        are memoised separately, and the rule subset for each combination
+        of matching scopes is built once. The last path looked up is kept,
+        so the per-chunk lookups of a streamed file are free.
+
+        Args:
+            path: '/'-separated path of the content
+
+        Returns:
+            The applicable rules; all rules when none are scoped
+        """
+        last = self._last_path
+        if last is not None and last.path == path:
+            return last
+
+        mask = 0
+        if self._scopes:
+            directory, _, name = path.rpartition("/")
+            mask = self._name_mask(name) | self._dir_mask(directory)
+            for bit, scope in enumerate(self._scopes):
+                if not mask & 1 << bit and any(
+                    pattern.anchored and pattern.matches(path, False)
+                    for pattern in scope
+                ):
+                    mask |= 1 << bit
+
+        dispatch = self._dispatch.get(mask)
+        if dispatch is None:
+            dispatch = self._dispatch[mask] = self._build_dispatch(mask)
+        rules = self._last_path = PathRules(path, *dispatch)
+        return rules
+
+    def _build_dispatch(self, mask: int) -> Tuple[Tuple[int, ...], str]:
+        """Return the rule positions and scope key for a scope bitmask."""
+        if not self._scopes:
+            return self._all.indices, ""
+        excluded = {index for index, bit in self._scoped if not mask & 1 << bit}
+        indices = tuple(
+            index for index in range(len(self._entries)) if index not in excluded
+        )
+        scope_key = ":" + "".join(
+            "1" if mask & 1 << bit else "0" for bit in range(len(self._scopes))
+        )
+        return indices, scope_key
+
+    def _name_mask(self, name: str) -> int:
+        """Return the scopes selecting a file by its name alone, memoised."""
+        mask = self._name_masks.get(name)
+        if mask is None:
+            mask = 0
+            for bit, scope in enumerate(self._scopes):
+                if any(
+                    not pattern.anchored and pattern.matches(name, False)
+                    for pattern in scope
+                ):
+                    mask |= 1 << bit
+            if len(self._name_masks) >= MAX_PATH_MEMO:
+                self._name_masks.clear()
+            self._name_masks[name] = mask
+        return mask
+
+    def _dir_mask(self, directory: str) -> int:
+        """Return the scopes selecting one of a directory's parents, memoised."""
+        if not directory:
+            return 0
+        mask = self._dir_masks.get(directory)
+        if mask is None:
+            parent, _, _ = directory.rpartition("/")
+            mask = self._dir_mask(parent)
+            for bit, scope in enumerate(self._scopes):
+                if not mask & 1 << bit and any(
+                    pattern.matches(directory, True) for pattern in scope
+                ):
+                    mask |= 1 << bit
+            if len(self._dir_masks) >= MAX_PATH_MEMO:
+                self._dir_masks.clear()
+            self._dir_masks[directory] = mask
+        return mask
+
+    def span(self, rule: Dict) -> int:
+        """Return the longest text a rule can match (see max_match_length)."""
+        span = self._spans.get(rule["id"])
+        if span is None:
+            span = self._spans[rule["id"]] = max_match_length(rule["pattern"])
+        return span
+
+    @property
+    def max_match_length(self) -> int:
+        """Longest text any rule can match, used as the streaming overlap."""
+        if self._max_match_length is None:
+            self._max_match_length = max(
+                (self.span(rule) for rule in self.rules), default=0
+            )
+        return self._max_match_length
+
+    @property
+    def fallback(self) -> Optional[re.Pattern]:
+        """Combined alternation of the rules without keywords."""
+        if self._fallback is None and self._unanchored:
+            self._fallback = re.compile(
+                "|".join(_scoped_pattern(rule["pattern"]) for rule in self._unanchored)
+            )
+        return self._fallback
+
+    @property
+    def byte_safe(self) -> bool:
+        """Whether every pattern and keyword is ASCII, so bytes can be matched."""
+        if self._byte_safe is None:
+            self._byte_safe = all(
+                is_byte_safe(rule["pattern"].pattern)
+                and all(is_byte_safe(keyword) for keyword in keywords)
+                for rule, keywords, _scope in self._entries
+            )
+        return self._byte_safe
+
+    def _entries_for(
+        self, binary: bool
+    ) -> List[Tuple[Dict, Tuple, Optional[List[IgnorePattern]]]]:
+        """Return (rule, keywords, scope) entries with str or bytes keywords."""
+        if not binary:
+            return self._entries
+        if self._byte_entries is None:
+            self._byte_entries = [
+                (rule, tuple(keyword.encode("ascii") for keyword in keywords), scope)
+                for rule, keywords, scope in self._entries
+            ]
+        return self._byte_entries
+
+    def _pattern(self, rule: Dict, binary: bool) -> re.Pattern:
+        """Return a rule's pattern, compiled as bytes for binary content."""
+        if not binary:
+            return rule["pattern"]
+        pattern = self._byte_patterns.get(rule["id"])
+        if pattern is None:
+            pattern = self._byte_patterns[rule["id"]] = byte_pattern(rule["pattern"])
+        return pattern
+
+    def _fallback_for(self, binary: bool) -> Optional[re.Pattern]:
+        """Return the combined fallback, compiled as bytes for binary content."""
+        if not binary:
+            return self.fallback
+        if self._byte_fallback is None and self._unanchored:
+            self._byte_fallback = re.compile(
+                "|".join(
+                    _scoped_pattern(rule["pattern"]) for rule in self._unanchored
+                ).encode("ascii")
+            )
+        return self._byte_fallback
+
+    def candidate_rules(
+        self, text: Buffer, anchored_only: bool = False, path: Optional[str] = None
+    ) -> List[Tuple[Dict, Tuple]]:
+        """
+        Select the rules that can possibly match text.
+
+        Args:
+            text: Content to prefilter, as text or raw bytes
+            anchored_only: Skip rules without keywords (sampled mode)
+            path: '/'-separated path of the content; when given, only the
+                rules for_path selects are considered
+
+        Returns:
+            (rule, keywords) pairs in rule declaration order. Keywords are
+            empty for rules admitted by the combined fallback alternation.
+        """
+        binary = not isinstance(text, str)
+        entries = self._entries_for(binary)
+        selected = self._all if path is None else self.for_path(path)
+        fallback_hit = None
+        folded = None
+        candidates = []
+
+        for index in selected.indices:
+            rule, keywords, _scope = entries[index]
+            if keywords:
+                haystack = text
+                if rule["id"] in self._folded:
+                    if folded is None:
+                        folded = text.lower()
+                    haystack = folded
+                if any(keyword in haystack for keyword in keywords):
+                    candidates.append((rule, keywords))
+                continue
+            if anchored_only:
+                continue
+
+            if fallback_hit is None:
+                fallback_hit = self._fallback_for(binary).search(text) is not None
+            if fallback_hit:
+                candidates.append((rule, keywords))
+
+        return candidates
+
+    def iter_matches(
+        self,
+        text: Buffer,
+        profiler: Optional["Profiler"] = None,
+        sampled: bool = False,
+        path: Optional[str] = None,
+    ) -> Iterator[Tuple[Dict, int, Buffer]]:
+        """
+        Run every candidate rule once across the whole buffer.
+
+        Rules are single-line unless they set 'multiline'. When a single-line
+        rule's match spans a newline, the line it starts on is re-matched on
+        its own, so results are identical to matching line by line.
+
+        With a profiler, each rule's matches are collected eagerly so its
+        wall time and match count can be recorded; without one, matches are
+        yielded lazily and nothing is timed.
+
+        Sampled matching skips the rules without keywords and runs each
+        remaining pattern only in windows around its keyword occurrences,
+        for minified or generated content where a full pass is too costly.
+
+        Args:
+            text: Content to scan, as text or raw bytes
+            profiler: Optional collector of per-rule timings
+            sampled: Match only keyword-anchored windows
+            path: Path of the content, for rules scoped with 'paths'
+
+        Yields:
+            (rule, start offset, matched text) in rule order, then offset
+            order; offsets and matched text are bytes for byte content
+        """
+        if not isinstance(text, str) and not text.isascii():
+            yield from self._decoded_matches(text, profiler, sampled, path)
+            return
+
+        rule_matches = self._sampled_matches if sampled else self._rule_matches
+
+        if profiler is None:
+            for rule, keywords in self.candidate_rules(text, sampled, path):
+                yield from rule_matches(rule, keywords, text)
+            return
+
+        start = time.perf_counter()
+        candidates = self.candidate_rules(text, sampled, path)
+        profiler.add_prefilter(time.perf_counter() - start)
+
+        for rule, keywords in candidates:
+            start = time.perf_counter()
+            matches = list(rule_matches(rule, keywords, text))
+            profiler.add_rule(rule["id"], time.perf_counter() - start, len(matches))
+            yield from matches
+
+    def _decoded_matches(
+        self,
+        text: bytes,
+        profiler: Optional["Profiler"],
+        sampled: bool,
+        path: Optional[str],
+    ) -> Iterator[Tuple[Dict, int, bytes]]:
+        """
+        Match non-ASCII bytes as text and map the results back to bytes.
+
+        Unicode patterns treat characters such as U+00A0 as whitespace and
+        letters like 'é' as word characters, which bytes patterns do not, so
+        this keeps results identical to matching decoded content. Undecodable
+        bytes round-trip through surrogate escapes, keeping offsets exact.
+        """
+        decoded = text.decode("utf-8", errors="surrogateescape")
+        char_pos = byte_pos = 0
+        for rule, offset, matched_text in self.iter_matches(
+            decoded, profiler, sampled, path
+        ):
+            # Offsets ascend within a rule; start over when the next rule begins
+            if offset < char_pos:
+                char_pos = byte_pos = 0
+            byte_pos += len(
+                decoded[char_pos:offset].encode("utf-8", errors="surrogateescape")
+            )
+            char_pos = offset
+            yield rule, byte_pos, matched_text.encode("utf-8", errors="surrogateescape")
+
+    def _rule_matches(
+        self, rule: Dict, _keywords: Tuple, text: Buffer
+    ) -> Iterator[Tuple[Dict, int, Buffer]]:
+        """Yield one rule's matches over text; see iter_matches."""
+        binary = not isinstance(text, str)
+        pattern = self._pattern(rule, binary)
+        newline = b"\n" if binary else "\n"
+
+        if rule.get("multiline"):
+            for match in pattern.finditer(text):
+                yield rule, match.start(), match.group(0)
+            return
+
+        pos = 0
+        while True:
+            match = pattern.search(text, pos)
+            if match is None:
+                break
+
+            matched_text = match.group(0)
+            if newline not in matched_text:
+                yield rule, match.start(), matched_text
+                pos = max(match.end(), match.start() + 1)
+                continue
+
+            # Confine the pattern to the line the match started on
+            line_start = text.rfind(newline, 0, match.start()) + 1
+            line_end = text.find(newline, match.start())
+            for line_match in pattern.finditer(text, max(pos, line_start), line_end):
+                yield rule, line_match.start(), line_match.group(0)
+            pos = line_end + 1
+
+    def _sampled_matches(
+        self, rule: Dict, keywords: Tuple, text: Buffer
+    ) -> Iterator[Tuple[Dict, int, Buffer]]:
+        """
+        Yield one rule's matches within windows around its keywords.
+
+        A match containing a keyword at pos lies within the rule's longest
+        match length on either side of it (and, for single-line rules, on
+        pos's line), so only those windows are searched. Keywords of
+        case-insensitive rules are located in a lower-cased copy of the
+        text; if lower-casing changes its length, offsets would not carry
+        over, and the rule is matched over the whole text instead.
+        """
+        haystack = text
+        if rule["id"] in self._folded:
+            haystack = text.lower()
+            if len(haystack) != len(text):
+                yield from self._rule_matches(rule, keywords, text)
+                return
+
+        binary = not isinstance(text, str)
+        pattern = self._pattern(rule, binary)
+        newline = b"\n" if binary else "\n"
+        span = self.span(rule)
+        single_line = not rule.get("multiline")
+        windows = []
+
+        for keyword in keywords:
+            pos = haystack.find(keyword)
+            while pos != -1:
+                start = max(0, pos + len(keyword) - span)
+                end = min(len(text), pos + span)
+                if single_line:
+                    start = text.rfind(newline, start, pos) + 1 or start
+                    line_end = text.find(newline, pos, end)
+                    if line_end != -1:
+                        end = line_end
+                windows.append((start, end))
+                pos = haystack.find(keyword, pos + 1)
+
+        windows.sort()
+        merged: List[List[int]] = []
+        for start, end in windows:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        for start, end in merged:
+            for match in pattern.finditer(text, start, end):
+                yield rule, match.start(), match.group(0)
+
+
+_rulesets: Dict[Tuple, RuleSet] = {}
+
+
+def get_ruleset(packs: Sequence[str] = ()) -> RuleSet:
+    """
+    Return the shared RuleSet for the built-in rules plus packs.
+
+    Rule sets are cached per process and rebuilt only when a pack file
+    changes, so repeated scans reuse already compiled patterns.
+
+    Raises:
+        ValueError: If a pack is malformed
+        OSError: If a pack cannot be read
+    """
+    key = tuple(pack_signature(path) for path in packs)
+    ruleset = _rulesets.get(key)
+    if ruleset is None:
+        ruleset = _rulesets[key] = RuleSet(get_rules(packs), packs)
+    return ruleset
+
+
+class LineIndex:
+    """
+    Offset-to-line mapping for a text or bytes buffer.
+
+    Newline offsets are collected on first use, so files without findings
+    never pay for the index. Line numbers are 1-based.
+    """
+
+    def __init__(self, text: Buffer):
+        self.text = text
+        self._newlines: Optional[List[int]] = None
+
+    def _offsets(self) -> List[int]:
+        if self._newlines is None:
+            newline = "\n" if isinstance(self.text, str) else b"\n"
+            newlines = []
+            find = self.text.find
+            pos = find(newline)
+            while pos != -1:
+                newlines.append(pos)
+                pos = find(newline, pos + 1)
+            self._newlines = newlines
+        return self._newlines
+
+    def line_number(self, offset: int) -> int:
+        """Return the 1-based line number containing offset."""
+        return bisect_left(self._offsets(), offset) + 1
+
+    def line_start(self, line_num: int) -> int:
+        """Return the offset at which a 1-based line starts."""
+        return self._offsets()[line_num - 2] + 1 if line_num > 1 else 0
+
+    def line_text(self, line_num: int) -> Buffer:
+        """Return the text (or bytes) of a 1-based line without its newline."""
+        newlines = self._offsets()
+        start = self.line_start(line_num)
+        end = newlines[line_num - 1] if line_num <= len(newlines) else len(self.text)
+        return self.text[start:end]
@@ -0,0 +1,305 @@
+"""
+gitscan.py - Git-aware scan scopes.
+
+Lists the blobs changed since a ref, staged in the index, or introduced
+anywhere in history, and reads blob content straight from the object
+database through one long-lived `git cat-file --batch` process, so
+git-scoped scans never touch the working tree.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import io
+import subprocess
+import sys
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+# Object ID of the empty tree, used to diff against before the first commit
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+# Regular file modes; symlinks (120000) and submodules (160000) are skipped
+BLOB_MODES = {"100644", "100755"}
+
+
+def run_git(repo_path: str, args: List[str]) -> bytes:
+    """
+    Run a git command in repo_path and return its stdout.
+
+    Raises:
+        SystemExit on git errors
+    """
+    try:
+        result = subprocess.run(
+            ["git", "-C", repo_path, *args], capture_output=True, check=True
+        )
+    except FileNotFoundError:
+        print("Error: git executable not found.", file=sys.stderr)
+        sys.exit(3)
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode("utf-8", errors="replace").strip()
+        print(f"Error running git {args[0]}: {message}", file=sys.stderr)
+        sys.exit(3)
+    return result.stdout
+
+
+def _parse_raw_diff(output: bytes) -> List[Tuple[str, str]]:
+    """
+    Parse `--raw -z` diff output into (path, new blob SHA) pairs.
+
+    Deleted entries and anything that is not a regular file are dropped.
+    """
+    blobs = []
+    fields = output.split(b"\0")
+
+    for index in range(0, len(fields) - 1, 2):
+        meta, path = fields[index], fields[index + 1]
+        if not meta.startswith(b":"):
+            break
+        _old_mode, new_mode, _old_sha, new_sha, status = meta[1:].decode().split()
+        if status == "D" or new_mode not in BLOB_MODES:
+            continue
+        blobs.append((path.decode("utf-8", errors="replace"), new_sha))
+
+    return blobs
+
+
+def changed_blobs(repo_path: str, since: str) -> List[Tuple[str, str]]:
+    """
+    List blobs added or modified between a ref and HEAD.
+
+    Args:
+        repo_path: Directory inside the repository; paths are relative to it
+        since: Any commit-ish, e.g. a branch, tag or SHA
+
+    Returns:
+        (path, blob SHA) pairs as of HEAD, sorted by path
+    """
+    output = run_git(
+        repo_path,
+        ["diff-tree", "-r", "-z", "--relative", "--no-renames", since, "HEAD"],
+    )
+    return _parse_raw_diff(output)
+
+
+def staged_blobs(repo_path: str) -> List[Tuple[str, str]]:
+    """
+    List blobs staged in the index that differ from HEAD.
+
+    Args:
+        repo_path: Directory inside the repository; paths are relative to it
+
+    Returns:
+        (path, blob SHA) pairs for the index content, sorted by path
+    """
+    has_head = (
+        subprocess.run(
+            ["git", "-C", repo_path, "rev-parse", "--verify", "-q", "HEAD"],
+            capture_output=True,
+        ).returncode
+        == 0
+    )
+    output = run_git(
+        repo_path,
+        [
+            "diff-index",
+            "--cached",
+            "-r",
+            "-z",
+            "--relative",
+            "--no-renames",
+            "HEAD" if has_head else EMPTY_TREE,
+        ],
+    )
+    return _parse_raw_diff(output)
+
+
+def _iter_nul_fields(pipe: BinaryIO, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """Yield NUL-separated fields from a pipe without reading it all at once."""
+    pending = b""
+    while True:
+        chunk = pipe.read(chunk_size)
+        if not chunk:
+            break
+        fields = (pending + chunk).split(b"\0")
+        pending = fields.pop()
+        yield from fields
+    if pending:
+        yield pending
+
+
+def history_blobs(repo_path: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    Enumerate every unique blob reachable from any ref, oldest first.
+
+    Walks `git log --all --reverse --topo-order --raw` as a stream and
+    yields each blob SHA only the first time it appears, so it is
+    attributed to the commit and path that introduced it. Merge commits
+    are diffed against every parent (-m) so conflict resolutions are seen,
+    and root commits against the empty tree (--root), whatever the user's
+    log.showRoot setting.
+
+    Args:
+        repo_path: Directory inside the repository; paths are relative to it
+
+    Yields:
+        (path, blob SHA, commit SHA) for each blob's first appearance
+
+    Raises:
+        SystemExit if git log fails
+    """
+    try:
+        proc = subprocess.Popen(
+            [
+                "git",
+                "-C",
+                repo_path,
+                "log",
+                "--all",
+                "--reverse",
+                "--topo-order",
+                "-m",
+                "--root",
+                "--raw",
+                "--no-abbrev",
+                "--no-renames",
+                "--relative",
+                "-z",
+                "--format=%x01%H",
+            ],
+            stdout=subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        print("Error: git executable not found.", file=sys.stderr)
+        sys.exit(3)
+
+    seen = set()
+    commit = None
+    meta = None
+
+    try:
+        for field in _iter_nul_fields(proc.stdout):
+            field = field.lstrip(b"\n")
+            if meta is not None:
+                # Field following a raw diff entry is its path
+                _old_mode, new_mode, _old_sha, new_sha, status = (
+                    meta[1:].decode().split()
+                )
+                meta = None
+                if status == "D" or new_mode not in BLOB_MODES or new_sha in seen:
+                    continue
+                seen.add(new_sha)
+                yield field.decode("utf-8", errors="replace"), new_sha, commit
+            elif field.startswith(b"\x01"):
+                commit = field[1:].decode()
+            elif field.startswith(b":"):
+                meta = field
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+
+    if returncode != 0:
+        print("Error: git log failed while listing history.", file=sys.stderr)
+        sys.exit(3)
+
+
+class _BlobReader(io.RawIOBase):
+    """Raw reader limited to one blob's bytes on the cat-file stdout pipe."""
+
+    def __init__(self, pipe: BinaryIO, size: int):
+        self._pipe = pipe
+        self.remaining = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.remaining <= 0:
+            return 0
+        data = self._pipe.read(min(len(buffer), self.remaining))
+        if not data:
+            raise EOFError("git cat-file ended mid-blob")
+        buffer[: len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+    def drain(self) -> None:
+        """Discard the unread rest of the blob and its trailing newline."""
+        while self.remaining > 0:
+            chunk = self._pipe.read(min(self.remaining, 1024 * 1024))
+            if not chunk:
+                raise EOFError("git cat-file ended mid-blob")
+            self.remaining -= len(chunk)
+        self._pipe.read(1)
+
+
+class CatFile:
+    """
+    Long-lived `git cat-file --batch` process for reading blobs by SHA.
+
+    Blobs are exposed as buffered readers over the process pipe so large
+    ones can be streamed. Only one blob can be open at a time; opening the
+    next one drains whatever is left of the previous blob.
+    """
+
+    def __init__(self, repo_path: str):
+        try:
+            self._proc = subprocess.Popen(
+                ["git", "-C", repo_path, "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            print("Error: git executable not found.", file=sys.stderr)
+            sys.exit(3)
+        self._current: Optional[_BlobReader] = None
+
+    def open(self, sha: str) -> Optional[Tuple[int, BinaryIO]]:
+        """
+        Start reading a blob.
+
+        Args:
+            sha: Object ID of the blob
+
+        Returns:
+            (size, reader) or None if the object is missing or not a blob
+        """
+        if self._current is not None:
+            self._current.drain()
+            self._current = None
+
+        self._proc.stdin.write(sha.encode("ascii") + b"\n")
+        self._proc.stdin.flush()
+
+        header = self._proc.stdout.readline().split()
+        if len(header) != 3:
+            return None
+
+        _sha, object_type, size = header
+        size = int(size)
+        reader = _BlobReader(self._proc.stdout, size)
+        self._current = reader
+        if object_type != b"blob":
+            return None
+
+        return size, io.BufferedReader(reader)
+
+    def read(self, sha: str) -> Optional[bytes]:
+        """Return a blob's full content, or None if it is missing."""
+        opened = self.open(sha)
+        if opened is None:
+            return None
+        return opened[1].read()
+
+    def close(self) -> None:
+        """Stop the cat-file process."""
+        if self._proc.stdin and not self._proc.stdin.closed:
+            self._proc.stdin.close()
+        self._proc.wait()
+        self._proc.stdout.close()
+
+    def __enter__(self) -> "CatFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,170 @@
+"""
+packages.py - Package identity and processed-artifact index for mirror scans.
+
+Names each package artifact (npm tarball, VS Code/Open VSX extension) by
+the name and version in its manifest, falling back to its file name, and
+records scanned artifacts in an append-only index so each sweep of a
+registry mirror only scans artifacts that are new or changed.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+PACKAGE_INDEX_FILENAME = "packages.jsonl"
+PACKAGE_FINDINGS_FILENAME = "package-findings.jsonl"
+
+# Manifests larger than this are not parsed for the package identity
+MAX_MANIFEST_SIZE = 1024 * 1024
+
+# 'name-1.2.3' or 'publisher.name-1.2.3-beta.1' style artifact file names
+ARTIFACT_NAME_RE = re.compile(r"^(?P<name>.+?)-(?P<version>\d+\.\d+[^/]*)$")
+
+ARTIFACT_SUFFIXES = (".tar.gz", ".tgz", ".vsix", ".zip", ".tar")
+
+
+def is_manifest(member_name: str) -> bool:
+    """
+    Check if an archive member is a top-level package manifest.
+
+    npm tarballs keep package.json under one top directory ('package/'),
+    and .vsix files keep the extension's under 'extension/'.
+
+    Args:
+        member_name: Member path inside the artifact
+
+    Returns:
+        True for '<top>/package.json'
+    """
+    top, sep, rest = member_name.partition("/")
+    return bool(top) and sep == "/" and rest == "package.json"
+
+
+def package_id(artifact_path: str, manifest: Optional[bytes] = None) -> str:
+    """
+    Name an artifact 'name@version', or 'publisher.name@version' for extensions.
+
+    Args:
+        artifact_path: Artifact path ('/'-separated)
+        manifest: Raw package.json of the artifact, if one was found
+
+    Returns:
+        Package identity; the file name when nothing better is known
+    """
+    if manifest is not None:
+        try:
+            data = json.loads(manifest)
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and data.get("name") and data.get("version"):
+            name = str(data["name"])
+            if data.get("publisher") and artifact_path.lower().endswith(".vsix"):
+                name = f"{data['publisher']}.{name}"
+            return f"{name}@{data['version']}"
+
+    file_name = artifact_path.rsplit("/", 1)[-1]
+    lower = file_name.lower()
+    for suffix in ARTIFACT_SUFFIXES:
+        if lower.endswith(suffix):
+            file_name = file_name[: -len(suffix)]
+            break
+    match = ARTIFACT_NAME_RE.match(file_name)
+    if match:
+        return f"{match.group('name')}@{match.group('version')}"
+    return file_name
+
+
+class PackageIndex:
+    """
+    Append-only record of scanned package artifacts.
+
+    An artifact counts as processed while its size, mtime and the scan
+    fingerprint (rules, allowlist and archive depth) are unchanged, so a
+    re-published version or a rule update rescans it. Entries are flushed
+    as each artifact finishes, so an interrupted sweep resumes where it
+    stopped.
+
+    An artifact's findings are appended to a findings file, one JSON line
+    per finding, before its index entry is written: an artifact the index
+    calls processed always has its findings on disk, even if the sweep
+    that scanned it never got to write its report.
+    """
+
+    def __init__(self, out_dir: str, fingerprint: str):
+        self.path = os.path.join(out_dir, PACKAGE_INDEX_FILENAME)
+        self.findings_path = os.path.join(out_dir, PACKAGE_FINDINGS_FILENAME)
+        self.fingerprint = fingerprint
+        os.makedirs(out_dir, exist_ok=True)
+        self.entries = self.load(self.path)
+        self._findings_file = open(self.findings_path, "a", encoding="utf-8")
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    @staticmethod
+    def load(path: str) -> Dict[str, Dict]:
+        """
+        Read the index; later lines for the same artifact win.
+
+        Returns:
+            Index entries by artifact path; empty if there is no index
+        """
+        entries: Dict[str, Dict] = {}
+        if not os.path.exists(path):
+            return entries
+
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn final line from an interrupted write
+                    continue
+                entries[entry["artifact"]] = entry
+        return entries
+
+    def is_current(self, artifact: str, size: int, mtime_ns: int) -> bool:
+        """Check if an artifact was scanned in its current state."""
+        entry = self.entries.get(artifact)
+        return (
+            entry is not None
+            and entry["size"] == size
+            and entry["mtime_ns"] == mtime_ns
+            and entry["fingerprint"] == self.fingerprint
+        )
+
+    def record(
+        self,
+        artifact: str,
+        size: int,
+        mtime_ns: int,
+        package: str,
+        findings: List[Dict[str, Any]],
+    ) -> None:
+        """Save an artifact's findings, then mark it scanned."""
+        if findings:
+            self._findings_file.write(
+                "".join(json.dumps(finding) + "\n" for finding in findings)
+            )
+            self._findings_file.flush()
+            os.fsync(self._findings_file.fileno())
+
+        entry = {
+            "artifact": artifact,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "fingerprint": self.fingerprint,
+            "package": package,
+            "findings": len(findings),
+        }
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        self.entries[artifact] = entry
+
+    def close(self) -> None:
+        """Flush the index to disk and close it."""
+        self._findings_file.close()
+        os.fsync(self._file.fileno())
+        self._file.close()
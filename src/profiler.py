@@ -0,0 +1,182 @@
+"""
+profiler.py - Per-rule and per-file timing for --profile scans.
+
+Collects wall time and match counts per rule, and bytes plus read and
+match time per file, then reports the slowest rules and files. Scanning
+functions take an optional profiler and skip all timing when it is None.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import heapq
+import itertools
+import json
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Slowest files kept for the report
+DEFAULT_TOP_FILES = 20
+
+# Rows shown per table in the stderr summary
+SUMMARY_ROWS = 10
+
+
+class Profiler:
+    """
+    Accumulates scan timings; safe to share between threads.
+
+    Per-rule totals are kept for every rule, but only the top_files slowest
+    files are retained, so memory stays flat on very large scans. Worker
+    processes keep their own profiler and hand snapshot() results back to
+    be merged.
+    """
+
+    def __init__(self, top_files: int = DEFAULT_TOP_FILES):
+        self.top_files = top_files
+        self.rules: Dict[str, List[float]] = {}
+        self.totals = {
+            "files": 0,
+            "bytes": 0,
+            "read_seconds": 0.0,
+            "match_seconds": 0.0,
+            "prefilter_seconds": 0.0,
+        }
+        self._slowest: List[Any] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def add_prefilter(self, seconds: float) -> None:
+        """Record time spent selecting candidate rules."""
+        with self._lock:
+            self.totals["prefilter_seconds"] += seconds
+
+    def add_rule(self, rule_id: str, seconds: float, matches: int) -> None:
+        """Record one evaluation of a rule over a buffer."""
+        with self._lock:
+            entry = self.rules.setdefault(rule_id, [0.0, 0, 0])
+            entry[0] += seconds
+            entry[1] += matches
+            entry[2] += 1
+
+    def add_file(
+        self, path: str, size: int, read_seconds: float, match_seconds: float
+    ) -> None:
+        """Record one scanned file."""
+        with self._lock:
+            self.totals["files"] += 1
+            self.totals["bytes"] += size
+            self.totals["read_seconds"] += read_seconds
+            self.totals["match_seconds"] += match_seconds
+            self._push_file(
+                {
+                    "path": path,
+                    "bytes": size,
+                    "read_seconds": read_seconds,
+                    "match_seconds": match_seconds,
+                }
+            )
+
+    def _push_file(self, entry: Dict[str, Any]) -> None:
+        key = (entry["read_seconds"] + entry["match_seconds"], next(self._counter))
+        if len(self._slowest) < self.top_files:
+            heapq.heappush(self._slowest, (key, entry))
+        elif key > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (key, entry))
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Any]:
+        """
+        Return the collected data as plain, picklable values.
+
+        Args:
+            reset: Clear the collected data afterwards (used by pool workers)
+        """
+        with self._lock:
+            data = {
+                "totals": dict(self.totals),
+                "rules": {
+                    rule_id: list(entry) for rule_id, entry in self.rules.items()
+                },
+                "files": [entry for _key, entry in self._slowest],
+            }
+            if reset:
+                self.rules.clear()
+                self.totals = dict.fromkeys(self.totals, 0)
+                self._slowest = []
+        return data
+
+    def merge(self, data: Optional[Dict[str, Any]]) -> None:
+        """Fold in a snapshot() taken by another profiler."""
+        if not data:
+            return
+        with self._lock:
+            for key, value in data["totals"].items():
+                self.totals[key] += value
+            for rule_id, (seconds, matches, evaluations) in data["rules"].items():
+                entry = self.rules.setdefault(rule_id, [0.0, 0, 0])
+                entry[0] += seconds
+                entry[1] += matches
+                entry[2] += evaluations
+            for entry in data["files"]:
+                self._push_file(entry)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Build the machine-readable profile.
+
+        Returns:
+            Dict with 'totals', 'rules' (slowest first) and 'slowest_files'
+        """
+        with self._lock:
+            totals = dict(self.totals)
+            totals["wall_seconds"] = time.perf_counter() - self._started
+            rules = [
+                {
+                    "rule_id": rule_id,
+                    "seconds": seconds,
+                    "matches": matches,
+                    "evaluations": evaluations,
+                }
+                for rule_id, (seconds, matches, evaluations) in self.rules.items()
+            ]
+            files = [entry for _key, entry in sorted(self._slowest, reverse=True)]
+
+        rules.sort(key=lambda rule: rule["seconds"], reverse=True)
+        return {"totals": totals, "rules": rules, "slowest_files": files}
+
+    def write(self, output_path: str) -> None:
+        """Print the slowest rules and files to stderr and write the JSON profile."""
+        profile = self.report()
+        totals = profile["totals"]
+
+        print(
+            f"\nProfile: {totals['files']} file(s), {totals['bytes'] / 1e6:.1f} MB in "
+            f"{totals['wall_seconds']:.2f}s wall (read {totals['read_seconds']:.2f}s, "
+            f"match {totals['match_seconds']:.2f}s, "
+            f"prefilter {totals['prefilter_seconds']:.2f}s)",
+            file=sys.stderr,
+        )
+
+        print("  Slowest rules:", file=sys.stderr)
+        for rule in profile["rules"][:SUMMARY_ROWS]:
+            print(
+                f"    {rule['rule_id']:<24} {rule['seconds'] * 1000:>10.1f} ms "
+                f"{rule['matches']:>8} match(es), {rule['evaluations']} buffer(s)",
+                file=sys.stderr,
+            )
+
+        print("  Slowest files:", file=sys.stderr)
+        for entry in profile["slowest_files"][:SUMMARY_ROWS]:
+            seconds = entry["read_seconds"] + entry["match_seconds"]
+            print(
+                f"    {entry['path']} {entry['bytes'] / 1024:.0f} KB "
+                f"{seconds * 1000:.1f} ms (read {entry['read_seconds'] * 1000:.1f} ms)",
+                file=sys.stderr,
+            )
+
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(profile, f, indent=2)
+        print(f"Profile written to {output_path}", file=sys.stderr)
@@ -0,0 +1,166 @@
+"""
+ratelimit.py - Rate-limit-aware scheduling of GitHub API requests.
+
+Spreads requests over a pool of tokens, tracks each token's remaining
+quota from the X-RateLimit-* response headers, paces requests when quota
+runs low and waits out primary and secondary rate limits instead of
+letting requests fail.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import sys
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+import requests
+
+# Below this many remaining requests a token's calls are spread evenly
+# over the time left until its quota resets
+PACING_THRESHOLD = 100
+
+# Attempts per request before a rate-limited response is returned as is
+MAX_ATTEMPTS = 6
+
+# Initial wait for a secondary rate limit without Retry-After; doubled per
+# attempt, as GitHub asks for at least a minute
+SECONDARY_BACKOFF = 60.0
+
+
+class _TokenState:
+    """Quota bookkeeping for one token's session."""
+
+    def __init__(self, session: requests.Session):
+        self.session = session
+        self.remaining: Optional[int] = None
+        self.reset = 0.0
+        self.blocked_until = 0.0
+        self.next_at = 0.0
+
+    def available_at(self, now: float) -> float:
+        """Return the earliest time this token may send a request."""
+        ready = max(self.blocked_until, self.next_at)
+        if self.remaining is not None and self.remaining <= 0 and self.reset > now:
+            ready = max(ready, self.reset)
+        return ready
+
+    def headroom(self, now: float) -> float:
+        """Return the requests left, unknown or reset quota counting as plenty."""
+        if self.remaining is None or self.reset <= now:
+            return float("inf")
+        return self.remaining
+
+
+class RateLimitedSession:
+    """
+    Session-like scheduler over one requests.Session per token.
+
+    Each request goes to the ready token with the most remaining quota.
+    Responses update that token's quota; 403/429 rate-limit responses block
+    the token until its reset, its Retry-After, or an exponential backoff
+    for secondary limits, and the request is retried on the next ready
+    token. When every token is exhausted the caller sleeps until the first
+    one recovers. Safe to share between fetcher threads.
+    """
+
+    def __init__(
+        self,
+        sessions: List[requests.Session],
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if not sessions:
+            raise ValueError("at least one session is required")
+        self._states = [_TokenState(session) for session in sessions]
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._sleep = sleep
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _acquire(self) -> _TokenState:
+        """Reserve a request on the best token, sleeping until one is ready."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                state = min(
+                    self._states,
+                    key=lambda s: (max(s.available_at(now), now), -s.headroom(now)),
+                )
+                wait = state.available_at(now) - now
+                if wait <= 0:
+                    headroom = state.headroom(now)
+                    if headroom < PACING_THRESHOLD:
+                        interval = (state.reset - now) / max(headroom, 1)
+                        state.next_at = max(now, state.next_at) + interval
+                    if state.remaining is not None and state.reset > now:
+                        state.remaining -= 1
+                    return state
+
+            if wait > 5:
+                print(
+                    f"GitHub API rate limit, waiting {wait:.0f}s...",
+                    file=sys.stderr,
+                )
+            self._sleep(wait)
+
+    def _record(
+        self, state: _TokenState, resp: requests.Response, attempt: int
+    ) -> bool:
+        """
+        Update a token's quota from a response.
+
+        Returns:
+            True if the response was rate limited and should be retried
+        """
+        now = self._clock()
+        remaining = resp.headers.get("X-RateLimit-Remaining")
+        reset = resp.headers.get("X-RateLimit-Reset")
+        retry_after = resp.headers.get("Retry-After")
+
+        limited = resp.status_code in (403, 429) and (
+            retry_after is not None
+            or remaining == "0"
+            or resp.status_code == 429
+            or "rate limit" in resp.text.lower()
+        )
+
+        with self._lock:
+            if remaining is not None and reset is not None:
+                state.remaining = int(remaining)
+                state.reset = float(reset)
+
+            if limited and retry_after is not None:
+                state.blocked_until = now + float(retry_after)
+            elif limited and remaining != "0":
+                # Secondary limit without guidance: back off exponentially
+                state.blocked_until = now + SECONDARY_BACKOFF * 2**attempt
+
+        return limited
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Send a GET request through the scheduler.
+
+        Args:
+            url: Request URL
+            **kwargs: Passed on to requests.Session.get
+
+        Returns:
+            The response; rate-limited only if every attempt was
+        """
+        for attempt in range(MAX_ATTEMPTS):
+            state = self._acquire()
+            resp = state.session.get(url, **kwargs)
+            if not self._record(state, resp, attempt) or attempt == MAX_ATTEMPTS - 1:
+                return resp
+            resp.close()
+        return resp
+
+    def close(self) -> None:
+        """Close every token's session."""
+        for state in self._states:
+            state.session.close()
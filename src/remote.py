@@ -0,0 +1,343 @@
+"""
+remote.py - GitHub API access for remote and batch scans.
+
+Creates rate-limited API sessions and fetches repository files through
+the contents API or a streamed tarball. Only imported once a remote mode
+is selected, so local and hook scans never pay for loading requests.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import base64
+import itertools
+import sys
+import tarfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from urllib.parse import quote
+
+import requests
+import urllib3
+
+from src.cache import ResultCache
+from src.ratelimit import RateLimitedSession
+from src.utils import DEFAULT_FETCH_CONCURRENCY, decode_text, is_remote_text_path
+
+GITHUB_API = "https://api.github.com"
+
+# Errors of a tarball download that fails or breaks off mid-stream; reads
+# of the raw response raise urllib3's errors, which are not OSErrors
+TARBALL_ERRORS = (
+    tarfile.TarError,
+    EOFError,
+    OSError,
+    requests.exceptions.RequestException,
+    urllib3.exceptions.HTTPError,
+)
+
+
+def create_session(
+    github_token: Union[str, Sequence[str]], concurrency: int = 1
+) -> RateLimitedSession:
+    """
+    Create a rate-limited GitHub API session over one or more tokens.
+
+    Each token gets its own requests.Session with a connection pool sized
+    for concurrency, so TLS connections stay alive across requests, and
+    requests are scheduled across tokens by remaining quota.
+
+    Args:
+        github_token: GitHub API token, or a pool of tokens
+        concurrency: Number of threads that will share the session
+
+    Returns:
+        RateLimitedSession over the token sessions
+    """
+    tokens = [github_token] if isinstance(github_token, str) else list(github_token)
+    sessions = []
+
+    for token in tokens:
+        session = requests.Session()
+        session.headers.update(
+            {
+                "Authorization": f"token {token}",
+                "Accept": "application/vnd.github.v3+json",
+            }
+        )
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=max(1, concurrency)
+        )
+        session.mount("https://", adapter)
+        sessions.append(session)
+
+    return RateLimitedSession(sessions)
+
+
+def get_json(
+    session: RateLimitedSession, url: str, cache: Optional[ResultCache] = None
+) -> Any:
+    """
+    GET a JSON API resource, revalidating a cached copy with its ETag.
+
+    When the cache holds a previous response for url, the request carries
+    If-None-Match and a 304 Not Modified answer (which GitHub does not
+    count against the rate limit) returns the stored body.
+
+    Args:
+        session: GitHub API session
+        url: Resource URL
+        cache: Result cache holding previous responses
+
+    Returns:
+        Decoded JSON body
+
+    Raises:
+        requests.exceptions.RequestException on request or HTTP errors
+    """
+    cached = cache.get_response(url) if cache is not None else None
+    headers = {"If-None-Match": cached[0]} if cached is not None else {}
+
+    resp = session.get(url, timeout=30, headers=headers)
+    if resp.status_code == 304 and cached is not None:
+        return cached[1]
+    resp.raise_for_status()
+
+    body = resp.json()
+    etag = resp.headers.get("ETag")
+    if cache is not None and etag:
+        cache.put_response(url, etag, body)
+    return body
+
+
+def _fetch_file_content(
+    session: RateLimitedSession, repo: str, path: str, sha: Optional[str] = None
+) -> Optional[Dict[str, Optional[str]]]:
+    """Fetch and decode one file via the contents API, or None on failure."""
+    content_url = f"{GITHUB_API}/repos/{repo}/contents/{quote(path)}"
+    try:
+        resp = session.get(content_url, timeout=30)
+        resp.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"Warning: Could not fetch {path}: {e}", file=sys.stderr)
+        return None
+
+    content_data = resp.json()
+    if content_data.get("encoding") != "base64":
+        return None
+
+    content = decode_text(base64.b64decode(content_data["content"]))
+    return {"path": path, "sha": sha, "content": content}
+
+
+def iter_repo_files(
+    repo: str,
+    github_token: Union[str, Sequence[str]],
+    concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+    ref: Optional[str] = None,
+    cache: Optional[ResultCache] = None,
+    is_known: Optional[Callable[[str, str], bool]] = None,
+) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Fetch text files from a GitHub repository via API as they arrive.
+
+    Retrieves the tree of ref (or the default branch), then downloads file
+    contents on a bounded thread pool sharing one pooled session. Files are
+    yielded in tree order as soon as they (and every file before them) are
+    available, with at most a few requests in flight per thread.
+    Rate limits: GitHub API allows 5000 requests/hour for authenticated users.
+
+    With a cache, the repository and tree calls are conditional requests
+    against the stored ETags. Blobs for which is_known(path, sha) is true are not
+    downloaded; they are yielded with 'content' set to None, so an
+    unchanged repository costs two mostly-304 requests.
+
+    Args:
+        repo: Repository in format 'owner/name'
+        github_token: GitHub API token, or a pool of tokens
+        concurrency: Maximum number of concurrent content requests
+        ref: Branch, tag or commit (default branch when omitted)
+        cache: Result cache holding previous API responses
+        is_known: Predicate on (path, blob SHA) for content that need not be
+            fetched
+
+    Yields:
+        Dicts with 'path', 'sha' and 'content' keys
+
+    Raises:
+        SystemExit on API errors
+    """
+    session = create_session(github_token, concurrency)
+
+    if not ref:
+        # Get default branch
+        print(f"Fetching repository info for {repo}...", file=sys.stderr)
+        repo_url = f"{GITHUB_API}/repos/{repo}"
+        try:
+            repo_info = get_json(session, repo_url, cache)
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching repository info: {e}", file=sys.stderr)
+            print(
+                "Check repository name, token validity, and rate limits.",
+                file=sys.stderr,
+            )
+            sys.exit(3)
+
+        ref = repo_info.get("default_branch", "main")
+
+    # Get tree
+    tree_url = f"{GITHUB_API}/repos/{repo}/git/trees/{quote(ref, safe='')}?recursive=1"
+    try:
+        tree = get_json(session, tree_url, cache).get("tree", [])
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching repository tree: {e}", file=sys.stderr)
+        sys.exit(3)
+
+    # Filter text files
+    target_files = [
+        (item["path"], item.get("sha"))
+        for item in tree
+        if item["type"] == "blob" and is_remote_text_path(item["path"])
+    ]
+
+    def submit(executor: ThreadPoolExecutor, path: str, sha: Optional[str]) -> Future:
+        if is_known is not None and sha and is_known(path, sha):
+            known: Future = Future()
+            known.set_result({"path": path, "sha": sha, "content": None})
+            return known
+        return executor.submit(_fetch_file_content, session, repo, path, sha)
+
+    # Fetch file contents
+    print(
+        f"Fetching {len(target_files)} file(s) with {concurrency} connection(s)...",
+        file=sys.stderr,
+    )
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        pending: Deque[Future] = deque()
+        entries = iter(target_files)
+
+        # Keep a bounded window of requests in flight and yield in order
+        for path, sha in itertools.islice(entries, 2 * max(1, concurrency)):
+            pending.append(submit(executor, path, sha))
+
+        failed = 0
+        while pending:
+            file_data = pending.popleft().result()
+            next_entry = next(entries, None)
+            if next_entry is not None:
+                pending.append(submit(executor, *next_entry))
+            if file_data is not None:
+                yield file_data
+            else:
+                failed += 1
+
+    session.close()
+
+    if failed:
+        print(
+            f"Warning: {failed} file(s) could not be fetched; the scan is incomplete.",
+            file=sys.stderr,
+        )
+
+
+def iter_tarball_files(
+    repo: str, github_token: Union[str, Sequence[str]], ref: Optional[str] = None
+) -> Iterator[Tuple[str, int, BinaryIO]]:
+    """
+    Stream text files out of a repository tarball downloaded in one request.
+
+    The tarball is decompressed on the fly from the response body and
+    never written to disk. Members are filtered with the same text-file
+    list as the contents API mode.
+
+    Args:
+        repo: Repository in format 'owner/name'
+        github_token: GitHub API token, or a pool of tokens
+        ref: Branch, tag or commit (default branch when omitted)
+
+    Yields:
+        (path, size, reader) for each text file; a reader is only valid
+        until the next item is requested. Reading it may raise one of
+        TARBALL_ERRORS if the download breaks off.
+
+    Raises:
+        SystemExit on API or archive errors
+    """
+    session = create_session(github_token)
+    tarball_url = f"{GITHUB_API}/repos/{repo}/tarball"
+    if ref:
+        tarball_url += f"/{quote(ref, safe='')}"
+
+    print(f"Downloading tarball for {repo}...", file=sys.stderr)
+    try:
+        resp = session.get(tarball_url, timeout=30, stream=True)
+        resp.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"Error downloading repository tarball: {e}", file=sys.stderr)
+        print(
+            "Check repository name, ref, token validity, and rate limits.",
+            file=sys.stderr,
+        )
+        sys.exit(3)
+
+    resp.raw.decode_content = True
+    try:
+        with tarfile.open(fileobj=resp.raw, mode="r|gz") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+
+                # Drop the 'owner-repo-sha/' directory GitHub prefixes paths with
+                _, _, path = member.name.partition("/")
+                if not path or not is_remote_text_path(path):
+                    continue
+
+                reader = archive.extractfile(member)
+                if reader is not None:
+                    yield path, member.size, reader
+    except TARBALL_ERRORS as e:
+        print(f"Error reading repository tarball: {e}", file=sys.stderr)
+        sys.exit(3)
+    finally:
+        resp.close()
+        session.close()
+
+
+def fetch_repo_files(
+    repo: str,
+    github_token: Union[str, Sequence[str]],
+    concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+    ref: Optional[str] = None,
+) -> List[Dict[str, Optional[str]]]:
+    """
+    Fetch text files from a GitHub repository via API.
+
+    Collects iter_repo_files into a list.
+
+    Args:
+        repo: Repository in format 'owner/name'
+        github_token: GitHub API token, or a pool of tokens
+        concurrency: Maximum number of concurrent content requests
+        ref: Branch, tag or commit (default branch when omitted)
+
+    Returns:
+        List of dicts with 'path', 'sha' and 'content' keys
+
+    Raises:
+        SystemExit on API errors
+    """
+    return list(iter_repo_files(repo, github_token, concurrency, ref))
@@ -1,65 +1,260 @@
 """
 report.py - Report generation for scan findings.
 
-Generates JSON and CSV output formats with structured findings.
+Generates JSON, CSV and JSON Lines output with structured findings.
+Findings are pushed into report sinks one at a time as the scanner
+produces them, and summary counters are kept incrementally, so the full
+result set never has to be held in memory.
 
 Copyright (c) 2025 Rick Deacon / Knostic Labs
 Licensed under the MIT License
 """
 
+import abc
 import json
 import csv
-from typing import List, Dict, Any
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Iterable, List, Set
 
+# Columns appended to the CSV only when some finding carries them
+OPTIONAL_FIELDS = ["commit", "repo", "package", "sampled"]
 
-def generate_json_report(findings: List[Dict[str, Any]], output_path: str) -> None:
+CSV_FIELDS = ["path", "line", "rule_id", "desc", "match", "score", "snippet"]
+
+# Number of findings per severity kept as examples for the console summary
+SUMMARY_EXAMPLES = 3
+
+
+class ReportSummary:
     """
-    Generate JSON report of findings.
+    Severity counters updated one finding at a time.
+
+    Also keeps the first few critical and high findings as examples for
+    the console summary.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.critical = 0
+        self.high = 0
+        self.medium = 0
+        self.examples: Dict[str, List[Dict[str, Any]]] = {"critical": [], "high": []}
+
+    def add(self, finding: Dict[str, Any]) -> None:
+        """Count one finding."""
+        score = finding["score"]
+        self.total += 1
+
+        if score >= 90:
+            self.critical += 1
+            severity = "critical"
+        elif score >= 70:
+            self.high += 1
+            severity = "high"
+        else:
+            self.medium += 1
+            return
+
+        if len(self.examples[severity]) < SUMMARY_EXAMPLES:
+            self.examples[severity].append(finding)
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return the counters in the JSON report's scan_summary layout."""
+        return {
+            "total_findings": self.total,
+            "critical": self.critical,
+            "high": self.high,
+            "medium": self.medium,
+        }
+
+    def exit_code(self) -> int:
+        """
+        Determine exit code based on finding scores.
+
+        Returns:
+            2 if any score >= 90 (high confidence)
+            1 if any score >= 70 (medium confidence)
+            0 otherwise
+        """
+        if self.critical:
+            return 2
+        if self.high:
+            return 1
+        return 0
+
+
+class ReportSink(abc.ABC):
+    """Destination that findings are written to as they are produced."""
+
+    @abc.abstractmethod
+    def add(self, finding: Dict[str, Any]) -> None:
+        """Write one finding."""
+
+    def close(self) -> None:
+        """Finish the output file."""
+
+
+class JsonLinesSink(ReportSink):
+    """Writes one compact JSON object per finding and line."""
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self._file = open(output_path, "w", encoding="utf-8")
+
+    def add(self, finding: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(finding, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+        print(f"JSON Lines report written to {self.output_path}", file=None)
+
+
+class JsonReportSink(ReportSink):
+    """
+    Writes the JSON report with its summary ahead of the findings.
+
+    Findings are rendered into a spool file next to the output while the
+    counters are kept; close() writes the summary and copies the spool in,
+    producing the same document as json.dump(report, indent=2).
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.summary = ReportSummary()
+        self._spool = tempfile.TemporaryFile(
+            "w+", encoding="utf-8", dir=os.path.dirname(os.path.abspath(output_path))
+        )
+
+    def add(self, finding: Dict[str, Any]) -> None:
+        if self.summary.total:
+            self._spool.write(",\n")
+        rendered = json.dumps(finding, indent=2, ensure_ascii=False)
+        self._spool.write("    " + rendered.replace("\n", "\n    "))
+        self.summary.add(finding)
+
+    def close(self) -> None:
+        summary = json.dumps(self.summary.as_dict(), indent=2).replace("\n", "\n  ")
+
+        with open(self.output_path, "w", encoding="utf-8") as f:
+            f.write(f'{{\n  "scan_summary": {summary},\n  "findings": [')
+            if self.summary.total:
+                f.write("\n")
+                self._spool.seek(0)
+                shutil.copyfileobj(self._spool, f)
+                f.write("\n  ")
+            f.write("]\n}")
+        self._spool.close()
+
+        print(f"JSON report written to {self.output_path}", file=None)
+
+
+class CsvReportSink(ReportSink):
+    """
+    Writes the CSV report.
+
+    Optional fields such as 'commit' (history scans) or 'repo' (batch
+    scans) get their own column when at least one finding has them. As
+    that is only known at the end, rows are spooled as JSON Lines and
+    written out on close().
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.count = 0
+        self._optional: Set[str] = set()
+        self._spool = tempfile.TemporaryFile(
+            "w+", encoding="utf-8", dir=os.path.dirname(os.path.abspath(output_path))
+        )
+
+    def add(self, finding: Dict[str, Any]) -> None:
+        self._optional.update(field for field in OPTIONAL_FIELDS if field in finding)
+        self._spool.write(json.dumps(finding, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        with open(self.output_path, "w", encoding="utf-8", newline="") as f:
+            if not self.count:
+                # Write empty CSV with headers
+                writer = csv.writer(f)
+                writer.writerow(
+                    [
+                        "path",
+                        "line",
+                        "rule_id",
+                        "description",
+                        "match",
+                        "score",
+                        "snippet",
+                    ]
+                )
+            else:
+                fieldnames = CSV_FIELDS + [
+                    field for field in OPTIONAL_FIELDS if field in self._optional
+                ]
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+
+                writer.writeheader()
+                self._spool.seek(0)
+                for line in self._spool:
+                    writer.writerow(json.loads(line))
+        self._spool.close()
+
+        print(f"CSV report written to {self.output_path}", file=None)
+
+
+def write_findings(
+    findings: Iterable[Dict[str, Any]], sinks: List[ReportSink]
+) -> ReportSummary:
+    """
+    Push findings into every sink in a single pass and close the sinks.
 
     Args:
-        findings: List of finding dictionaries
-        output_path: Path to write JSON file
+        findings: Findings, typically a generator fed by the scanner
+        sinks: Report sinks to write
+
+    Returns:
+        Summary counters for the findings
+    """
+    summary = ReportSummary()
+    for finding in findings:
+        summary.add(finding)
+        for sink in sinks:
+            sink.add(finding)
+
+    for sink in sinks:
+        sink.close()
+    return summary
+
+
+def generate_json_report(
+    findings: Iterable[Dict[str, Any]], output_path: str
+) -> ReportSummary:
     """
-    report = {
-        "scan_summary": {
-            "total_findings": len(findings),
-            "critical": len([f for f in findings if f["score"] >= 90]),
-            "high": len([f for f in findings if 70 <= f["score"] < 90]),
-            "medium": len([f for f in findings if f["score"] < 70]),
-        },
-        "findings": findings,
-    }
+    Generate JSON report of findings.
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2, ensure_ascii=False)
+    Args:
+        findings: Finding dictionaries
+        output_path: Path to write JSON file
 
-    print(f"JSON report written to {output_path}", file=None)
+    Returns:
+        Summary counters for the findings
+    """
+    return write_findings(findings, [JsonReportSink(output_path)])
 
 
-def generate_csv_report(findings: List[Dict[str, Any]], output_path: str) -> None:
+def generate_csv_report(
+    findings: Iterable[Dict[str, Any]], output_path: str
+) -> ReportSummary:
     """
     Generate CSV report of findings.
 
     Args:
-        findings: List of finding dictionaries
+        findings: Finding dictionaries
         output_path: Path to write CSV file
+
+    Returns:
+        Summary counters for the findings
     """
-    if not findings:
-        # Write empty CSV with headers
-        with open(output_path, "w", encoding="utf-8", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(
-                ["path", "line", "rule_id", "description", "match", "score", "snippet"]
-            )
-        print(f"CSV report written to {output_path}", file=None)
-        return
-
-    with open(output_path, "w", encoding="utf-8", newline="") as f:
-        fieldnames = ["path", "line", "rule_id", "desc", "match", "score", "snippet"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-
-        writer.writeheader()
-        for finding in findings:
-            writer.writerow(finding)
-
-    print(f"CSV report written to {output_path}", file=None)
+    return write_findings(findings, [CsvReportSink(output_path)])
@@ -1,16 +1,20 @@
 """
 rules.py - Detection rules for marketplace tokens and credentials.
 
-Defines regex patterns and scoring for various token types.
-Includes path-based scoring boost and allowlist support.
+Defines regex patterns and scoring for various token types, and loads
+additional rules from JSON/YAML rule packs. Patterns are compiled lazily,
+the first time a scan actually runs them. Includes path-based scoring
+boost and allowlist support.
 
 Copyright (c) 2025 Rick Deacon / Knostic Labs
 Licensed under the MIT License
 """
 
+import hashlib
+import json
 import re
 import os
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Sequence, Set, Tuple
 
 # Path boost configuration
 HIGH_RISK_PATHS = [
@@ -25,155 +29,370 @@ HIGH_RISK_PATHS = [
 
 PATH_BOOST = 10
 
+# Allowlist configuration
+ALLOWLIST_PATH = "allowlist.txt"
+DIGEST_PREFIX = "sha256:"
 
-def get_rules() -> List[Dict]:
+# Fields accepted in rule-pack entries
+RULE_PACK_FIELDS = {
+    "id",
+    "description",
+    "pattern",
+    "score",
+    "keywords",
+    "multiline",
+    "ignore_case",
+    "paths",
+}
+
+
+class LazyPattern:
     """
-    Return list of detection rules.
+    Regex source that is compiled the first time it is used.
 
-    Each rule contains:
-        - id: unique identifier
-        - description: human readable description
-        - pattern: compiled regex pattern
-        - score: base severity score (30-100)
+    Exposes 'pattern' and 'flags' like re.Pattern without compiling; any
+    other attribute (search, finditer, ...) compiles the expression once
+    and is delegated to the compiled pattern.
     """
-    rules = [
+
+    __slots__ = ("pattern", "flags", "_compiled")
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self.pattern = pattern
+        self.flags = flags
+        self._compiled: Optional[re.Pattern] = None
+
+    def compile(self) -> re.Pattern:
+        """Return the compiled pattern, compiling it on first call."""
+        if self._compiled is None:
+            self._compiled = re.compile(self.pattern, self.flags)
+        return self._compiled
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or name == "_compiled":
+            raise AttributeError(name)
+        return getattr(self.compile(), name)
+
+    def __repr__(self) -> str:
+        return f"LazyPattern({self.pattern!r}, {self.flags})"
+
+
+def _builtin_rules() -> List[Dict]:
+    """Build the built-in detection rules."""
+    return [
         {
             "id": "gh_token_fine_grained",
             "description": "GitHub fine-grained personal access token (github_pat_ prefix)",
-            "pattern": re.compile(r"github_pat_[A-Za-z0-9_]{82}"),
+            "pattern": LazyPattern(r"github_pat_[A-Za-z0-9_]{82}"),
             "score": 95,
+            "keywords": ["github_pat_"],
         },
         {
             "id": "gh_token_ghp",
             "description": "GitHub personal access token classic (ghp_ prefix)",
-            "pattern": re.compile(r"ghp_[A-Za-z0-9_]{36,}"),
+            "pattern": LazyPattern(r"ghp_[A-Za-z0-9_]{36,}"),
             "score": 95,
+            "keywords": ["ghp_"],
         },
         {
             "id": "gh_token_gho",
             "description": "GitHub OAuth token (gho_ prefix)",
-            "pattern": re.compile(r"gho_[A-Za-z0-9_]{36,}"),
+            "pattern": LazyPattern(r"gho_[A-Za-z0-9_]{36,}"),
             "score": 95,
+            "keywords": ["gho_"],
         },
         {
             "id": "gh_token_ghu",
             "description": "GitHub user-to-server token (ghu_ prefix)",
-            "pattern": re.compile(r"ghu_[A-Za-z0-9_]{36,}"),
+            "pattern": LazyPattern(r"ghu_[A-Za-z0-9_]{36,}"),
             "score": 95,
+            "keywords": ["ghu_"],
         },
         {
             "id": "gh_token_ghs",
             "description": "GitHub server-to-server token (ghs_ prefix)",
-            "pattern": re.compile(r"ghs_[A-Za-z0-9_]{36,}"),
+            "pattern": LazyPattern(r"ghs_[A-Za-z0-9_]{36,}"),
             "score": 95,
+            "keywords": ["ghs_"],
         },
         {
             "id": "gh_token_ghr",
             "description": "GitHub refresh token (ghr_ prefix)",
-            "pattern": re.compile(r"ghr_[A-Za-z0-9_]{36,}"),
+            "pattern": LazyPattern(r"ghr_[A-Za-z0-9_]{36,}"),
             "score": 95,
+            "keywords": ["ghr_"],
         },
         {
             "id": "npm_authtoken",
             "description": "npm _authToken in .npmrc",
-            "pattern": re.compile(r"_authToken\s*=\s*[A-Za-z0-9\-_]{20,}"),
+            "pattern": LazyPattern(r"_authToken\s*=\s*[A-Za-z0-9\-_]{20,}"),
             "score": 90,
+            "keywords": ["_authToken"],
         },
         {
             "id": "npm_token_env",
             "description": "NPM_TOKEN environment variable assignment",
-            "pattern": re.compile(
+            "pattern": LazyPattern(
                 r'NPM_TOKEN\s*[:=]\s*["\']?([A-Za-z0-9\-_]{20,})["\']?'
             ),
             "score": 85,
+            "keywords": ["NPM_TOKEN"],
         },
         {
             "id": "vsce_pat",
             "description": "VS Code Marketplace VSCE_PAT (Azure DevOps PAT)",
-            "pattern": re.compile(
+            "pattern": LazyPattern(
                 r'VSCE_PAT\s*[:=]\s*["\']?([A-Za-z0-9\-_]{20,})["\']?'
             ),
             "score": 90,
+            "keywords": ["VSCE_PAT"],
         },
         {
             "id": "ovsx_pat",
             "description": "Open VSX OVSX_PAT (Azure DevOps PAT)",
-            "pattern": re.compile(
+            "pattern": LazyPattern(
                 r'OVSX_PAT\s*[:=]\s*["\']?([A-Za-z0-9\-_]{20,})["\']?'
             ),
             "score": 90,
+            "keywords": ["OVSX_PAT"],
         },
         {
             "id": "openvsx_token",
             "description": "Open VSX token reference",
-            "pattern": re.compile(
+            "pattern": LazyPattern(
                 r'OPENVSX_TOKEN\s*[:=]\s*["\']?([A-Za-z0-9\-_]{20,})["\']?'
             ),
             "score": 85,
+            "keywords": ["OPENVSX_TOKEN"],
         },
         {
             "id": "openvsx_pat",
             "description": "Open VSX PAT reference",
-            "pattern": re.compile(
+            "pattern": LazyPattern(
                 r'OPENVSX_PAT\s*[:=]\s*["\']?([A-Za-z0-9\-_]{20,})["\']?'
             ),
             "score": 85,
+            "keywords": ["OPENVSX_PAT"],
         },
         {
             "id": "github_token_generic",
             "description": "GITHUB_TOKEN with suspicious value",
-            "pattern": re.compile(
+            "pattern": LazyPattern(
                 r'GITHUB_TOKEN\s*[:=]\s*["\']?([A-Za-z0-9\-_]{20,})["\']?'
             ),
             "score": 70,
+            "keywords": ["GITHUB_TOKEN"],
         },
         {
             "id": "azure_client_secret",
             "description": "Azure client secret assignment",
-            "pattern": re.compile(
+            "pattern": LazyPattern(
                 r'AZURE_CLIENT_SECRET\s*[:=]\s*["\']?([A-Za-z0-9\-_~\.]{20,})["\']?'
             ),
             "score": 80,
+            "keywords": ["AZURE_CLIENT_SECRET"],
         },
         {
             "id": "aws_secret_key",
             "description": "AWS secret access key",
-            "pattern": re.compile(
+            "pattern": LazyPattern(
                 r'AWS_SECRET_ACCESS_KEY\s*[:=]\s*["\']?([A-Za-z0-9/+=]{40})["\']?'
             ),
             "score": 90,
+            "keywords": ["AWS_SECRET_ACCESS_KEY"],
         },
         {
             "id": "generic_api_key",
             "description": "Generic API key pattern",
-            "pattern": re.compile(
-                r'(?i)(api[_-]?key|apikey|access[_-]?key)\s*[:=]\s*["\']?([A-Za-z0-9\-_]{24,})["\']?'
+            "pattern": LazyPattern(
+                r'(?i)(api[_-]?key|apikey|access[_-]?key)["\']?\s*[:=]\s*["\']?([A-Za-z0-9\-_]{24,})["\']?'
             ),
             "score": 60,
+            "keywords": ["api", "key"],
         },
         {
             "id": "generic_secret",
             "description": "Generic secret pattern",
-            "pattern": re.compile(
-                r'(?i)(secret|password|passwd)\s*[:=]\s*["\']?([A-Za-z0-9\-_!@#$%^&*]{16,})["\']?'
+            "pattern": LazyPattern(
+                r'(?i)(secret|password|passwd)["\']?\s*[:=]\s*["\']?([A-Za-z0-9\-_!@#$%^&*]{16,})["\']?'
             ),
             "score": 50,
+            "keywords": ["secret", "password", "passwd"],
         },
         {
             "id": "private_key_header",
             "description": "Private key BEGIN header",
-            "pattern": re.compile(r"-----BEGIN [A-Z]+ PRIVATE KEY-----"),
+            "pattern": LazyPattern(r"-----BEGIN [A-Z]+ PRIVATE KEY-----"),
             "score": 85,
+            "keywords": ["-----BEGIN"],
         },
     ]
 
+
+_builtin: Optional[List[Dict]] = None
+_packs: Dict[str, Tuple[Tuple[int, int], List[Dict]]] = {}
+
+
+def get_rules(packs: Sequence[str] = ()) -> List[Dict]:
+    """
+    Return list of detection rules.
+
+    Built-in rules are built once per process and shared between calls, so
+    callers must not modify them. Rules from packs are appended in order; a
+    pack rule with the id of an earlier rule replaces it in place.
+
+    Each rule contains:
+        - id: unique identifier
+        - description: human readable description
+        - pattern: regex pattern (a LazyPattern, compiled on first use)
+        - score: base severity score (30-100)
+        - keywords: optional literal strings, one of which must occur in
+          any match; used by the engine to skip rules cheaply
+        - multiline: optional, lets matches span lines
+        - paths: optional .gitignore-style patterns; the rule only applies
+          to files matching one of them
+
+    Args:
+        packs: Rule-pack files (JSON, or YAML with PyYAML installed)
+
+    Raises:
+        ValueError: If a pack is malformed
+        OSError: If a pack cannot be read
+    """
+    global _builtin
+
+    if _builtin is None:
+        _builtin = _builtin_rules()
+    if not packs:
+        return list(_builtin)
+
+    rules = {rule["id"]: rule for rule in _builtin}
+    for path in packs:
+        for rule in load_rule_pack(path):
+            rules[rule["id"]] = rule
+    return list(rules.values())
+
+
+def pack_signature(path: str) -> Tuple[str, int, int]:
+    """Identify a rule-pack file by path, mtime and size."""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def load_rule_pack(path: str) -> List[Dict]:
+    """
+    Load the rules of a rule-pack file, reusing them while it is unchanged.
+
+    A pack is a list of rules, or an object with a 'rules' list. Each rule
+    needs 'id', 'pattern' and 'score', and may set 'description',
+    'keywords', 'multiline', 'ignore_case' and 'paths'.
+
+    Raises:
+        ValueError: If the pack is malformed
+        OSError: If the pack cannot be read
+    """
+    key, mtime, size = pack_signature(path)
+    cached = _packs.get(key)
+    if cached is not None and cached[0] == (mtime, size):
+        return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yml", ".yaml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError(
+                    f"{path}: YAML rule packs need PyYAML (pip install pyyaml)"
+                ) from None
+            try:
+                data = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"{path}: {e}") from None
+        else:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}: {e}") from None
+
+    if isinstance(data, dict):
+        data = data.get("rules")
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of rules or a 'rules' list")
+
+    rules = [_parse_pack_rule(path, index, entry) for index, entry in enumerate(data)]
+    _packs[key] = ((mtime, size), rules)
     return rules
 
 
+def _string_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def _parse_pack_rule(path: str, index: int, entry: Any) -> Dict:
+    """Validate one rule-pack entry and build its rule dict."""
+    where = f"{path}: rule {index + 1}"
+    if not isinstance(entry, dict):
+        raise ValueError(f"{where}: expected an object")
+
+    unknown = set(entry) - RULE_PACK_FIELDS
+    if unknown:
+        raise ValueError(f"{where}: unknown field(s) {', '.join(sorted(unknown))}")
+    for field in ("id", "pattern"):
+        if not isinstance(entry.get(field), str) or not entry[field]:
+            raise ValueError(f"{where}: '{field}' must be a non-empty string")
+    score = entry.get("score")
+    if isinstance(score, bool) or not isinstance(score, int) or not 0 <= score <= 100:
+        raise ValueError(f"{where}: 'score' must be an integer from 0 to 100")
+    for field in ("keywords", "paths"):
+        if field in entry and not _string_list(entry[field]):
+            raise ValueError(f"{where}: '{field}' must be a list of strings")
+
+    flags = re.IGNORECASE if entry.get("ignore_case") else 0
+    try:
+        # Checked now, but the rule keeps compiling lazily on first use
+        re.compile(entry["pattern"], flags)
+    except re.error as e:
+        raise ValueError(f"{where}: invalid pattern: {e}") from None
+    rule = {
+        "id": entry["id"],
+        "description": entry.get("description", entry["id"]),
+        "pattern": LazyPattern(entry["pattern"], flags),
+        "score": score,
+    }
+    if entry.get("keywords"):
+        rule["keywords"] = entry["keywords"]
+    if entry.get("multiline"):
+        rule["multiline"] = True
+    if entry.get("paths"):
+        rule["paths"] = entry["paths"]
+    return rule
+
+
+def path_boost(file_path: str) -> int:
+    """
+    Return the score boost for a file path: +10 in high-risk locations.
+
+    Args:
+        file_path: Relative file path
+
+    Returns:
+        PATH_BOOST or 0
+    """
+    normalized_path = file_path.lower().replace("\\", "/")
+
+    for risk_path in HIGH_RISK_PATHS:
+        if risk_path in normalized_path:
+            return PATH_BOOST
+
+    return 0
+
+
 def apply_path_boost(base_score: int, file_path: str) -> int:
     """
     Apply +10 score boost if file path matches high-risk locations.
 
+    Scans get the boost once per file from RuleSet.for_path instead.
+
     Args:
         base_score: Original rule score
         file_path: Relative file path
@@ -181,13 +400,89 @@ def apply_path_boost(base_score: int, file_path: str) -> int:
     Returns:
         Boosted score (capped at 100)
     """
-    normalized_path = file_path.lower().replace("\\", "/")
+    boost = path_boost(file_path)
+    return min(base_score + boost, 100) if boost else base_score
 
-    for risk_path in HIGH_RISK_PATHS:
-        if risk_path in normalized_path:
-            return min(base_score + PATH_BOOST, 100)
 
-    return base_score
+class Allowlist:
+    """
+    In-memory allowlist index.
+
+    Parses the allowlist file once into a set of literal tokens and a set
+    of SHA-256 digests, so each match is checked in O(1). Lines of the
+    form 'sha256:<hex>' let fixtures be allowlisted without storing the
+    raw token. refresh() reloads the file only when its mtime changes.
+    """
+
+    def __init__(self, path: str = ALLOWLIST_PATH):
+        self.path = path
+        self.tokens: Set[str] = set()
+        self.digests: Set[str] = set()
+        self._signature: Optional[Tuple[int, int]] = None
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """
+        Reload the allowlist if the file changed since it was last read.
+
+        Returns:
+            True if the in-memory entries were replaced
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            # A missing allowlist allows nothing
+            had_entries = self._signature is not None
+            self.tokens, self.digests, self._signature = set(), set(), None
+            return had_entries
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+
+        tokens, digests = set(), set()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    if line.lower().startswith(DIGEST_PREFIX):
+                        digests.add(line[len(DIGEST_PREFIX) :].strip().lower())
+                    else:
+                        tokens.add(line)
+        except (IOError, OSError):
+            return False
+
+        self.tokens, self.digests, self._signature = tokens, digests, signature
+        return True
+
+    def __contains__(self, token: str) -> bool:
+        if token in self.tokens:
+            return True
+        if self.digests:
+            digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+            return digest in self.digests
+        return False
+
+    def __len__(self) -> int:
+        return len(self.tokens) + len(self.digests)
+
+
+_default_allowlist: Optional[Allowlist] = None
+
+
+def get_default_allowlist() -> Allowlist:
+    """
+    Return the shared allowlist for allowlist.txt, refreshed if it changed.
+    """
+    global _default_allowlist
+
+    if _default_allowlist is None:
+        _default_allowlist = Allowlist()
+    else:
+        _default_allowlist.refresh()
+    return _default_allowlist
 
 
 def check_allowlist(token: str) -> bool:
@@ -195,7 +490,7 @@ def check_allowlist(token: str) -> bool:
     Check if token is in allowlist.
 
     Reads from allowlist.txt in repository root if present.
-    Each line is a literal string to skip.
+    Each line is a literal string to skip, or 'sha256:<hex>' digest.
 
     Args:
         token: The matched token string
@@ -203,19 +498,4 @@ def check_allowlist(token: str) -> bool:
     Returns:
         True if token should be skipped (is in allowlist)
     """
-    allowlist_path = "allowlist.txt"
-
-    if not os.path.exists(allowlist_path):
-        return False
-
-    try:
-        with open(allowlist_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith("#"):
-                    if token == line:
-                        return True
-    except (IOError, OSError):
-        pass
-
-    return False
+    return token in get_default_allowlist()
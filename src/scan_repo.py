@@ -10,139 +10,1568 @@ Licensed under the MIT License
 """
 
 import argparse
+import hashlib
+import io
+import itertools
+import json
 import os
+import sqlite3
 import sys
-from typing import List, Dict, Any
+import time
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Union,
+)
 
-from src.rules import get_rules, apply_path_boost, check_allowlist
-from src.report import generate_json_report, generate_csv_report
-from src.utils import is_binary_file, redact_token, fetch_repo_files
+from src.batch import Checkpoint, list_org_repos, read_targets_file, report_name
+from src.cache import DEFAULT_CACHE_SIZE, ResultCache, scan_fingerprint
+from src.engine import Buffer, LineIndex, PathRules, RuleSet, get_ruleset
+from src.rules import (
+    ALLOWLIST_PATH,
+    Allowlist,
+    get_default_allowlist,
+)
+from src.report import (
+    CsvReportSink,
+    JsonLinesSink,
+    JsonReportSink,
+    ReportSummary,
+    generate_json_report,
+    write_findings,
+)
+from src.gitscan import CatFile, changed_blobs, history_blobs, staged_blobs
+from src.profiler import Profiler
+from src.utils import (
+    BINARY_SNIFF_SIZE,
+    DEFAULT_ARCHIVE_DEPTH,
+    DEFAULT_FETCH_CONCURRENCY,
+    archive_kind,
+    decode_text,
+    detect_encoding,
+    is_binary_content,
+    is_generated_content,
+    is_generated_name,
+    normalize_newlines,
+    read_token_file,
+    redact_token,
+)
+from src.packages import MAX_MANIFEST_SIZE, PackageIndex, is_manifest, package_id
+from src.walker import SKIP_DIRS, FileWalker
 
+# Upper bound on files handed to a pool worker per task
+MAX_BATCH_SIZE = 64
 
-def scan_file(file_path: str, content: str, rules: List[Dict]) -> List[Dict[str, Any]]:
+# Approximate per-file memory bound; larger files are streamed in chunks
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Repositories scanned at the same time in --org / --repos-file mode
+DEFAULT_REPO_CONCURRENCY = 4
+
+
+def _make_finding(
+    path_rules: PathRules,
+    rule: Dict,
+    line_num: int,
+    line: str,
+    matched_text: str,
+    sampled: bool = False,
+    column: int = 0,
+) -> Dict[str, Any]:
+    """Build a finding record with path boost, redaction and snippet."""
+    # Path boost is computed once per file, on its first finding
+    score = min(rule["score"] + path_rules.boost, 100)
+
+    # Create snippet (80 char context) from the line the match starts on;
+    # sampled files have huge lines, so start it just before the match
+    if sampled:
+        snippet = line[max(0, column - 20) : column + 60].strip()
+    else:
+        snippet = line.strip()[:80]
+
+    finding = {
+        "path": path_rules.path,
+        "line": line_num,
+        "rule_id": rule["id"],
+        "desc": rule["description"],
+        "match": redact_token(matched_text),
+        "score": score,
+        "snippet": snippet,
+    }
+    if sampled:
+        finding["sampled"] = True
+    return finding
+
+
+def _decode_line(line: bytes, column: int) -> Tuple[str, int]:
+    """Decode a matched line as UTF-8, turning a byte column into a char column."""
+    return (
+        line.decode("utf-8", errors="ignore"),
+        len(line[:column].decode("utf-8", errors="ignore")),
+    )
+
+
+def scan_file(
+    file_path: str,
+    content: Buffer,
+    rules: Union[List[Dict], RuleSet],
+    allowlist: Optional[Allowlist] = None,
+    profiler: Optional[Profiler] = None,
+    sampled: bool = False,
+) -> List[Dict[str, Any]]:
     """
     Scan a single file content against all rules.
 
+    Rules are prefiltered by their literal keywords, then each candidate
+    pattern runs once over the whole buffer. Match offsets are mapped to
+    line numbers and snippets are only built for lines with findings.
+
+    Content given as bytes is matched without decoding it (the rule set
+    must be byte_safe, and line endings already LF); only matched tokens
+    and their lines are decoded, as UTF-8.
+
+    Sampled scans (for minified or generated content) only match windows
+    around rule keywords and tag their findings with 'sampled'.
+
     Args:
         file_path: Relative path of the file being scanned
-        content: File content as string
-        rules: List of detection rules
+        content: File content as string, or as UTF-8 bytes
+        rules: List of detection rules or a compiled RuleSet
+        allowlist: Allowlist index (defaults to the shared allowlist.txt)
+        profiler: Optional collector of per-rule timings
+        sampled: Use keyword-anchored sampled matching
 
     Returns:
         List of findings with path, line, rule_id, desc, match, score, snippet
     """
+    ruleset = rules if isinstance(rules, RuleSet) else RuleSet(rules)
+    if allowlist is None:
+        allowlist = get_default_allowlist()
+    binary = not isinstance(content, str)
+    path_rules = ruleset.for_path(file_path)
     findings = []
-    lines = content.split("\n")
+    line_index = LineIndex(content)
 
-    for rule in rules:
-        pattern = rule["pattern"]
-        for line_num, line in enumerate(lines, start=1):
-            matches = pattern.finditer(line)
-            for match in matches:
-                matched_text = match.group(0)
+    matches = ruleset.iter_matches(content, profiler, sampled, file_path)
+    for rule, offset, matched_text in matches:
+        if binary:
+            matched_text = matched_text.decode("utf-8", errors="ignore")
 
-                # Check allowlist
-                if check_allowlist(matched_text):
-                    continue
+        # Check allowlist
+        if matched_text in allowlist:
+            continue
+
+        line_num = line_index.line_number(offset)
+        line = line_index.line_text(line_num)
+        column = offset - line_index.line_start(line_num)
+        if binary:
+            line, column = _decode_line(line, column)
+        findings.append(
+            _make_finding(
+                path_rules, rule, line_num, line, matched_text, sampled, column
+            )
+        )
+
+    return findings
+
+
+def scan_stream(
+    file_path: str,
+    stream: Union[TextIO, BinaryIO],
+    rules: Union[List[Dict], RuleSet],
+    allowlist: Optional[Allowlist] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    profiler: Optional[Profiler] = None,
+    sampled: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Scan a text stream in fixed-size chunks with bounded memory.
+
+    Consecutive windows overlap by the longest possible rule match, so
+    tokens straddling a chunk boundary are still found. Each match is only
+    accepted by the window in which it starts before the overlap region,
+    and line numbers are carried forward from window to window.
+
+    The overlap is extended back to the start of its line (by at most
+    another overlap length), so snippets only lose context on lines that
+    are longer than that.
+
+    A binary stream is matched as raw bytes, like bytes content in
+    scan_file; its line endings are normalized to LF as chunks are read.
 
-                # Calculate score with path boost
-                score = apply_path_boost(rule["score"], file_path)
+    Args:
+        file_path: Relative path of the file being scanned
+        stream: Text stream, or binary stream of UTF-8 content, to read from
+        rules: List of detection rules or a compiled RuleSet
+        allowlist: Allowlist index (defaults to the shared allowlist.txt)
+        chunk_size: Characters (or bytes) read per chunk
+        profiler: Optional collector of per-rule timings; the file is
+            recorded with its read and match time and size in characters
+            (or bytes)
+        sampled: Use keyword-anchored sampled matching in every window
+
+    Returns:
+        List of findings, in the same shape as scan_file
+    """
+    ruleset = rules if isinstance(rules, RuleSet) else RuleSet(rules)
+    if allowlist is None:
+        allowlist = get_default_allowlist()
+    overlap = ruleset.max_match_length
+    rule_order = {rule["id"]: index for index, rule in enumerate(ruleset.rules)}
+    path_rules = ruleset.for_path(file_path)
+    findings = []
+
+    def read_chunk() -> Buffer:
+        chunk = stream.read(chunk_size)
+        if isinstance(chunk, bytes) and b"\r" in chunk:
+            # Keep each CRLF pair within one chunk so it becomes a single LF
+            while chunk.endswith(b"\r"):
+                extra = stream.read(1)
+                if not extra:
+                    break
+                chunk += extra
+            chunk = normalize_newlines(chunk)
+        return chunk
+
+    carry: Optional[Buffer] = None
+    base_offset = 0  # Absolute offset of the current window
+    base_line = 1  # Line number at the start of the current window
+    accept_from = 0  # Matches starting earlier belong to previous windows
+    last_end: Dict[str, int] = {}  # Absolute end of each rule's last match
+    started = time.perf_counter() if profiler is not None else 0.0
+    read_seconds = 0.0
+
+    while True:
+        if profiler is None:
+            chunk = read_chunk()
+        else:
+            read_started = time.perf_counter()
+            chunk = read_chunk()
+            read_seconds += time.perf_counter() - read_started
+        if carry is None:
+            binary = not isinstance(chunk, str)
+            newline = b"\n" if binary else "\n"
+            carry = chunk[:0]
+        final = not chunk
+        text = carry + chunk
+
+        # Matches starting in the overlap are picked up by the next window
+        limit = len(text) if final else max(0, len(text) - overlap)
+        line_index = LineIndex(text)
+
+        matches = ruleset.iter_matches(text, profiler, sampled, file_path)
+        for rule, offset, matched_text in matches:
+            start = base_offset + offset
+            if offset >= limit or start < accept_from:
+                continue
+            if start < last_end.get(rule["id"], 0):
+                continue
+            last_end[rule["id"]] = start + len(matched_text)
 
-                # Create snippet (80 char context)
-                snippet = line.strip()[:80]
+            if binary:
+                matched_text = matched_text.decode("utf-8", errors="ignore")
+            if matched_text in allowlist:
+                continue
+
+            window_line = line_index.line_number(offset)
+            line = line_index.line_text(window_line)
+            column = offset - line_index.line_start(window_line)
+            if binary:
+                line, column = _decode_line(line, column)
+            findings.append(
+                _make_finding(
+                    path_rules,
+                    rule,
+                    base_line + window_line - 1,
+                    line,
+                    matched_text,
+                    sampled,
+                    column,
+                )
+            )
+
+        if final:
+            break
 
-                finding = {
-                    "path": file_path,
-                    "line": line_num,
-                    "rule_id": rule["id"],
-                    "desc": rule["description"],
-                    "match": redact_token(matched_text),
-                    "score": score,
-                    "snippet": snippet,
-                }
-                findings.append(finding)
+        # Carry the overlap, plus the start of its line for snippet context
+        keep = max(text.rfind(newline, 0, limit) + 1, limit - overlap)
+        base_line += text.count(newline, 0, keep)
+        accept_from = base_offset + limit
+        base_offset += keep
+        carry = text[keep:]
 
+    # Windows interleave rules; a stable sort restores scan_file's rule order
+    findings.sort(key=lambda finding: rule_order[finding["rule_id"]])
+
+    if profiler is not None:
+        elapsed = time.perf_counter() - started
+        profiler.add_file(
+            file_path, base_offset + len(text), read_seconds, elapsed - read_seconds
+        )
     return findings
 
 
-def scan_path(root_path: str) -> List[Dict[str, Any]]:
+def iter_local_files(
+    root_path: str, walker: Optional[FileWalker] = None
+) -> Iterator[Tuple[str, str, int]]:
     """
-    Recursively scan a local directory for token leaks.
+    Walk a local directory in sorted order.
 
     Args:
-        root_path: Path to scan
+        root_path: Path to walk
+        walker: File walker with the scan's filters (defaults to FileWalker())
+
+    Yields:
+        (full_path, rel_path, size) for every file the walker does not prune
+    """
+    if walker is None:
+        walker = FileWalker()
+    return walker.walk(root_path)
+
+
+def _cache_records(findings: List[Dict[str, Any]]) -> List[List[Any]]:
+    """Reduce findings to the path-independent fields stored in the cache."""
+    return [
+        [f["line"], f["rule_id"], f["match"], f["snippet"], "sampled" in f]
+        for f in findings
+    ]
+
+
+def _restore_findings(
+    file_path: str, records: List[List[Any]], rules: RuleSet
+) -> List[Dict[str, Any]]:
+    """Rebuild findings for file_path from cached records."""
+    path_rules = rules.for_path(file_path)
+    findings = []
+    for line_num, rule_id, match, snippet, sampled in records:
+        rule = rules.by_id[rule_id]
+        finding = {
+            "path": file_path,
+            "line": line_num,
+            "rule_id": rule_id,
+            "desc": rule["description"],
+            "match": match,
+            "score": min(rule["score"] + path_rules.boost, 100),
+            "snippet": snippet,
+        }
+        if sampled:
+            finding["sampled"] = True
+        findings.append(finding)
+    return findings
+
+
+def _cache_key(digest: str, path: str, rules: RuleSet) -> str:
+    """
+    Build the cache key for content at path.
+
+    The digest pins the content, and with it the content-based minified
+    check; path-scoped rules and generated filenames (which switch the scan
+    to sampled matching) make the results depend on the path as well.
+    """
+    mode = ":sampled" if is_generated_name(path) else ""
+    return digest + rules.scope_key(path) + mode
+
+
+def scan_content(
+    file_path: str,
+    f: BinaryIO,
+    size: int,
+    rules: RuleSet,
+    allowlist: Allowlist,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    cache: Optional[ResultCache] = None,
+    digest: Optional[str] = None,
+    profiler: Optional[Profiler] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Scan content read from a binary stream (a local file or a git blob).
+
+    Content bigger than a quarter of memory_limit is streamed through
+    scan_stream in chunks of an eighth of it, which leaves room for the
+    window overlap and the line index. Minified or generated content (see
+    is_generated_content) is scanned sampled.
+
+    UTF-8 content is matched as raw bytes, so ASCII files without findings
+    are never decoded. Non-ASCII UTF-8 is matched as text by the engine,
+    and UTF-16/UTF-32 content (see detect_encoding) and rule sets with
+    non-ASCII patterns fall back to matching decoded text.
+
+    With a cache, content is looked up by digest first (computed from the
+    bytes when not supplied) and matching is skipped entirely when the same
+    content was scanned before.
+
+    Args:
+        file_path: Path reported in findings
+        f: Binary stream positioned at the start of the content
+        size: Content size in bytes
+        rules: Compiled rule set
+        allowlist: Allowlist index
+        memory_limit: Approximate peak memory in bytes to spend on the content
+        cache: Result cache for unchanged content
+        digest: Content digest to use as the cache key
+        profiler: Optional collector of per-rule and per-file timings
 
     Returns:
-        List of all findings
+        List of findings for the content
     """
-    rules = get_rules()
-    all_findings = []
-
-    for dirpath, dirnames, filenames in os.walk(root_path):
-        # Skip common non-code directories
-        dirnames[:] = [
-            d
-            for d in dirnames
-            if d
-            not in {
-                ".git",
-                "node_modules",
-                "__pycache__",
-                ".venv",
-                "venv",
-                "dist",
-                "build",
-            }
-        ]
-
-        for filename in filenames:
-            full_path = os.path.join(dirpath, filename)
-            rel_path = os.path.relpath(full_path, root_path)
+    if cache is not None and digest is not None:
+        records = cache.get(_cache_key(digest, file_path, rules))
+        if records is not None:
+            return _restore_findings(file_path, records, rules)
 
-            # Skip binary files
-            if is_binary_file(full_path):
-                continue
+    head = f.peek(BINARY_SNIFF_SIZE)
+    encoding = detect_encoding(head)
+    binary = encoding is None and rules.byte_safe
 
-            try:
-                with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-                    findings = scan_file(rel_path, content, rules)
-                    all_findings.extend(findings)
-            except (IOError, OSError) as e:
-                print(f"Warning: Could not read {rel_path}: {e}", file=sys.stderr)
+    if size > memory_limit // 4:
+        sampled = is_generated_content(file_path, head, encoding, size)
+        chunk_size = max(4 * rules.max_match_length, memory_limit // 8)
+        if binary:
+            findings = scan_stream(
+                file_path, f, rules, allowlist, chunk_size, profiler, sampled
+            )
+        else:
+            stream = io.TextIOWrapper(
+                f,
+                encoding=encoding or "utf-8",
+                errors="ignore" if encoding is None else "replace",
+            )
+            findings = scan_stream(
+                file_path, stream, rules, allowlist, chunk_size, profiler, sampled
+            )
+            stream.detach()
+    else:
+        started = time.perf_counter() if profiler is not None else 0.0
+        raw = f.read()
+        if cache is not None and digest is None:
+            digest = hashlib.sha256(raw).hexdigest()
+            records = cache.get(_cache_key(digest, file_path, rules))
+            if records is not None:
+                return _restore_findings(file_path, records, rules)
+
+        sampled = is_generated_content(file_path, raw, encoding)
+        content = normalize_newlines(raw) if binary else decode_text(raw)
+        if profiler is not None:
+            decoded = time.perf_counter()
+        findings = scan_file(file_path, content, rules, allowlist, profiler, sampled)
+        if profiler is not None:
+            profiler.add_file(
+                file_path, size, decoded - started, time.perf_counter() - decoded
+            )
+
+    if cache is not None and digest is not None:
+        cache.put(_cache_key(digest, file_path, rules), _cache_records(findings))
+    return findings
+
+
+def scan_archive(
+    archive_path: str,
+    f: BinaryIO,
+    rules: RuleSet,
+    allowlist: Allowlist,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    cache: Optional[ResultCache] = None,
+    profiler: Optional[Profiler] = None,
+    depth: int = DEFAULT_ARCHIVE_DEPTH,
+) -> List[Dict[str, Any]]:
+    """
+    Scan the text members of a .vsix/.zip or .tar/.tgz package in memory.
+
+    Members are streamed out of the archive into scan_content, so they are
+    cached and chunked like files on disk, and reported as
+    'archive!member/path'. Nested archives are opened up to depth levels.
+
+    Args:
+        archive_path: Path of the archive reported in findings
+        f: Binary stream of the archive (seekable for zip files)
+        rules: Compiled rule set
+        allowlist: Allowlist index
+        memory_limit: Approximate peak memory in bytes to spend on a member
+        cache: Result cache for unchanged members
+        profiler: Optional collector of per-rule and per-member timings
+        depth: Archive levels to open, including this one
+
+    Returns:
+        List of findings for every member
+    """
+    from src.archive import iter_archive_members
+
+    members = iter_archive_members(archive_path, f, depth, memory_limit // 4)
+    return scan_archive_members(
+        members, rules, allowlist, memory_limit, cache, profiler
+    )
+
+
+def scan_archive_members(
+    members: Iterable[Tuple[str, int, BinaryIO]],
+    rules: RuleSet,
+    allowlist: Allowlist,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    cache: Optional[ResultCache] = None,
+    profiler: Optional[Profiler] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Scan (member_path, size, reader) items from iter_archive_members.
+
+    Binary members are skipped; a member that fails to decompress is
+    reported and skipped without ending the scan of the others.
+
+    Returns:
+        List of findings for every member
+    """
+    from src.archive import ARCHIVE_ERRORS
+
+    findings = []
+    for member_path, size, reader in members:
+        try:
+            if is_binary_content(reader.peek(BINARY_SNIFF_SIZE)):
                 continue
+            findings.extend(
+                scan_content(
+                    member_path,
+                    reader,
+                    size,
+                    rules,
+                    allowlist,
+                    memory_limit,
+                    cache,
+                    profiler=profiler,
+                )
+            )
+        except ARCHIVE_ERRORS as e:
+            print(f"Warning: Could not read {member_path}: {e}", file=sys.stderr)
+    return findings
+
 
-    return all_findings
+def scan_local_file(
+    full_path: str,
+    rel_path: str,
+    rules: RuleSet,
+    allowlist: Allowlist,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    cache: Optional[ResultCache] = None,
+    profiler: Optional[Profiler] = None,
+    size: Optional[int] = None,
+    archive_depth: int = DEFAULT_ARCHIVE_DEPTH,
+) -> List[Dict[str, Any]]:
+    """
+    Read and scan one local file, skipping binaries and unreadable files.
 
+    The file is opened once: the binary sniff peeks at the same buffered
+    handle that is then scanned. Packages and archives are scanned member
+    by member with scan_archive.
 
-def scan_remote(repo: str, github_token: str) -> List[Dict[str, Any]]:
+    Args:
+        full_path: Path used to open the file
+        rel_path: Path reported in findings
+        rules: Compiled rule set
+        allowlist: Allowlist index
+        memory_limit: Approximate peak memory in bytes to spend on the file
+        cache: Result cache for unchanged content
+        profiler: Optional collector of per-rule and per-file timings
+        size: File size from the directory walk, saving an fstat
+        archive_depth: Archive levels to open (0 treats archives as binary)
+
+    Returns:
+        List of findings for the file
     """
-    Scan a remote GitHub repository via API.
+    try:
+        with open(full_path, "rb") as f:
+            if archive_depth > 0 and archive_kind(rel_path) is not None:
+                return scan_archive(
+                    rel_path,
+                    f,
+                    rules,
+                    allowlist,
+                    memory_limit,
+                    cache,
+                    profiler,
+                    archive_depth,
+                )
+
+            # Skip binary files
+            if is_binary_content(f.peek(BINARY_SNIFF_SIZE)):
+                return []
+
+            if size is None:
+                size = os.fstat(f.fileno()).st_size
+            digest = None
+            if cache is not None and size > memory_limit // 4:
+                # Hash large files up front so a cache hit never decodes them
+                digest = hashlib.file_digest(f, "sha256").hexdigest()
+                f.seek(0)
+            return scan_content(
+                rel_path,
+                f,
+                size,
+                rules,
+                allowlist,
+                memory_limit,
+                cache,
+                digest,
+                profiler,
+            )
+    except (IOError, OSError) as e:
+        print(f"Warning: Could not read {rel_path}: {e}", file=sys.stderr)
+        return []
+
+
+# Per-process state for parallel scans, built once by _init_worker so the
+# compiled rules are never pickled per task
+_worker_rules: Optional[RuleSet] = None
+_worker_allowlist: Optional[Allowlist] = None
+_worker_memory_limit = DEFAULT_MEMORY_LIMIT
+_worker_cache: Optional[ResultCache] = None
+_worker_cat_file: Optional[CatFile] = None
+_worker_profiler: Optional[Profiler] = None
+_worker_archive_depth = DEFAULT_ARCHIVE_DEPTH
+
+
+def _init_worker(
+    allowlist_path: str,
+    memory_limit: int,
+    cache_dir: Optional[str],
+    repo_path: Optional[str] = None,
+    profile: bool = False,
+    rule_packs: Sequence[str] = (),
+    archive_depth: int = DEFAULT_ARCHIVE_DEPTH,
+) -> None:
+    """
+    Build rules, load the allowlist and open the cache once per worker.
+
+    Workers scanning git blobs also start their own cat-file process, and
+    profiled scans get a per-worker profiler whose data is returned with
+    each batch. The cache and the cat-file process are closed when the
+    worker exits.
+    """
+    # atexit does not run in forked pool workers; multiprocessing finalizers do
+    from multiprocessing.util import Finalize
+
+    global _worker_rules, _worker_allowlist, _worker_memory_limit
+    global _worker_cache, _worker_cat_file, _worker_profiler, _worker_archive_depth
+
+    _worker_rules = get_ruleset(rule_packs)
+    _worker_allowlist = Allowlist(allowlist_path)
+    _worker_memory_limit = memory_limit
+    _worker_archive_depth = archive_depth
+    if cache_dir is not None:
+        _worker_cache = ResultCache(
+            scan_fingerprint(_worker_rules, _worker_allowlist), cache_dir
+        )
+        Finalize(None, _worker_cache.close, exitpriority=10)
+    if repo_path is not None:
+        _worker_cat_file = CatFile(repo_path)
+        Finalize(None, _worker_cat_file.close, exitpriority=10)
+    if profile:
+        _worker_profiler = Profiler()
+
+
+def _worker_profile() -> Optional[Dict[str, Any]]:
+    """Hand the worker's timings since the last batch back to the parent."""
+    if _worker_profiler is None:
+        return None
+    return _worker_profiler.snapshot(reset=True)
+
+
+def _scan_batch(
+    batch: List[Tuple[str, str, int]],
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Scan a batch of (full_path, rel_path, size) triples inside a pool worker.
+
+    Returns:
+        (findings, profile snapshot or None)
+    """
+    findings = []
+    for full_path, rel_path, size in batch:
+        findings.extend(
+            scan_local_file(
+                full_path,
+                rel_path,
+                _worker_rules,
+                _worker_allowlist,
+                _worker_memory_limit,
+                _worker_cache,
+                _worker_profiler,
+                size,
+                _worker_archive_depth,
+            )
+        )
+    if _worker_cache is not None:
+        _worker_cache.flush()
+    return findings, _worker_profile()
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split items into consecutive lists of at most size elements."""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_scan_path(
+    root_path: str,
+    allowlist: Optional[Allowlist] = None,
+    jobs: int = 1,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    cache: Optional[ResultCache] = None,
+    profiler: Optional[Profiler] = None,
+    walker: Optional[FileWalker] = None,
+    rules: Optional[RuleSet] = None,
+    archive_depth: int = DEFAULT_ARCHIVE_DEPTH,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Recursively scan a local directory for token leaks, yielding findings.
+
+    With jobs > 1 files are scanned in batches by a process pool. Batches
+    are collected in submission order, so findings come back in the same
+    path order as a serial scan.
 
     Args:
-        repo: Repository in format 'owner/name'
-        github_token: GitHub API token for authentication
+        root_path: Path to scan
+        allowlist: Allowlist index, loaded once for the whole scan
+        jobs: Number of worker processes (0 uses every CPU)
+        memory_limit: Approximate per-file memory bound in bytes
+        cache: Result cache; unchanged files reuse their stored findings
+        profiler: Optional collector of per-rule and per-file timings
+        walker: File walker with .gitignore, exclude/include and size filters
+        rules: Rule set (defaults to the built-in rules)
+        archive_depth: Archive levels to open inside packages (0 disables)
+
+    Yields:
+        Findings in path order
+    """
+    if allowlist is None:
+        allowlist = get_default_allowlist()
+    if rules is None:
+        rules = get_ruleset()
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    if jobs <= 1:
+        for full_path, rel_path, size in iter_local_files(root_path, walker):
+            yield from scan_local_file(
+                full_path,
+                rel_path,
+                rules,
+                allowlist,
+                memory_limit,
+                cache,
+                profiler,
+                size,
+                archive_depth,
+            )
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        files = list(iter_local_files(root_path, walker))
+        profile = profiler is not None
+        # Several batches per worker keeps the pool busy when file sizes vary
+        batch_size = max(1, min(MAX_BATCH_SIZE, len(files) // (jobs * 4)))
+        cache_dir = cache.cache_dir if cache is not None else None
+
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(
+                allowlist.path,
+                memory_limit,
+                cache_dir,
+                None,
+                profile,
+                rules.packs,
+                archive_depth,
+            ),
+        ) as executor:
+            batches = _batched(files, batch_size)
+            for findings, timings in executor.map(_scan_batch, batches):
+                if profiler is not None:
+                    profiler.merge(timings)
+                yield from findings
+
+    if cache is not None:
+        cache.evict()
+
+
+def scan_path(root_path: str, *args, **kwargs) -> List[Dict[str, Any]]:
+    """
+    Recursively scan a local directory for token leaks.
+
+    Collects iter_scan_path into a list; remaining arguments are passed
+    through.
 
     Returns:
         List of all findings
     """
-    rules = get_rules()
-    all_findings = []
+    return list(iter_scan_path(root_path, *args, **kwargs))
+
+
+def scan_package(
+    full_path: str,
+    rel_path: str,
+    rules: RuleSet,
+    allowlist: Allowlist,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    cache: Optional[ResultCache] = None,
+    profiler: Optional[Profiler] = None,
+    archive_depth: int = DEFAULT_ARCHIVE_DEPTH,
+) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+    """
+    Scan one package artifact and name the package its findings came from.
+
+    The top-level package.json is captured as it streams past, so the
+    identity costs no second pass over the archive.
+
+    Args:
+        full_path: Path used to open the artifact
+        rel_path: Artifact path reported in findings
+        rules: Compiled rule set
+        allowlist: Allowlist index
+        memory_limit: Approximate peak memory in bytes to spend on a member
+        cache: Result cache for unchanged members
+        profiler: Optional collector of per-rule and per-member timings
+        archive_depth: Archive levels to open, including the artifact
+
+    Returns:
+        (package identity, findings tagged with 'package'); findings are
+        None when the artifact could not be read
+    """
+    from src.archive import MEMBER_SEPARATOR, iter_archive_members
+
+    manifests: List[bytes] = []
+    prefix_length = len(rel_path) + len(MEMBER_SEPARATOR)
+
+    def capture_manifest(
+        members: Iterable[Tuple[str, int, BinaryIO]],
+    ) -> Iterator[Tuple[str, int, BinaryIO]]:
+        for member_path, size, reader in members:
+            name = member_path[prefix_length:]
+            if (
+                not manifests
+                and MEMBER_SEPARATOR not in name
+                and is_manifest(name)
+                and size <= MAX_MANIFEST_SIZE
+            ):
+                manifests.append(reader.read())
+                reader = io.BufferedReader(io.BytesIO(manifests[0]))
+            yield member_path, size, reader
+
+    try:
+        with open(full_path, "rb") as f:
+            members = iter_archive_members(
+                rel_path, f, archive_depth, memory_limit // 4
+            )
+            findings = scan_archive_members(
+                capture_manifest(members),
+                rules,
+                allowlist,
+                memory_limit,
+                cache,
+                profiler,
+            )
+    except (IOError, OSError) as e:
+        print(f"Warning: Could not read {rel_path}: {e}", file=sys.stderr)
+        return package_id(rel_path), None
+
+    package = package_id(rel_path, manifests[0] if manifests else None)
+    for finding in findings:
+        finding["package"] = package
+    return package, findings
+
+
+def _scan_package_batch(
+    batch: List[Tuple[str, str]],
+) -> Tuple[List[Tuple[str, Optional[List[Dict[str, Any]]]]], Optional[Dict[str, Any]]]:
+    """
+    Scan a batch of (full_path, rel_path) artifacts inside a pool worker.
+
+    Returns:
+        ((package, findings) per artifact, profile snapshot or None)
+    """
+    results = [
+        scan_package(
+            full_path,
+            rel_path,
+            _worker_rules,
+            _worker_allowlist,
+            _worker_memory_limit,
+            _worker_cache,
+            _worker_profiler,
+            _worker_archive_depth,
+        )
+        for full_path, rel_path in batch
+    ]
+    if _worker_cache is not None:
+        _worker_cache.flush()
+    return results, _worker_profile()
+
+
+def iter_scan_packages(
+    root_path: str,
+    out_dir: str,
+    allowlist: Optional[Allowlist] = None,
+    jobs: int = 1,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    cache: Optional[ResultCache] = None,
+    profiler: Optional[Profiler] = None,
+    walker: Optional[FileWalker] = None,
+    rules: Optional[RuleSet] = None,
+    archive_depth: int = DEFAULT_ARCHIVE_DEPTH,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Scan the package artifacts of a registry mirror, yielding findings.
+
+    Every .tgz/.vsix/.zip/.tar artifact under root_path is one scan unit.
+    Artifacts recorded in the PackageIndex in out_dir with the same size,
+    mtime and scan fingerprint are skipped, so a sweep only scans versions
+    that arrived since the last one. With jobs > 1 artifacts are
+    decompressed and matched in batches by a process pool; findings come
+    back in path order either way.
+
+    Each artifact's findings are appended to the index's findings file in
+    out_dir before the artifact is recorded, so an interrupted sweep loses
+    no findings of artifacts it will skip next time. Artifacts that could
+    not be read are not recorded, and are retried by the next sweep.
+
+    Args:
+        root_path: Mirror directory to sweep
+        out_dir: Directory holding the processed-artifact index and the
+            findings of every sweep
+        allowlist: Allowlist index, loaded once for the whole scan
+        jobs: Number of worker processes (0 uses every CPU)
+        memory_limit: Approximate per-member memory bound in bytes
+        cache: Result cache; members seen in other artifacts are not rescanned
+        profiler: Optional collector of per-rule and per-member timings
+        walker: File walker with exclude/include and size filters
+        rules: Rule set (defaults to the built-in rules)
+        archive_depth: Archive levels to open, including the artifact
+
+    Yields:
+        Findings tagged with the 'package' they came from
+    """
+    if allowlist is None:
+        allowlist = get_default_allowlist()
+    if rules is None:
+        rules = get_ruleset()
+    if walker is None:
+        walker = FileWalker()
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    fingerprint = f"{scan_fingerprint(rules, allowlist)}:{archive_depth}"
+    index = PackageIndex(out_dir, fingerprint)
+    artifacts = []
+    unchanged = 0
+    for full_path, rel_path, stat in walker.walk_stat(root_path):
+        if archive_kind(rel_path) is None:
+            continue
+        if index.is_current(rel_path, stat.st_size, stat.st_mtime_ns):
+            unchanged += 1
+        else:
+            artifacts.append((full_path, rel_path, stat.st_size, stat.st_mtime_ns))
+
+    print(
+        f"Scanning {len(artifacts)} new or changed package(s); "
+        f"{unchanged} already scanned.",
+        file=sys.stderr,
+    )
+
+    try:
+        if jobs <= 1:
+            for full_path, rel_path, size, mtime_ns in artifacts:
+                package, findings = scan_package(
+                    full_path,
+                    rel_path,
+                    rules,
+                    allowlist,
+                    memory_limit,
+                    cache,
+                    profiler,
+                    archive_depth,
+                )
+                if findings is not None:
+                    index.record(rel_path, size, mtime_ns, package, findings)
+                    yield from findings
+        elif artifacts:
+            from concurrent.futures import ProcessPoolExecutor
+
+            batch_size = max(1, min(MAX_BATCH_SIZE, len(artifacts) // (jobs * 4)))
+            batches = list(_batched(artifacts, batch_size))
+            cache_dir = cache.cache_dir if cache is not None else None
+
+            with ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=_init_worker,
+                initargs=(
+                    allowlist.path,
+                    memory_limit,
+                    cache_dir,
+                    None,
+                    profiler is not None,
+                    rules.packs,
+                    archive_depth,
+                ),
+            ) as executor:
+                tasks = [[(item[0], item[1]) for item in batch] for batch in batches]
+                done = executor.map(_scan_package_batch, tasks)
+                for batch, (results, timings) in zip(batches, done):
+                    if profiler is not None:
+                        profiler.merge(timings)
+                    for (_full, rel_path, size, mtime_ns), (package, findings) in zip(
+                        batch, results
+                    ):
+                        if findings is not None:
+                            index.record(rel_path, size, mtime_ns, package, findings)
+                            yield from findings
+    finally:
+        index.close()
+
+    if cache is not None:
+        cache.evict()
+
+
+def scan_packages(root_path: str, out_dir: str, **kwargs) -> List[Dict[str, Any]]:
+    """Collect iter_scan_packages into a list."""
+    return list(iter_scan_packages(root_path, out_dir, **kwargs))
+
+
+def _scan_git_blob(
+    cat_file: CatFile,
+    path: str,
+    sha: str,
+    commit: Optional[str],
+    rules: RuleSet,
+    allowlist: Allowlist,
+    memory_limit: int,
+    cache: Optional[ResultCache],
+    profiler: Optional[Profiler] = None,
+) -> List[Dict[str, Any]]:
+    """Read one blob through cat_file and scan it, tagging its commit."""
+    if SKIP_DIRS.intersection(path.split("/")[:-1]):
+        return []
+
+    opened = cat_file.open(sha)
+    if opened is None:
+        print(f"Warning: Could not read blob for {path}", file=sys.stderr)
+        return []
+
+    size, reader = opened
+    if is_binary_content(reader.peek(BINARY_SNIFF_SIZE)):
+        return []
+
+    findings = scan_content(
+        path,
+        reader,
+        size,
+        rules,
+        allowlist,
+        memory_limit,
+        cache,
+        digest=f"git:{sha}",
+        profiler=profiler,
+    )
+    if commit is not None:
+        for finding in findings:
+            finding["commit"] = commit
+    return findings
+
+
+def _scan_blob_batch(
+    batch: List[Tuple[str, str, Optional[str]]],
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Scan a batch of (path, blob SHA, commit) triples inside a pool worker.
+
+    Returns:
+        (findings, profile snapshot or None)
+    """
+    findings = []
+    for path, sha, commit in batch:
+        findings.extend(
+            _scan_git_blob(
+                _worker_cat_file,
+                path,
+                sha,
+                commit,
+                _worker_rules,
+                _worker_allowlist,
+                _worker_memory_limit,
+                _worker_cache,
+                _worker_profiler,
+            )
+        )
+    if _worker_cache is not None:
+        _worker_cache.flush()
+    return findings, _worker_profile()
+
+
+def iter_scan_git_blobs(
+    repo_path: str,
+    blobs: Iterable[Tuple[str, str, Optional[str]]],
+    allowlist: Optional[Allowlist] = None,
+    jobs: int = 1,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    cache: Optional[ResultCache] = None,
+    profiler: Optional[Profiler] = None,
+    rules: Optional[RuleSet] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Scan git blobs read straight from the object database, yielding findings.
+
+    Blobs under the directories skipped by local scans and binary blobs are
+    ignored, exactly as scan_path would for the same files. With jobs > 1
+    each pool worker keeps its own cat-file process.
+
+    Args:
+        repo_path: Directory inside the repository
+        blobs: (path, blob SHA, commit SHA or None) triples to scan
+        allowlist: Allowlist index, loaded once for the whole scan
+        jobs: Number of worker processes (0 uses every CPU)
+        memory_limit: Approximate per-blob memory bound in bytes
+        cache: Result cache, keyed by blob SHA
+        profiler: Optional collector of per-rule and per-file timings
+        rules: Rule set (defaults to the built-in rules)
+
+    Yields:
+        Findings in blob order; they carry a 'commit' key when known
+    """
+    if allowlist is None:
+        allowlist = get_default_allowlist()
+    if rules is None:
+        rules = get_ruleset()
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    if jobs <= 1:
+        with CatFile(repo_path) as cat_file:
+            for path, sha, commit in blobs:
+                yield from _scan_git_blob(
+                    cat_file,
+                    path,
+                    sha,
+                    commit,
+                    rules,
+                    allowlist,
+                    memory_limit,
+                    cache,
+                    profiler,
+                )
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        cache_dir = cache.cache_dir if cache is not None else None
+        profile = profiler is not None
+
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(
+                allowlist.path,
+                memory_limit,
+                cache_dir,
+                repo_path,
+                profile,
+                rules.packs,
+                DEFAULT_ARCHIVE_DEPTH,
+            ),
+        ) as executor:
+            batches = _batched(blobs, MAX_BATCH_SIZE)
+            for findings, timings in executor.map(_scan_blob_batch, batches):
+                if profiler is not None:
+                    profiler.merge(timings)
+                yield from findings
+
+    if cache is not None:
+        cache.evict()
+
+
+def scan_git_blobs(
+    repo_path: str, blobs: Iterable[Tuple[str, str, Optional[str]]], *args, **kwargs
+) -> List[Dict[str, Any]]:
+    """
+    Scan git blobs read straight from the object database.
+
+    Collects iter_scan_git_blobs into a list; remaining arguments are
+    passed through.
+
+    Returns:
+        List of all findings; findings carry a 'commit' key when known
+    """
+    return list(iter_scan_git_blobs(repo_path, blobs, *args, **kwargs))
+
+
+def scan_since(repo_path: str, ref: str, **kwargs) -> List[Dict[str, Any]]:
+    """
+    Scan only the files changed between ref and HEAD, as of HEAD.
+
+    Keyword arguments are passed through to scan_git_blobs.
+    """
+    blobs = [(path, sha, None) for path, sha in changed_blobs(repo_path, ref)]
+    return scan_git_blobs(repo_path, blobs, **kwargs)
+
+
+def scan_staged(repo_path: str, **kwargs) -> List[Dict[str, Any]]:
+    """
+    Scan only the staged index content of files that differ from HEAD.
+
+    Keyword arguments are passed through to scan_git_blobs.
+    """
+    blobs = [(path, sha, None) for path, sha in staged_blobs(repo_path)]
+    return scan_git_blobs(repo_path, blobs, **kwargs)
+
+
+def iter_scan_history(repo_path: str, **kwargs) -> Iterator[Dict[str, Any]]:
+    """
+    Scan every unique blob reachable from any ref exactly once.
+
+    Findings are attributed to the first commit and path that introduced
+    the blob and yielded as they are found. Keyword arguments are passed
+    through to iter_scan_git_blobs.
+    """
+    return iter_scan_git_blobs(repo_path, history_blobs(repo_path), **kwargs)
+
+
+def scan_history(repo_path: str, **kwargs) -> List[Dict[str, Any]]:
+    """Collect iter_scan_history into a list."""
+    return list(iter_scan_history(repo_path, **kwargs))
+
+
+def iter_scan_remote(
+    repo: str,
+    github_token: Union[str, Sequence[str]],
+    allowlist: Optional[Allowlist] = None,
+    fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+    mode: str = "api",
+    ref: Optional[str] = None,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    cache: Optional[ResultCache] = None,
+    profiler: Optional[Profiler] = None,
+    rules: Optional[RuleSet] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Scan a remote GitHub repository via API, yielding findings.
+
+    In 'api' mode files are fetched through the contents API and scanned
+    as they arrive from the concurrent fetcher. In 'tarball' mode the whole
+    tree is downloaded as one archive and members are scanned straight
+    from the decompression stream, using a single API request.
+
+    With a cache, API mode keys results by the blob SHAs listed in the
+    tree, so blobs seen in any earlier scan (remote or git-scoped) are
+    neither downloaded nor rescanned, and the repository and tree calls
+    are revalidated with their ETags.
+
+    Args:
+        repo: Repository in format 'owner/name'
+        github_token: GitHub API token, or a pool of tokens
+        allowlist: Allowlist index, loaded once for the whole scan
+        fetch_concurrency: Maximum number of concurrent content requests
+        mode: 'api' or 'tarball'
+        ref: Branch, tag or commit to scan (default branch when omitted)
+        memory_limit: Approximate per-file memory bound in bytes (tarball mode)
+        cache: Result cache for unchanged blobs and API responses
+        profiler: Optional collector of per-rule and per-file timings; in
+            API mode downloads overlap scanning, so only match time is kept
+        rules: Rule set (defaults to the built-in rules)
+
+    Yields:
+        Findings in tree (or archive) order
+    """
+    # Loaded here rather than at the top so local scans never import requests
+    from src.remote import TARBALL_ERRORS, iter_repo_files, iter_tarball_files
+
+    if rules is None:
+        rules = get_ruleset()
+    if allowlist is None:
+        allowlist = get_default_allowlist()
+
+    if mode == "tarball":
+        try:
+            for path, size, reader in iter_tarball_files(repo, github_token, ref):
+                if is_binary_content(reader.peek(BINARY_SNIFF_SIZE)):
+                    continue
+                yield from scan_content(
+                    path,
+                    reader,
+                    size,
+                    rules,
+                    allowlist,
+                    memory_limit,
+                    cache,
+                    profiler=profiler,
+                )
+        except TARBALL_ERRORS as e:
+            # A member read broke off mid-stream; the scan is incomplete
+            print(f"Error reading repository tarball: {e}", file=sys.stderr)
+            sys.exit(3)
+        if cache is not None:
+            cache.evict()
+        return
 
     print(f"Fetching files from {repo} via GitHub API...", file=sys.stderr)
-    files = fetch_repo_files(repo, github_token)
 
+    # Records of cached blobs by path, filled by the fetcher's lookups
+    known: Dict[str, List[List[Any]]] = {}
+
+    def is_known(path: str, sha: str) -> bool:
+        records = cache.get(_cache_key(f"git:{sha}", path, rules))
+        if records is not None:
+            known[path] = records
+        return records is not None
+
+    files = iter_repo_files(
+        repo,
+        github_token,
+        fetch_concurrency,
+        ref,
+        cache=cache,
+        is_known=is_known if cache is not None else None,
+    )
     for file_info in files:
         path = file_info["path"]
+        sha = file_info["sha"]
         content = file_info["content"]
 
-        findings = scan_file(path, content, rules)
-        all_findings.extend(findings)
+        if content is None:
+            yield from _restore_findings(path, known.pop(path), rules)
+            continue
+
+        head = content[:BINARY_SNIFF_SIZE].encode("utf-8")
+        sampled = is_generated_content(path, head, size=len(content))
+        if profiler is None:
+            findings = scan_file(path, content, rules, allowlist, sampled=sampled)
+        else:
+            started = time.perf_counter()
+            findings = scan_file(path, content, rules, allowlist, profiler, sampled)
+            profiler.add_file(path, len(content), 0.0, time.perf_counter() - started)
+        if cache is not None and sha:
+            cache.put(_cache_key(f"git:{sha}", path, rules), _cache_records(findings))
+        yield from findings
+
+    if cache is not None:
+        cache.evict()
+
+
+def scan_remote(
+    repo: str, github_token: Union[str, Sequence[str]], *args, **kwargs
+) -> List[Dict[str, Any]]:
+    """
+    Scan a remote GitHub repository via API.
+
+    Collects iter_scan_remote into a list; remaining arguments are passed
+    through.
+
+    Returns:
+        List of all findings
+    """
+    return list(iter_scan_remote(repo, github_token, *args, **kwargs))
+
+
+def _scan_target(
+    target: str,
+    github_token: Union[str, Sequence[str], None],
+    allowlist: Allowlist,
+    cache: Optional[ResultCache],
+    jobs: int,
+    memory_limit: int,
+    fetch_concurrency: int,
+    remote_mode: str,
+    profiler: Optional[Profiler] = None,
+    walker: Optional[FileWalker] = None,
+    rules: Optional[RuleSet] = None,
+    archive_depth: int = DEFAULT_ARCHIVE_DEPTH,
+) -> List[Dict[str, Any]]:
+    """Scan one batch target, a local directory or an 'owner/name' repo."""
+    # SQLite connections are per thread, so each target opens its own
+    target_cache = None
+    if cache is not None:
+        target_cache = ResultCache(cache.fingerprint, cache.cache_dir, cache.max_bytes)
+
+    try:
+        if os.path.isdir(target):
+            return scan_path(
+                target,
+                allowlist,
+                jobs=jobs,
+                memory_limit=memory_limit,
+                cache=target_cache,
+                profiler=profiler,
+                walker=walker,
+                rules=rules,
+                archive_depth=archive_depth,
+            )
+        if not github_token:
+            print("Error: --github-token required for remote mode.", file=sys.stderr)
+            sys.exit(3)
+        return scan_remote(
+            target,
+            github_token,
+            allowlist,
+            fetch_concurrency,
+            mode=remote_mode,
+            memory_limit=memory_limit,
+            cache=target_cache,
+            profiler=profiler,
+            rules=rules,
+        )
+    finally:
+        if target_cache is not None:
+            target_cache.close()
+
+
+def run_batch(
+    targets: List[str],
+    out_dir: str,
+    github_token: Union[str, Sequence[str], None] = None,
+    allowlist: Optional[Allowlist] = None,
+    concurrency: int = DEFAULT_REPO_CONCURRENCY,
+    jobs: int = 1,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    cache: Optional[ResultCache] = None,
+    fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+    remote_mode: str = "api",
+    profiler: Optional[Profiler] = None,
+    walker: Optional[FileWalker] = None,
+    rules: Optional[RuleSet] = None,
+    archive_depth: int = DEFAULT_ARCHIVE_DEPTH,
+) -> List[str]:
+    """
+    Scan many targets concurrently with resumable progress.
+
+    Up to concurrency targets are scanned at once by scan_path or
+    scan_remote. Each finished target's findings are written to
+    out_dir/<name>.json and recorded in the checkpoint, so a rerun with the
+    same out_dir skips everything already done. Targets that fail are
+    reported and left for the next run.
+
+    Args:
+        targets: Local directories and/or 'owner/name' repositories
+        out_dir: Directory for per-target reports and the checkpoint
+        github_token: GitHub API token, or a pool of tokens
+        allowlist: Allowlist index, shared by all targets
+        concurrency: Targets scanned at the same time
+        jobs: Worker processes per local target
+        memory_limit: Approximate per-file memory bound in bytes
+        cache: Result cache whose settings each target reuses
+        fetch_concurrency: Concurrent file downloads per remote target
+        remote_mode: 'api' or 'tarball'
+        profiler: Optional collector of timings across all targets
+        walker: File walker used for local directory targets
+        rules: Rule set shared by all targets
+        archive_depth: Archive levels to open in local targets
+
+    Returns:
+        Targets that failed
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    if allowlist is None:
+        allowlist = get_default_allowlist()
+
+    checkpoint = Checkpoint(out_dir)
+    pending = [target for target in targets if target not in checkpoint]
+    if len(pending) < len(targets):
+        print(
+            f"Resuming: {len(targets) - len(pending)} of {len(targets)} "
+            "target(s) already scanned.",
+            file=sys.stderr,
+        )
+
+    failed = []
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        futures = {
+            executor.submit(
+                _scan_target,
+                target,
+                github_token,
+                allowlist,
+                cache,
+                jobs,
+                memory_limit,
+                fetch_concurrency,
+                remote_mode,
+                profiler,
+                walker,
+                rules,
+                archive_depth,
+            ): target
+            for target in pending
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            target = futures[future]
+            try:
+                findings = future.result()
+            except (SystemExit, OSError, sqlite3.Error) as e:
+                print(f"Warning: Scan of {target} failed: {e}", file=sys.stderr)
+                failed.append(target)
+                continue
+
+            for finding in findings:
+                finding["repo"] = target
+            report = report_name(target) + ".json"
+            generate_json_report(findings, os.path.join(out_dir, report))
+            checkpoint.record(target, report, len(findings))
+            print(
+                f"[{done}/{len(pending)}] {target}: {len(findings)} finding(s)",
+                file=sys.stderr,
+            )
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        checkpoint.close()
+
+    return failed
+
+
+def iter_batch_findings(targets: List[str], out_dir: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the findings of every finished target from its report, in order.
+
+    Reports are read one at a time, so the aggregate report never holds
+    more than one target's findings in memory.
+
+    Args:
+        targets: Targets of the batch
+        out_dir: Directory holding the checkpoint and per-target reports
+    """
+    done = Checkpoint.load(out_dir)
+    for target in targets:
+        entry = done.get(target)
+        if entry is None:
+            continue
+        with open(os.path.join(out_dir, entry["report"]), "r", encoding="utf-8") as f:
+            yield from json.load(f)["findings"]
 
-    return all_findings
 
+def scan_batch(
+    targets: List[str], out_dir: str, *args, **kwargs
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Scan many targets concurrently with resumable progress.
+
+    Runs run_batch (remaining arguments are passed through) and collects
+    the aggregate findings.
 
-def determine_exit_code(findings: List[Dict[str, Any]]) -> int:
+    Returns:
+        (aggregate findings tagged with 'repo', in target order; failed targets)
+    """
+    failed = run_batch(targets, out_dir, *args, **kwargs)
+    return list(iter_batch_findings(targets, out_dir)), failed
+
+
+def determine_exit_code(findings: Iterable[Dict[str, Any]]) -> int:
     """
     Determine exit code based on finding scores.
 
@@ -151,44 +1580,56 @@ def determine_exit_code(findings: List[Dict[str, Any]]) -> int:
         1 if any score >= 70 (medium confidence)
         0 otherwise
     """
-    if not findings:
-        return 0
+    summary = ReportSummary()
+    for finding in findings:
+        summary.add(finding)
+    return summary.exit_code()
 
-    max_score = max(f["score"] for f in findings)
 
-    if max_score >= 90:
-        return 2
-    elif max_score >= 70:
-        return 1
-    else:
-        return 0
+def _location(finding: Dict[str, Any]) -> str:
+    """Format [repo:]path:line, plus the short commit or the package."""
+    location = f"{finding['path']}:{finding['line']}"
+    if "repo" in finding:
+        location = f"{finding['repo']}:{location}"
+    if "commit" in finding:
+        location += f" @{finding['commit'][:12]}"
+    if "package" in finding:
+        location += f" ({finding['package']})"
+    return location
+
 
+def print_summary(summary: Union[ReportSummary, Iterable[Dict[str, Any]]]) -> None:
+    """
+    Print concise summary to stdout.
+
+    Args:
+        summary: Counters collected while writing the report, or the
+            findings themselves (counted here)
+    """
+    if not isinstance(summary, ReportSummary):
+        findings = summary
+        summary = ReportSummary()
+        for finding in findings:
+            summary.add(finding)
 
-def print_summary(findings: List[Dict[str, Any]]) -> None:
-    """Print concise summary to stdout."""
-    if not findings:
+    if not summary.total:
         print("✓ No token leaks detected.")
         return
 
-    print(f"\n⚠ Found {len(findings)} potential token leak(s):\n")
-
-    # Group by severity
-    critical = [f for f in findings if f["score"] >= 90]
-    high = [f for f in findings if 70 <= f["score"] < 90]
-    medium = [f for f in findings if f["score"] < 70]
+    print(f"\n⚠ Found {summary.total} potential token leak(s):\n")
 
-    if critical:
-        print(f"  CRITICAL (score >= 90): {len(critical)} finding(s)")
-        for f in critical[:3]:  # Show up to 3
-            print(f"    - {f['path']}:{f['line']} [{f['rule_id']}] {f['match']}")
+    if summary.critical:
+        print(f"  CRITICAL (score >= 90): {summary.critical} finding(s)")
+        for f in summary.examples["critical"]:  # Show up to 3
+            print(f"    - {_location(f)} [{f['rule_id']}] {f['match']}")
 
-    if high:
-        print(f"  HIGH (score >= 70): {len(high)} finding(s)")
-        for f in high[:3]:
-            print(f"    - {f['path']}:{f['line']} [{f['rule_id']}] {f['match']}")
+    if summary.high:
+        print(f"  HIGH (score >= 70): {summary.high} finding(s)")
+        for f in summary.examples["high"]:
+            print(f"    - {_location(f)} [{f['rule_id']}] {f['match']}")
 
-    if medium:
-        print(f"  MEDIUM (score < 70): {len(medium)} finding(s)")
+    if summary.medium:
+        print(f"  MEDIUM (score < 70): {summary.medium} finding(s)")
 
     print("\nSee full report in output files.\n")
 
@@ -203,44 +1644,415 @@ def main():
     mode_group.add_argument(
         "--repo", help="Remote repository (owner/name) to scan via GitHub API"
     )
+    mode_group.add_argument(
+        "--org", help="Scan every repository of a GitHub organization or user"
+    )
+    mode_group.add_argument(
+        "--packages",
+        metavar="DIR",
+        help="Sweep a registry mirror: scan each .tgz/.vsix/.zip package under "
+        "DIR that is new since the last sweep (index kept in --out-dir)",
+    )
+    mode_group.add_argument(
+        "--repos-file",
+        help="Scan the targets listed in a file, one local directory or "
+        "owner/name repository per line",
+    )
+
+    scope_group = parser.add_mutually_exclusive_group()
+    scope_group.add_argument(
+        "--since",
+        metavar="REF",
+        help="With --path: scan only files changed between REF and HEAD",
+    )
+    scope_group.add_argument(
+        "--staged",
+        action="store_true",
+        help="With --path: scan only staged content, read from the git index",
+    )
+    scope_group.add_argument(
+        "--history",
+        action="store_true",
+        help="With --path: scan every unique blob in the git history of all refs",
+    )
 
-    parser.add_argument("--github-token", help="GitHub API token for remote mode")
+    parser.add_argument(
+        "--github-token",
+        action="append",
+        help="GitHub API token for remote mode; repeat to spread requests "
+        "over a pool of tokens",
+    )
+    parser.add_argument(
+        "--github-token-file",
+        help="File of GitHub API tokens, one per line, added to the pool",
+    )
+    parser.add_argument(
+        "--remote-mode",
+        choices=["api", "tarball"],
+        default="api",
+        help="Remote strategy: per-file contents API calls, or one tarball "
+        "download streamed through the scanner (default: api)",
+    )
+    parser.add_argument(
+        "--ref", help="Branch, tag or commit for remote mode (default branch)"
+    )
+    parser.add_argument(
+        "--fetch-concurrency",
+        type=int,
+        default=DEFAULT_FETCH_CONCURRENCY,
+        help="Concurrent file downloads in remote mode (default: 8)",
+    )
+    parser.add_argument(
+        "--out-dir",
+        default="leak-reports",
+        help="Per-repository reports and resume checkpoint for --org / "
+        "--repos-file, and the processed-package index for --packages "
+        "(default: leak-reports)",
+    )
+    parser.add_argument(
+        "--repo-concurrency",
+        type=int,
+        default=DEFAULT_REPO_CONCURRENCY,
+        help="Repositories scanned at the same time in batch mode (default: 4)",
+    )
     parser.add_argument("--out", default="leak-report.json", help="JSON output file")
     parser.add_argument("--csv", default="leak-report.csv", help="CSV output file")
+    parser.add_argument(
+        "--jsonl", help="Also write findings as JSON Lines, one per line as found"
+    )
+    parser.add_argument(
+        "--allowlist",
+        default=ALLOWLIST_PATH,
+        help="Allowlist file of literal tokens or sha256:<hex> digests",
+    )
+    parser.add_argument(
+        "--rules",
+        action="append",
+        metavar="PACK",
+        help="Load extra detection rules from a JSON or YAML rule pack; "
+        "repeatable, later packs override earlier rules with the same id",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for local scans (0 = one per CPU, default: 1)",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=int,
+        default=DEFAULT_MEMORY_LIMIT // (1024 * 1024),
+        help="Approximate per-file memory bound in MB; larger files are "
+        "streamed in chunks (default: 64)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="PATTERN",
+        help="Skip paths matching a .gitignore-style pattern in directory "
+        "scans; repeatable",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="PATTERN",
+        help="Only scan files matching a .gitignore-style pattern in directory "
+        "scans; repeatable",
+    )
+    parser.add_argument(
+        "--max-file-size",
+        type=float,
+        metavar="MB",
+        help="Skip files larger than this many MB in directory scans",
+    )
+    parser.add_argument(
+        "--archive-depth",
+        type=int,
+        default=DEFAULT_ARCHIVE_DEPTH,
+        metavar="N",
+        help="Scan inside .vsix/.zip/.tar/.tgz packages, opening up to N levels "
+        f"of nested archives; 0 skips archives (default: {DEFAULT_ARCHIVE_DEPTH})",
+    )
+    parser.add_argument(
+        "--no-gitignore",
+        action="store_true",
+        help="Also scan files ignored by .gitignore or .git/info/exclude",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the result cache and rescan every file",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Result cache directory (default: ~/.cache/marketplace-token-leak-hunter)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help="Result cache size in MB before old entries are evicted (default: 256)",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="ADDRESS",
+        help="With --path: keep rules warm and answer scan requests for the "
+        "workspace on a Unix socket path, or a loopback PORT or HOST:PORT, "
+        "instead of writing reports",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=1.0,
+        metavar="SECONDS",
+        help="Seconds between checks for modified files with --serve (default: 1)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="leak-profile.json",
+        metavar="FILE",
+        help="Time every rule and file; print the slowest to stderr and write "
+        "the full profile as JSON (default file: leak-profile.json)",
+    )
 
     args = parser.parse_args()
 
     # Execute scan
-    findings = []
+    findings: Iterable[Dict[str, Any]] = []
+    failed = []
+    allowlist = Allowlist(args.allowlist)
 
-    if args.path:
-        if not os.path.isdir(args.path):
-            print(
-                f"Error: Path '{args.path}' does not exist or is not a directory.",
-                file=sys.stderr,
+    if args.jobs < 0:
+        print("Error: --jobs must be 0 or a positive number.", file=sys.stderr)
+        sys.exit(3)
+
+    if args.fetch_concurrency < 1:
+        print("Error: --fetch-concurrency must be at least 1.", file=sys.stderr)
+        sys.exit(3)
+
+    if args.repo_concurrency < 1:
+        print("Error: --repo-concurrency must be at least 1.", file=sys.stderr)
+        sys.exit(3)
+
+    if args.memory_limit < 1:
+        print("Error: --memory-limit must be at least 1 MB.", file=sys.stderr)
+        sys.exit(3)
+
+    if args.archive_depth < 0:
+        print("Error: --archive-depth must be 0 or a positive number.", file=sys.stderr)
+        sys.exit(3)
+
+    if args.max_file_size is not None and args.max_file_size <= 0:
+        print("Error: --max-file-size must be positive.", file=sys.stderr)
+        sys.exit(3)
+
+    if (args.since or args.staged or args.history) and not args.path:
+        print("Error: --since, --staged and --history require --path.", file=sys.stderr)
+        sys.exit(3)
+
+    if args.serve and (not args.path or args.since or args.staged or args.history):
+        print("Error: --serve requires --path and a whole-tree scan.", file=sys.stderr)
+        sys.exit(3)
+
+    if args.watch_interval <= 0:
+        print("Error: --watch-interval must be positive.", file=sys.stderr)
+        sys.exit(3)
+
+    if args.packages and args.archive_depth < 1:
+        print(
+            "Error: --packages needs an --archive-depth of at least 1.", file=sys.stderr
+        )
+        sys.exit(3)
+
+    if args.packages and not os.path.isdir(args.packages):
+        print(
+            f"Error: Path '{args.packages}' does not exist or is not a directory.",
+            file=sys.stderr,
+        )
+        sys.exit(3)
+
+    if args.path and not os.path.isdir(args.path):
+        print(
+            f"Error: Path '{args.path}' does not exist or is not a directory.",
+            file=sys.stderr,
+        )
+        sys.exit(3)
+
+    tokens = list(args.github_token or [])
+    if args.github_token_file:
+        tokens.extend(read_token_file(args.github_token_file))
+
+    if (args.repo or args.org) and not tokens:
+        print("Error: --github-token required for remote mode.", file=sys.stderr)
+        print(
+            "GitHub token needs 'repo' or 'public_repo' read scope.",
+            file=sys.stderr,
+        )
+        sys.exit(3)
+
+    try:
+        rules = get_ruleset(args.rules or ())
+    except (ValueError, OSError) as e:
+        print(f"Error: Could not load rule pack: {e}", file=sys.stderr)
+        sys.exit(3)
+
+    cache = None
+    # The daemon keeps its own in-memory index instead of the result cache
+    if not args.no_cache and not args.serve:
+        try:
+            cache = ResultCache(
+                scan_fingerprint(rules, allowlist),
+                args.cache_dir,
+                args.cache_size * 1024 * 1024,
             )
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Result cache disabled: {e}", file=sys.stderr)
+    memory_limit = args.memory_limit * 1024 * 1024
+    profiler = Profiler() if args.profile else None
+    walker = FileWalker(
+        exclude=args.exclude,
+        include=args.include,
+        max_file_size=(
+            int(args.max_file_size * 1024 * 1024)
+            if args.max_file_size is not None
+            else None
+        ),
+        use_gitignore=not args.no_gitignore,
+    )
+
+    if args.serve:
+        from src.daemon import ScanDaemon, parse_address, serve
+
+        try:
+            address = parse_address(args.serve)
+            daemon = ScanDaemon(args.path, rules, allowlist, walker, memory_limit)
+            serve(daemon, address, args.watch_interval)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not serve on {args.serve}: {e}", file=sys.stderr)
             sys.exit(3)
-        findings = scan_path(args.path)
+        return
 
-    elif args.repo:
-        if not args.github_token:
-            print("Error: --github-token required for remote mode.", file=sys.stderr)
-            print(
-                "GitHub token needs 'repo' or 'public_repo' read scope.",
-                file=sys.stderr,
+    if args.path:
+        if args.since:
+            findings = scan_since(
+                args.path,
+                args.since,
+                allowlist=allowlist,
+                memory_limit=memory_limit,
+                cache=cache,
+                profiler=profiler,
+                rules=rules,
+            )
+        elif args.staged:
+            findings = scan_staged(
+                args.path,
+                allowlist=allowlist,
+                memory_limit=memory_limit,
+                cache=cache,
+                profiler=profiler,
+                rules=rules,
+            )
+        elif args.history:
+            findings = iter_scan_history(
+                args.path,
+                allowlist=allowlist,
+                jobs=args.jobs,
+                memory_limit=memory_limit,
+                cache=cache,
+                profiler=profiler,
+                rules=rules,
+            )
+        else:
+            findings = iter_scan_path(
+                args.path,
+                allowlist,
+                jobs=args.jobs,
+                memory_limit=memory_limit,
+                cache=cache,
+                profiler=profiler,
+                rules=rules,
+                walker=walker,
+                archive_depth=args.archive_depth,
             )
-            sys.exit(3)
-        findings = scan_remote(args.repo, args.github_token)
 
-    # Generate reports
-    generate_json_report(findings, args.out)
-    generate_csv_report(findings, args.csv)
+    elif args.packages:
+        findings = iter_scan_packages(
+            args.packages,
+            args.out_dir,
+            allowlist,
+            jobs=args.jobs,
+            memory_limit=memory_limit,
+            cache=cache,
+            profiler=profiler,
+            rules=rules,
+            walker=walker,
+            archive_depth=args.archive_depth,
+        )
+
+    elif args.repo:
+        findings = iter_scan_remote(
+            args.repo,
+            tokens,
+            allowlist,
+            args.fetch_concurrency,
+            mode=args.remote_mode,
+            ref=args.ref,
+            memory_limit=memory_limit,
+            cache=cache,
+            profiler=profiler,
+            rules=rules,
+        )
+
+    elif args.org or args.repos_file:
+        if args.org:
+            targets = list_org_repos(args.org, tokens)
+        else:
+            targets = read_targets_file(args.repos_file)
+        print(f"Scanning {len(targets)} target(s)...", file=sys.stderr)
+        failed = run_batch(
+            targets,
+            args.out_dir,
+            tokens,
+            allowlist,
+            concurrency=args.repo_concurrency,
+            jobs=args.jobs,
+            memory_limit=memory_limit,
+            cache=cache,
+            fetch_concurrency=args.fetch_concurrency,
+            remote_mode=args.remote_mode,
+            profiler=profiler,
+            rules=rules,
+            walker=walker,
+            archive_depth=args.archive_depth,
+        )
+        findings = iter_batch_findings(targets, args.out_dir)
+
+    # Generate reports while the scan runs, in a single pass over findings
+    sinks = [JsonReportSink(args.out), CsvReportSink(args.csv)]
+    if args.jsonl:
+        sinks.append(JsonLinesSink(args.jsonl))
+    summary = write_findings(findings, sinks)
+
+    if cache is not None:
+        cache.close()
+
+    if profiler is not None:
+        profiler.write(args.profile)
 
     # Print summary
-    print_summary(findings)
+    print_summary(summary)
 
     # Exit with appropriate code
-    exit_code = determine_exit_code(findings)
+    exit_code = summary.exit_code()
+    if failed:
+        print(
+            f"⚠ {len(failed)} target(s) failed and will be retried on the next run "
+            f"with --out-dir {args.out_dir}: {', '.join(failed[:5])}",
+            file=sys.stderr,
+        )
+        if exit_code == 0:
+            exit_code = 3
     if exit_code == 2:
         print(
             "⛔ Exiting with code 2: High confidence leak(s) detected.", file=sys.stderr
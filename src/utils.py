@@ -1,16 +1,101 @@
 """
 utils.py - Utility functions for scanning and token handling.
 
-Provides token redaction, binary file detection, and remote file fetching.
+Provides token redaction, binary and generated file detection, and the
+file lists shared by the scan modes. Network code lives in src.remote so
+local scans never import requests; the names that moved there are still
+importable from here, loading src.remote on first access.
 
 Copyright (c) 2025 Rick Deacon / Knostic Labs
 Licensed under the MIT License
 """
 
+import codecs
 import os
 import sys
-from typing import List, Dict
-import requests
+from typing import List, Optional
+
+# Bytes inspected when deciding whether content is binary
+BINARY_SNIFF_SIZE = 4096
+
+# Lockfiles and bundler output, always scanned with sampled matching
+GENERATED_FILENAMES = {
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "composer.lock",
+    "Cargo.lock",
+    "Gemfile.lock",
+    "poetry.lock",
+}
+GENERATED_SUFFIXES = (".min.js", ".min.css", ".map", ".bundle.js")
+
+# Share of NULs in alternate bytes that marks BOM-less UTF-16 text
+WIDE_TEXT_NUL_RATIO = 0.9
+
+# Package and archive formats scanned member by member (see src.archive)
+ZIP_SUFFIXES = (".zip", ".vsix")
+TAR_SUFFIXES = (".tar", ".tgz", ".tar.gz", ".tar.bz2", ".tar.xz")
+
+# Archive levels opened by default, counting the package itself
+DEFAULT_ARCHIVE_DEPTH = 3
+
+# Content sniffed as minified: long lines on average, or long lines with
+# almost no whitespace. Short content is never sampled, and content smaller
+# than MINIFIED_MIN_SIZE (such as a one-line JSON or YAML config) is cheap
+# enough to scan in full whatever its layout.
+MINIFIED_MIN_SAMPLE = 1024
+MINIFIED_MIN_SIZE = 64 * 1024
+MINIFIED_LINE_LENGTH = 500
+MINIFIED_DENSE_LINE_LENGTH = 150
+MINIFIED_WHITESPACE_RATIO = 0.05
+
+# Concurrent content requests in remote mode
+DEFAULT_FETCH_CONCURRENCY = 8
+
+# Files fetched in remote mode, by extension or exact file name
+REMOTE_TEXT_EXTENSIONS = {
+    ".yml",
+    ".yaml",
+    ".json",
+    ".txt",
+    ".md",
+    ".sh",
+    ".py",
+    ".js",
+    ".ts",
+    ".java",
+    ".go",
+    ".rs",
+    ".c",
+    ".cpp",
+    ".h",
+    ".env",
+    ".npmrc",
+    ".gitignore",
+}
+REMOTE_TEXT_FILENAMES = {".npmrc", "Dockerfile", "package.json"}
+
+# Names moved to src.remote, forwarded by __getattr__ for existing callers
+_REMOTE_NAMES = {
+    "GITHUB_API",
+    "create_session",
+    "fetch_repo_files",
+    "get_json",
+    "iter_repo_files",
+    "iter_tarball_files",
+    "requests",
+}
+
+
+def __getattr__(name: str):
+    """Forward names moved to src.remote, importing it on first access."""
+    if name in _REMOTE_NAMES:
+        from src import remote
+
+        return getattr(remote, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def redact_token(token: str) -> str:
@@ -37,6 +122,165 @@ def redact_token(token: str) -> str:
     return f"{prefix}***REDACTED***{suffix}"
 
 
+def detect_encoding(data: bytes) -> Optional[str]:
+    """
+    Detect UTF-16 or UTF-32 text by its byte order mark or its NUL bytes.
+
+    Without a BOM, UTF-16 text that is mostly ASCII has a NUL in every
+    other byte, and never in the bytes between them. Everything else,
+    including UTF-8 with a BOM, is left to the UTF-8 paths.
+
+    Args:
+        data: Leading bytes of the content (at least BINARY_SNIFF_SIZE if available)
+
+    Returns:
+        Codec name for UTF-16/UTF-32 content, None for anything else
+    """
+    if data.startswith((codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE)):
+        return "utf-32"
+    if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+
+    sample = data[:BINARY_SNIFF_SIZE]
+    if len(sample) < 2 or b"\x00" not in sample:
+        return None
+    even, odd = sample[0::2], sample[1::2]
+    if b"\x00" not in even and odd.count(0) >= WIDE_TEXT_NUL_RATIO * len(odd):
+        return "utf-16-le"
+    if b"\x00" not in odd and even.count(0) >= WIDE_TEXT_NUL_RATIO * len(even):
+        return "utf-16-be"
+    return None
+
+
+def decode_text(raw: bytes) -> str:
+    """
+    Decode file bytes the way text-mode open() with errors="ignore" would.
+
+    Invalid UTF-8 is dropped and CRLF / CR line endings become LF. UTF-16
+    and UTF-32 content (see detect_encoding) is decoded with its own codec,
+    and undecodable units are replaced rather than dropped.
+
+    Args:
+        raw: File content as bytes
+
+    Returns:
+        Decoded text
+    """
+    encoding = detect_encoding(raw)
+    if encoding is None:
+        text = raw.decode("utf-8", errors="ignore")
+    else:
+        text = raw.decode(encoding, errors="replace")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def normalize_newlines(raw: bytes) -> bytes:
+    """
+    Turn CRLF / CR line endings into LF without decoding.
+
+    Byte-level matching sees the same lines and offsets as decode_text.
+
+    Args:
+        raw: File content as bytes
+
+    Returns:
+        Content with LF line endings
+    """
+    if b"\r" in raw:
+        raw = raw.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return raw
+
+
+def is_binary_content(data: bytes) -> bool:
+    """
+    Check if content is binary by looking for null bytes in its first 4KB.
+
+    UTF-16 and UTF-32 text is not binary, although it contains null bytes.
+
+    Args:
+        data: Leading bytes of the content (at least BINARY_SNIFF_SIZE if available)
+
+    Returns:
+        True if content appears binary
+    """
+    return b"\x00" in data[:BINARY_SNIFF_SIZE] and detect_encoding(data) is None
+
+
+def is_generated_name(file_path: str) -> bool:
+    """
+    Check if a path names a lockfile, bundle or other generated file.
+
+    Args:
+        file_path: Path of the content ('/'-separated)
+
+    Returns:
+        True if content at this path is always scanned with sampled matching
+    """
+    name = file_path.rsplit("/", 1)[-1]
+    return name in GENERATED_FILENAMES or name.lower().endswith(GENERATED_SUFFIXES)
+
+
+def is_generated_content(
+    file_path: str,
+    data: bytes,
+    encoding: Optional[str] = None,
+    size: Optional[int] = None,
+) -> bool:
+    """
+    Check if content is minified or generated, by name and by its first 4KB.
+
+    Args:
+        file_path: Path of the content ('/'-separated)
+        data: Leading bytes of the content (at least BINARY_SNIFF_SIZE if available)
+        encoding: Codec of UTF-16/UTF-32 content (see detect_encoding), so
+            line lengths are measured in characters rather than code units
+        size: Size of the whole content, when data is only its head
+
+    Returns:
+        True if content should be scanned with sampled matching
+    """
+    if is_generated_name(file_path):
+        return True
+    if (len(data) if size is None else size) < MINIFIED_MIN_SIZE:
+        return False
+
+    sample = data[:BINARY_SNIFF_SIZE]
+    if encoding is not None:
+        sample = sample.decode(encoding, errors="ignore").encode("utf-8")
+    if len(sample) < MINIFIED_MIN_SAMPLE:
+        return False
+
+    average_line = len(sample) / (sample.count(b"\n") + 1)
+    if average_line > MINIFIED_LINE_LENGTH:
+        return True
+
+    whitespace = sum(sample.count(char) for char in (b" ", b"\t", b"\n", b"\r"))
+    return (
+        average_line > MINIFIED_DENSE_LINE_LENGTH
+        and whitespace / len(sample) < MINIFIED_WHITESPACE_RATIO
+    )
+
+
+def archive_kind(file_path: str) -> Optional[str]:
+    """
+    Classify a path as a zip-based or tar-based archive by its suffix.
+
+    Args:
+        file_path: Path of the file or archive member
+
+    Returns:
+        'zip', 'tar', or None for anything else
+    """
+    name = file_path.lower()
+    if name.endswith(ZIP_SUFFIXES):
+        return "zip"
+    if name.endswith(TAR_SUFFIXES):
+        return "tar"
+    return None
+
+
 def is_binary_file(file_path: str) -> bool:
     """
     Quickly check if file is binary by checking for null bytes in first 4KB.
@@ -49,8 +293,8 @@ def is_binary_file(file_path: str) -> bool:
     """
     try:
         with open(file_path, "rb") as f:
-            chunk = f.read(4096)
-            if b"\x00" in chunk:
+            chunk = f.read(BINARY_SNIFF_SIZE)
+            if is_binary_content(chunk):
                 return True
     except (IOError, OSError):
         return True
@@ -58,115 +302,42 @@ def is_binary_file(file_path: str) -> bool:
     return False
 
 
-def fetch_repo_files(repo: str, github_token: str) -> List[Dict[str, str]]:
+def is_remote_text_path(path: str) -> bool:
     """
-    Fetch text files from a GitHub repository via API.
-
-    Retrieves the default branch tree and fetches text file contents.
-    Rate limits: GitHub API allows 5000 requests/hour for authenticated users.
+    Check if a repository path is one of the text files fetched remotely.
 
     Args:
-        repo: Repository in format 'owner/name'
-        github_token: GitHub API token
+        path: Repository-relative path
 
     Returns:
-        List of dicts with 'path' and 'content' keys
+        True if the extension or file name is in the remote text list
+    """
+    _, ext = os.path.splitext(path)
+    return (
+        ext.lower() in REMOTE_TEXT_EXTENSIONS
+        or os.path.basename(path) in REMOTE_TEXT_FILENAMES
+    )
 
-    Raises:
-        SystemExit on API errors
+
+def read_token_file(path: str) -> List[str]:
     """
-    headers = {
-        "Authorization": f"token {github_token}",
-        "Accept": "application/vnd.github.v3+json",
-    }
+    Read a pool of GitHub tokens, one per line.
 
-    # Get default branch
-    print(f"Fetching repository info for {repo}...", file=sys.stderr)
-    repo_url = f"https://api.github.com/repos/{repo}"
-    try:
-        resp = requests.get(repo_url, headers=headers, timeout=30)
-        resp.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching repository info: {e}", file=sys.stderr)
-        print(
-            "Check repository name, token validity, and rate limits.", file=sys.stderr
-        )
-        sys.exit(3)
+    Blank lines and lines starting with '#' are ignored.
 
-    default_branch = resp.json().get("default_branch", "main")
+    Args:
+        path: Path to the token file
 
-    # Get tree
-    tree_url = (
-        f"https://api.github.com/repos/{repo}/git/trees/{default_branch}?recursive=1"
-    )
+    Returns:
+        List of tokens
+
+    Raises:
+        SystemExit if the file cannot be read
+    """
     try:
-        resp = requests.get(tree_url, headers=headers, timeout=30)
-        resp.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching repository tree: {e}", file=sys.stderr)
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+    except (IOError, OSError) as e:
+        print(f"Error reading token file {path}: {e}", file=sys.stderr)
         sys.exit(3)
-
-    tree = resp.json().get("tree", [])
-
-    # Filter text files
-    text_extensions = {
-        ".yml",
-        ".yaml",
-        ".json",
-        ".txt",
-        ".md",
-        ".sh",
-        ".py",
-        ".js",
-        ".ts",
-        ".java",
-        ".go",
-        ".rs",
-        ".c",
-        ".cpp",
-        ".h",
-        ".env",
-        ".npmrc",
-        ".gitignore",
-    }
-    target_files = []
-
-    for item in tree:
-        if item["type"] != "blob":
-            continue
-
-        path = item["path"]
-
-        # Include by extension or specific names
-        _, ext = os.path.splitext(path)
-        if ext.lower() in text_extensions or os.path.basename(path) in {
-            ".npmrc",
-            "Dockerfile",
-            "package.json",
-        }:
-            target_files.append(path)
-
-    # Fetch file contents
-    files_data = []
-    print(f"Fetching {len(target_files)} file(s)...", file=sys.stderr)
-
-    for path in target_files:
-        content_url = f"https://api.github.com/repos/{repo}/contents/{path}"
-        try:
-            resp = requests.get(content_url, headers=headers, timeout=30)
-            resp.raise_for_status()
-
-            content_data = resp.json()
-            if content_data.get("encoding") == "base64":
-                import base64
-
-                content = base64.b64decode(content_data["content"]).decode(
-                    "utf-8", errors="ignore"
-                )
-                files_data.append({"path": path, "content": content})
-
-        except requests.exceptions.RequestException as e:
-            print(f"Warning: Could not fetch {path}: {e}", file=sys.stderr)
-            continue
-
-    return files_data
+    return [line for line in lines if line and not line.startswith("#")]
@@ -0,0 +1,343 @@
+"""
+walker.py - Directory walker for local scans.
+
+Walks a tree with os.scandir, pruning skipped directories, .gitignore'd
+paths, user exclude/include patterns, known binary extensions and files
+over a size limit before anything is opened. High-risk secret files such
+as .env or .npmrc are listed even when .gitignore'd. The size from the walk's
+stat is handed on to the scanner, so each file is opened exactly once.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import os
+import re
+import sys
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Directories never descended into during local scans
+SKIP_DIRS = {
+    ".git",
+    "node_modules",
+    "__pycache__",
+    ".venv",
+    "venv",
+    "dist",
+    "build",
+}
+
+# Extensions of files that are always binary, skipped without being opened.
+# Archives are not listed: packages are scanned member by member.
+SKIP_EXTENSIONS = {
+    ".7z",
+    ".bmp",
+    ".class",
+    ".dll",
+    ".dylib",
+    ".eot",
+    ".exe",
+    ".gif",
+    ".ico",
+    ".jar",
+    ".jpeg",
+    ".jpg",
+    ".mov",
+    ".mp3",
+    ".mp4",
+    ".otf",
+    ".pdf",
+    ".png",
+    ".pyc",
+    ".so",
+    ".ttf",
+    ".wasm",
+    ".wav",
+    ".webp",
+    ".woff",
+    ".woff2",
+}
+
+GITIGNORE_FILENAME = ".gitignore"
+
+# Files that typically hold credentials. They are ignored precisely because
+# they are secret, yet still end up in packages and images, so .gitignore
+# alone never hides them from a scan (--exclude still does).
+HIGH_RISK_FILES = (
+    ".env",
+    ".env.*",
+    "*.env",
+    ".npmrc",
+    ".pypirc",
+    ".netrc",
+    "*.pem",
+    "*.key",
+)
+
+
+def _translate_glob(glob: str) -> str:
+    """Translate a gitignore glob (without anchoring slashes) to a regex."""
+    parts = []
+    i = 0
+    while i < len(glob):
+        char = glob[i]
+        if glob.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if glob.startswith("/**", i) and i + 3 == len(glob):
+            parts.append("/.*")
+            break
+        if glob.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = glob.find("]", i + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = glob[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end
+        elif char == "\\" and i + 1 < len(glob):
+            i += 1
+            parts.append(re.escape(glob[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+class IgnorePattern:
+    """One gitignore-style pattern, compiled to a regex."""
+
+    def __init__(self, line: str):
+        """
+        Parse a pattern line.
+
+        Args:
+            line: Pattern without trailing newline or surrounding spaces
+        """
+        self.negated = line.startswith("!")
+        if self.negated:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+
+        self.dir_only = line.endswith("/")
+        line = line.rstrip("/")
+
+        # A slash anywhere but the end anchors the pattern to its base dir
+        self.anchored = "/" in line
+        self.regex = re.compile(_translate_glob(line.lstrip("/")) + r"\Z")
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        """Check a '/'-separated path relative to the pattern's base dir."""
+        if self.dir_only and not is_dir:
+            return False
+        if self.anchored:
+            return self.regex.match(rel_path) is not None
+        return self.regex.match(rel_path.rsplit("/", 1)[-1]) is not None
+
+
+def parse_patterns(lines: Iterable[str]) -> List[IgnorePattern]:
+    """Parse gitignore lines, dropping blanks and comments."""
+    patterns = []
+    for line in lines:
+        line = line.rstrip()
+        if line and not line.startswith("#"):
+            patterns.append(IgnorePattern(line))
+    return patterns
+
+
+def matches_file(patterns: List[IgnorePattern], rel_path: str) -> bool:
+    """
+    Check whether any pattern selects a file, directly or via a parent dir.
+
+    Used for inclusion lists, where 'src/' should cover every file below it.
+    """
+    if any(pattern.matches(rel_path, False) for pattern in patterns):
+        return True
+    parts = rel_path.split("/")
+    for depth in range(1, len(parts)):
+        parent = "/".join(parts[:depth])
+        if any(pattern.matches(parent, True) for pattern in patterns):
+            return True
+    return False
+
+
+def _read_patterns(path: str) -> List[IgnorePattern]:
+    """Read an ignore file, returning no patterns when it is unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return parse_patterns(f)
+    except OSError:
+        return []
+
+
+def _ignored(
+    ignores: List[Tuple[str, List[IgnorePattern]]], rel_path: str, is_dir: bool
+) -> bool:
+    """Apply ignore files outermost first; the last matching pattern wins."""
+    ignored = False
+    for base, patterns in ignores:
+        if base:
+            if not rel_path.startswith(base):
+                continue
+            path = rel_path[len(base) :]
+        else:
+            path = rel_path
+        for pattern in patterns:
+            if pattern.matches(path, is_dir):
+                ignored = not pattern.negated
+    return ignored
+
+
+class FileWalker:
+    """
+    Lists the files a local scan should read, in a stable order.
+
+    Files of a directory come first in name order, then each subdirectory
+    in name order, matching a sorted top-down os.walk. Directories pruned
+    by SKIP_DIRS, .gitignore or exclude patterns are never listed. Files
+    matching always_scan are listed even when .gitignore'd, inside any
+    directory that is walked.
+    """
+
+    def __init__(
+        self,
+        exclude: Optional[Iterable[str]] = None,
+        include: Optional[Iterable[str]] = None,
+        max_file_size: Optional[int] = None,
+        use_gitignore: bool = True,
+        skip_dirs: Iterable[str] = SKIP_DIRS,
+        skip_extensions: Iterable[str] = SKIP_EXTENSIONS,
+        always_scan: Iterable[str] = HIGH_RISK_FILES,
+    ):
+        """
+        Args:
+            exclude: Gitignore-style patterns, relative to the scan root, to skip
+            include: If given, only files matching one of these patterns are listed
+            max_file_size: Skip files larger than this many bytes
+            use_gitignore: Honour .gitignore files and .git/info/exclude
+            skip_dirs: Directory names never descended into
+            skip_extensions: Lower-case file extensions skipped without opening
+            always_scan: Gitignore-style patterns of files that .gitignore
+                cannot hide (exclude patterns still apply)
+        """
+        self.exclude = parse_patterns(exclude or [])
+        self.include = parse_patterns(include or [])
+        self.max_file_size = max_file_size
+        self.use_gitignore = use_gitignore
+        self.skip_dirs = set(skip_dirs)
+        self.skip_extensions = set(skip_extensions)
+        self.always_scan = parse_patterns(always_scan)
+
+    def walk(self, root_path: str) -> Iterator[Tuple[str, str, int]]:
+        """
+        Walk root_path.
+
+        Args:
+            root_path: Directory to walk
+
+        Yields:
+            (full_path, rel_path, size in bytes) for every file to scan
+        """
+        for full_path, rel_path, stat in self.walk_stat(root_path):
+            yield full_path, rel_path, stat.st_size
+
+    def walk_stat(self, root_path: str) -> Iterator[Tuple[str, str, os.stat_result]]:
+        """
+        Walk root_path like walk(), keeping the whole stat of each file.
+
+        Used by the scan daemon to spot modified files by mtime and size.
+
+        Yields:
+            (full_path, rel_path, stat result) for every file to scan
+        """
+        ignores: List[Tuple[str, List[IgnorePattern]]] = []
+        if self.use_gitignore:
+            info_exclude = os.path.join(root_path, ".git", "info", "exclude")
+            ignores.append(("", _read_patterns(info_exclude)))
+
+        yield from self._walk_dir(root_path, "", ignores)
+
+    def _skipped(
+        self,
+        ignores: List[Tuple[str, List[IgnorePattern]]],
+        rel_path: str,
+        is_dir: bool,
+    ) -> bool:
+        """
+        Check exclude patterns, which .gitignore negations cannot override,
+        then .gitignore, which cannot hide always_scan files.
+        """
+        if self.exclude and _ignored([("", self.exclude)], rel_path, is_dir):
+            return True
+        if not is_dir and any(
+            pattern.matches(rel_path, False) for pattern in self.always_scan
+        ):
+            return False
+        return _ignored(ignores, rel_path, is_dir)
+
+    def _walk_dir(
+        self,
+        dir_path: str,
+        rel_dir: str,
+        ignores: List[Tuple[str, List[IgnorePattern]]],
+    ) -> Iterator[Tuple[str, str, os.stat_result]]:
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"Warning: Could not list {dir_path}: {e}", file=sys.stderr)
+            return
+
+        if self.use_gitignore and any(
+            entry.name == GITIGNORE_FILENAME for entry in entries
+        ):
+            patterns = _read_patterns(os.path.join(dir_path, GITIGNORE_FILENAME))
+            if patterns:
+                ignores = ignores + [(rel_dir, patterns)]
+
+        subdirs = []
+        for entry in entries:
+            rel_path = rel_dir + entry.name
+            try:
+                # Symlinked directories are not followed, like os.walk
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in self.skip_dirs and not self._skipped(
+                        ignores, rel_path, True
+                    ):
+                        subdirs.append(entry)
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+
+            if os.path.splitext(entry.name)[1].lower() in self.skip_extensions:
+                continue
+            if self._skipped(ignores, rel_path, False):
+                continue
+            if self.include and not matches_file(self.include, rel_path):
+                continue
+
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if self.max_file_size is not None and stat.st_size > self.max_file_size:
+                continue
+
+            yield entry.path, rel_path, stat
+
+        for entry in subdirs:
+            yield from self._walk_dir(entry.path, rel_dir + entry.name + "/", ignores)
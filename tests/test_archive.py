@@ -0,0 +1,132 @@
+"""
+test_archive.py - Tests for scanning inside packaged artifacts.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.archive import iter_archive_members  # noqa: E402
+from src.engine import get_ruleset  # noqa: E402
+from src.rules import Allowlist  # noqa: E402
+from src.scan_repo import scan_archive, scan_path  # noqa: E402
+
+TOKEN_LINE = 'token = "ghp_FAKE_TOKEN_1234567890ABCDEFGHIJKLMNOPQR"\n'
+NPM_LINE = "_authToken=npm_FAKE_AUTHTOKEN_abcdefghij1234567890\n"
+
+
+def _tgz(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, content in files.items():
+            data = content if isinstance(content, bytes) else content.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _vsix():
+    """An extension bundling an npm tarball that itself holds a zip."""
+    dependency = _tgz(
+        {
+            "package/.npmrc": NPM_LINE,
+            "package/assets.zip": _zip({"deep/config.js": TOKEN_LINE}),
+            "package/logo.png": b"\x89PNG\r\n\x1a\n\x00\x00",
+        }
+    )
+    return _zip(
+        {
+            "extension/out/main.js": TOKEN_LINE,
+            "extension/node_modules/dep/dep-1.0.0.tgz": dependency,
+        }
+    )
+
+
+def test_members_stream_through_nested_archives():
+    """Nested archives are opened up to the depth limit, in archive order."""
+    names = [
+        path
+        for path, _size, _reader in iter_archive_members(
+            "ext.vsix", io.BytesIO(_vsix())
+        )
+    ]
+    assert names == [
+        "ext.vsix!extension/out/main.js",
+        "ext.vsix!extension/node_modules/dep/dep-1.0.0.tgz!package/.npmrc",
+        "ext.vsix!extension/node_modules/dep/dep-1.0.0.tgz!package/assets.zip"
+        "!deep/config.js",
+        "ext.vsix!extension/node_modules/dep/dep-1.0.0.tgz!package/logo.png",
+    ]
+
+    shallow = iter_archive_members("ext.vsix", io.BytesIO(_vsix()), depth=1)
+    assert [path for path, _size, _reader in shallow][-1].endswith("dep-1.0.0.tgz")
+
+
+def test_scan_path_reports_archive_members():
+    """Directory scans report findings inside packages as archive!member."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo = os.path.join(tmpdir, "repo")
+        os.makedirs(repo)
+        with open(os.path.join(repo, "ext.vsix"), "wb") as f:
+            f.write(_vsix())
+        with open(os.path.join(repo, "pkg-2.0.0.tgz"), "wb") as f:
+            f.write(_tgz({"package/index.js": TOKEN_LINE}))
+        with open(os.path.join(repo, "broken.zip"), "wb") as f:
+            f.write(b"PK\x03\x04 truncated")
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+
+        findings = scan_path(repo, allowlist)
+        assert [(f["path"], f["rule_id"]) for f in findings] == [
+            ("ext.vsix!extension/out/main.js", "gh_token_ghp"),
+            (
+                "ext.vsix!extension/node_modules/dep/dep-1.0.0.tgz!package/.npmrc",
+                "npm_authtoken",
+            ),
+            (
+                "ext.vsix!extension/node_modules/dep/dep-1.0.0.tgz"
+                "!package/assets.zip!deep/config.js",
+                "gh_token_ghp",
+            ),
+            ("pkg-2.0.0.tgz!package/index.js", "gh_token_ghp"),
+        ]
+
+        assert scan_path(repo, allowlist, archive_depth=0) == []
+
+
+def test_zip_members_are_sniffed_past_512_bytes():
+    """Minified zip members are sampled, although zip peeks stop at 512 bytes."""
+    minified = "var a=1;" * 9000 + TOKEN_LINE
+    assert len(minified) > 64 * 1024
+    archive = _zip({"extension/out/app.js": minified})
+
+    members = iter_archive_members("ext.vsix", io.BytesIO(archive))
+    _path, _size, reader = next(members)
+    assert len(reader.peek(4096)) >= 4096
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+        findings = scan_archive(
+            "ext.vsix", io.BytesIO(archive), get_ruleset(), allowlist
+        )
+    assert [(f["rule_id"], f.get("sampled")) for f in findings] == [
+        ("gh_token_ghp", True)
+    ]
@@ -0,0 +1,76 @@
+"""
+test_batch.py - Tests for batch scanning with resume checkpoints.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import scan_repo  # noqa: E402
+from src.batch import read_targets_file, report_name  # noqa: E402
+from src.scan_repo import scan_batch  # noqa: E402
+
+
+def _make_target(root, name, content):
+    path = os.path.join(root, name)
+    os.makedirs(path)
+    with open(os.path.join(path, "config.sh"), "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+def test_batch_scan_aggregates_and_resumes(monkeypatch):
+    """Finished targets are checkpointed and skipped when the sweep reruns."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        first = _make_target(
+            tmpdir,
+            "ext-one",
+            'GH_TOKEN="ghp_FAKE_TOKEN_1234567890ABCDEFGHIJKLMNOPQR"\n',
+        )
+        second = _make_target(
+            tmpdir, "ext-two", "_authToken=npm_FAKE_AUTHTOKEN_abcdefghij1234567890\n"
+        )
+        targets_file = os.path.join(tmpdir, "targets.txt")
+        with open(targets_file, "w", encoding="utf-8") as f:
+            f.write(f"# sweep\n{first}\n{second}\n{first}\nowner/remote-repo\n")
+        out_dir = os.path.join(tmpdir, "reports")
+
+        targets = read_targets_file(targets_file)
+        findings, failed = scan_batch(targets, out_dir, concurrency=2)
+
+        assert targets == [first, second, "owner/remote-repo"]
+        assert [(f["repo"], f["rule_id"]) for f in findings] == [
+            (first, "gh_token_ghp"),
+            (second, "npm_authtoken"),
+        ]
+        # Remote target without a token fails and is left for the next run
+        assert failed == ["owner/remote-repo"]
+        assert os.path.exists(os.path.join(out_dir, report_name(first) + ".json"))
+
+        def no_rescan(*args, **kwargs):
+            raise AssertionError("finished target was scanned again")
+
+        monkeypatch.setattr(scan_repo, "scan_path", no_rescan)
+        resumed, failed = scan_batch(targets, out_dir, concurrency=2)
+
+        assert resumed == findings
+        assert failed == ["owner/remote-repo"]
+
+
+def test_report_names_are_unique_per_target():
+    """Targets that only differ in dots or slashes get their own reports."""
+    names = [
+        report_name(target)
+        for target in ("x", "../x", "owner/name", "owner__name", "a/./b/", "a/b")
+    ]
+    assert names[0] == report_name("./x")
+    assert names[4] == names[5]
+    assert len(set(names)) == 5
+    assert names[2].startswith("owner__name-")
@@ -0,0 +1,63 @@
+"""
+test_benchmarks.py - Tests for the benchmark corpus and regression gate.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add repository root to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.corpus import generate_corpus  # noqa: E402
+from benchmarks.run import check_regressions, run_benchmarks  # noqa: E402
+from src.scan_repo import scan_path  # noqa: E402
+
+SMALL_CORPUS = {"files": 12, "file_size": 2048, "token_density": 0.05}
+
+
+def _read_tree(root):
+    tree = {}
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            full_path = os.path.join(dirpath, filename)
+            with open(full_path, "rb") as f:
+                tree[os.path.relpath(full_path, root)] = f.read()
+    return tree
+
+
+def test_corpus_is_deterministic_and_seeded_with_findings():
+    """The same seed yields byte-identical corpora containing fake secrets."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        first = os.path.join(tmpdir, "a")
+        second = os.path.join(tmpdir, "b")
+        files = generate_corpus(first, SMALL_CORPUS)
+        generate_corpus(second, SMALL_CORPUS)
+
+        assert _read_tree(first) == _read_tree(second)
+        assert len(files) == 12 + 2 + 2 + 1
+        assert any(f.endswith("package-lock.json") for f in files)
+        assert len(scan_path(first)) > 0
+
+
+def test_regression_gate_compares_relative_cost():
+    """Results are gated on calibrated cost with the given tolerance."""
+    results = run_benchmarks(SMALL_CORPUS, repeat=1, report_findings=50)
+    assert set(results["benchmarks"]) == {"scan_path", "scan_file", "report_writers"}
+    assert "generic_secret" in results["rules"]
+
+    baseline = {
+        "benchmarks": {
+            name: {"cost": bench["cost"]}
+            for name, bench in results["benchmarks"].items()
+        }
+    }
+    assert check_regressions(results, baseline, tolerance=0.5) == []
+
+    baseline["benchmarks"]["scan_file"]["cost"] /= 2
+    regressions = check_regressions(results, baseline, tolerance=0.5)
+    assert len(regressions) == 1 and regressions[0].startswith("scan_file:")
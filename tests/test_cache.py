@@ -0,0 +1,116 @@
+"""
+test_cache.py - Tests for the on-disk result cache.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import scan_repo  # noqa: E402
+from src.cache import ResultCache, scan_fingerprint  # noqa: E402
+from src.engine import RuleSet  # noqa: E402
+from src.rules import Allowlist, get_rules  # noqa: E402
+
+
+def test_cached_rescan_skips_matching(monkeypatch):
+    """Unchanged files are served from the cache with identical findings."""
+    sample_path = "sample-data/repo-sample"
+
+    if not os.path.exists(sample_path):
+        print(f"Warning: {sample_path} does not exist, skipping test")
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo = os.path.join(tmpdir, "repo")
+        shutil.copytree(sample_path, repo)
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+        fingerprint = scan_fingerprint(RuleSet(get_rules()), allowlist)
+
+        cache = ResultCache(fingerprint, os.path.join(tmpdir, "cache"))
+        first = scan_repo.scan_path(repo, allowlist, cache=cache)
+        cache.close()
+
+        # Same findings on renamed content with the new path applied
+        os.rename(os.path.join(repo, ".npmrc"), os.path.join(repo, "npmrc.txt"))
+        expected = scan_repo.scan_path(repo, allowlist)
+
+        def fail_scan(*args, **kwargs):
+            raise AssertionError("scan_file should not run for cached content")
+
+        monkeypatch.setattr(scan_repo, "scan_file", fail_scan)
+        cache = ResultCache(fingerprint, os.path.join(tmpdir, "cache"))
+        second = scan_repo.scan_path(repo, allowlist, cache=cache)
+        cache.close()
+
+        assert len(first) >= 1
+        assert second == expected
+
+
+def test_cache_evicts_least_recently_used():
+    """evict() trims the cache to max_bytes, oldest entries first."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ResultCache("fp", tmpdir, max_bytes=120)
+        for name in ("old", "mid", "new"):
+            cache.put(name, [[1, "rule", "x" * 30, "snippet"]])
+        cache.get("old")
+
+        assert cache.evict() == 1
+        assert cache.get("mid") is None
+        assert cache.get("old") is not None
+        assert cache.get("new") is not None
+        cache.close()
+
+
+def test_cache_is_private_and_bounds_api_responses():
+    """The cache is owner-only, and API responses count towards its size."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_dir = os.path.join(tmpdir, "cache")
+        cache = ResultCache("fp", cache_dir, max_bytes=120)
+        if os.name == "posix":
+            assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+            assert os.stat(cache.path).st_mode & 0o777 == 0o600
+
+        cache.put_response("https://api.github.com/old", "etag-1", ["x" * 40])
+        cache.put("mid", [[1, "rule", "x" * 30, "snippet"]])
+        cache.put_response("https://api.github.com/new", "etag-2", ["x" * 40])
+
+        assert cache.evict() == 1
+        assert cache.get_response("https://api.github.com/old") is None
+        assert cache.get("mid") is not None
+        assert cache.get_response("https://api.github.com/new") is not None
+        cache.close()
+
+
+def test_cache_keeps_sampled_and_full_scans_apart():
+    """Content cached from a sampled lockfile is rescanned in full elsewhere."""
+    content = 'password = "Zq8vR2mK9xL4pT7wN3bY"\n'
+    with tempfile.TemporaryDirectory() as tmpdir:
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+        fingerprint = scan_fingerprint(RuleSet(get_rules()), allowlist)
+        cache = ResultCache(fingerprint, os.path.join(tmpdir, "cache"))
+
+        findings = {}
+        for name in ("package-lock.json", "config.json"):
+            repo = os.path.join(tmpdir, name.split(".")[0])
+            os.makedirs(repo)
+            with open(os.path.join(repo, name), "w") as f:
+                f.write(content)
+            findings[name] = scan_repo.scan_path(repo, allowlist, cache=cache)
+        cache.close()
+
+        # Sampled findings are tagged; the full scan must not be served them
+        assert {
+            name: [(f["rule_id"], f.get("sampled")) for f in found]
+            for name, found in findings.items()
+        } == {
+            "package-lock.json": [("generic_secret", True)],
+            "config.json": [("generic_secret", None)],
+        }
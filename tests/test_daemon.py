@@ -0,0 +1,154 @@
+"""
+test_daemon.py - Tests for the --serve scan daemon.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.daemon import (  # noqa: E402
+    ScanDaemon,
+    make_server,
+    parse_address,
+    send_request,
+    token_path,
+)
+from src.engine import get_ruleset  # noqa: E402
+from src.rules import Allowlist  # noqa: E402
+from src.scan_repo import scan_file, scan_path  # noqa: E402
+
+GH_TOKEN = "ghp_FAKE_TOKEN_1234567890ABCDEFGHIJKLMNOPQR"
+NPM_LINE = "_authToken=npm_FAKE_AUTHTOKEN_abcdefghij1234567890\n"
+
+
+def _write(root, rel_path, content, mtime=None):
+    path = os.path.join(root, *rel_path.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def _daemon(tmpdir):
+    root = os.path.join(tmpdir, "workspace")
+    _write(root, "config.js", f'token = "{GH_TOKEN}"\n', mtime=1_000_000)
+    _write(root, "src/.npmrc", NPM_LINE, mtime=1_000_000)
+    _write(root, "src/clean.py", "x = 1\n", mtime=1_000_000)
+    allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+    return root, allowlist, ScanDaemon(root, get_ruleset(), allowlist)
+
+
+def test_poll_rescans_only_changed_files():
+    """Polls index the tree like scan_path and rescan only modified files."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root, allowlist, daemon = _daemon(tmpdir)
+
+        assert daemon.poll() == 3
+        assert daemon.findings() == scan_path(root, allowlist, cache=None)
+        assert daemon.poll() == 0
+
+        _write(root, "src/clean.py", f"key = '{GH_TOKEN}'\n", mtime=2_000_000)
+        os.remove(os.path.join(root, "src", ".npmrc"))
+        assert daemon.poll() == 1
+        assert [f["path"] for f in daemon.findings()] == ["config.js", "src/clean.py"]
+
+        # Allowlisting the token invalidates every indexed file
+        _write(tmpdir, "allowlist.txt", GH_TOKEN + "\n")
+        assert daemon.poll() == 2
+        assert daemon.findings() == []
+
+
+def test_requests_match_scan_file():
+    """Path and buffer requests return scan_file's findings; bad input is an error."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root, allowlist, daemon = _daemon(tmpdir)
+        daemon.poll()
+
+        response = daemon.handle({"op": "scan", "paths": ["src/.npmrc"]})
+        assert response == {
+            "ok": True,
+            "findings": scan_file("src/.npmrc", NPM_LINE, get_ruleset(), allowlist),
+        }
+
+        # An unsaved buffer is scanned as given, without touching the index
+        response = daemon.handle(
+            {"op": "scan", "path": "src/clean.py", "content": NPM_LINE}
+        )
+        assert response["findings"] == scan_file(
+            "src/clean.py", NPM_LINE, get_ruleset(), allowlist
+        )
+        assert daemon.handle({"op": "status"})["findings"] == 2
+
+        for request in (
+            {"op": "scan", "paths": ["../allowlist.txt"]},
+            {"op": "scan", "paths": ["missing.js"]},
+            {"op": "scan"},
+            {"op": "nope"},
+            ["not", "an", "object"],
+        ):
+            assert daemon.handle(request)["ok"] is False
+
+
+def test_server_round_trip():
+    """A client gets JSON responses over a loopback socket."""
+    with pytest.raises(ValueError):
+        parse_address("0.0.0.0:8080")
+    assert parse_address("8080") == ("127.0.0.1", 8080)
+    assert parse_address("/tmp/leak-hunter.sock") == "/tmp/leak-hunter.sock"
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _root, _allowlist, daemon = _daemon(tmpdir)
+        daemon.poll()
+        server = make_server(daemon, ("127.0.0.1", 0), token_dir=tmpdir)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            address = server.server_address[:2]
+            with open(token_path(address[1], tmpdir), encoding="utf-8") as f:
+                token = f.read().strip()
+            if os.name == "posix":
+                assert os.stat(token_path(address[1], tmpdir)).st_mode & 0o777 == 0o600
+
+            assert send_request(address, {"op": "ping"}, token=token) == {"ok": True}
+            response = send_request(address, {"op": "findings"}, token=token)
+            assert [f["rule_id"] for f in response["findings"]] == [
+                "gh_token_ghp",
+                "npm_authtoken",
+            ]
+
+            # Other local users can reach the port, but not without the token
+            for wrong in ("", "guess", token[:-1]):
+                response = send_request(address, {"op": "findings"}, token=wrong)
+                assert response == {"ok": False, "error": "invalid or missing token"}
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_unix_socket_is_owner_only():
+    """The Unix socket is created owner-only and needs no token."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _root, _allowlist, daemon = _daemon(tmpdir)
+        address = os.path.join(tmpdir, "leak-hunter.sock")
+        server = make_server(daemon, address)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            assert os.stat(address).st_mode & 0o777 == 0o600
+            assert send_request(address, {"op": "ping"}) == {"ok": True}
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,112 @@
+"""
+test_gitscan.py - Tests for git diff-scoped scanning.
+
+Builds a throwaway repository and checks that --since and --staged scans
+only see changed content, read from git rather than the working tree.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.scan_repo import scan_history, scan_since, scan_staged  # noqa: E402
+
+FAKE_GHP = "ghp_FAKE_TOKEN_1234567890ABCDEFGHIJKLMNOPQR"
+FAKE_NPM = "_authToken=npm_FAKE_AUTHTOKEN_abcdefghij1234567890"
+
+GIT_ENV = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "Test",
+    "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "Test",
+    "GIT_COMMITTER_EMAIL": "test@example.com",
+}
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-C", repo, *args], check=True, env=GIT_ENV, capture_output=True
+    )
+
+
+def _write(repo, name, content):
+    path = os.path.join(repo, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def test_since_and_staged_scopes():
+    """--since sees only changed files; --staged reads the index, not the tree."""
+    with tempfile.TemporaryDirectory() as repo:
+        _git(repo, "init", "-q")
+        _write(repo, "old.sh", f'export GH_TOKEN="{FAKE_GHP}"\n')
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "initial")
+
+        _write(repo, ".github/workflows/publish.yml", f'GH_TOKEN: "{FAKE_GHP}"\n')
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "workflow")
+
+        findings = scan_since(repo, "HEAD~1")
+        assert [(f["path"], f["rule_id"]) for f in findings] == [
+            (".github/workflows/publish.yml", "gh_token_ghp")
+        ]
+
+        _write(repo, ".npmrc", FAKE_NPM + "\n")
+        _git(repo, "add", ".npmrc")
+        # Working tree no longer has the token, the index still does
+        _write(repo, ".npmrc", "registry=https://registry.npmjs.org/\n")
+
+        findings = scan_staged(repo)
+        assert [(f["path"], f["rule_id"], f["line"]) for f in findings] == [
+            (".npmrc", "npm_authtoken", 1)
+        ]
+
+
+def test_history_scans_each_blob_once():
+    """--history attributes each leaked blob to the commit that added it."""
+    with tempfile.TemporaryDirectory() as repo:
+        _git(repo, "init", "-q")
+        _write(repo, "deploy.sh", f'export GH_TOKEN="{FAKE_GHP}"\n')
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "leak")
+        leak_commit = subprocess.run(
+            ["git", "-C", repo, "rev-parse", "HEAD"], capture_output=True, text=True
+        ).stdout.strip()
+
+        # Same content copied elsewhere, then the original removed
+        _write(repo, "copy.sh", f'export GH_TOKEN="{FAKE_GHP}"\n')
+        os.remove(os.path.join(repo, "deploy.sh"))
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "cleanup")
+
+        findings = scan_history(repo)
+
+        assert [(f["path"], f["rule_id"], f["commit"]) for f in findings] == [
+            ("deploy.sh", "gh_token_ghp", leak_commit)
+        ]
+        assert scan_history(repo, jobs=2) == findings
+
+
+def test_history_includes_root_commit_blobs():
+    """Blobs added by the root commit are found even with log.showRoot off."""
+    with tempfile.TemporaryDirectory() as repo:
+        _git(repo, "init", "-q")
+        _git(repo, "config", "log.showRoot", "false")
+        _write(repo, "deploy.sh", f'export GH_TOKEN="{FAKE_GHP}"\n')
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "only commit")
+
+        findings = scan_history(repo)
+        assert [(f["path"], f["rule_id"]) for f in findings] == [
+            ("deploy.sh", "gh_token_ghp")
+        ]
@@ -0,0 +1,131 @@
+"""
+test_packages.py - Tests for --packages registry-mirror sweeps.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import io
+import json
+import os
+import sys
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.packages import (  # noqa: E402
+    PACKAGE_FINDINGS_FILENAME,
+    PACKAGE_INDEX_FILENAME,
+    package_id,
+)
+from src.rules import Allowlist  # noqa: E402
+from src.scan_repo import iter_scan_packages, scan_packages  # noqa: E402
+
+TOKEN_LINE = 'token = "ghp_FAKE_TOKEN_1234567890ABCDEFGHIJKLMNOPQR"\n'
+
+
+def _write_tgz(path, files):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tarfile.open(path, mode="w:gz") as archive:
+        for name, content in files.items():
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def _write_vsix(path, files):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+
+
+def _manifest(**fields):
+    return json.dumps(fields)
+
+
+def _mirror(root):
+    _write_tgz(
+        os.path.join(root, "npm", "left-pad", "-", "left-pad-1.3.0.tgz"),
+        {
+            "package/package.json": _manifest(name="left-pad", version="1.3.0"),
+            "package/index.js": TOKEN_LINE,
+        },
+    )
+    _write_vsix(
+        os.path.join(root, "vsx", "acme", "acme.widget-0.1.0.vsix"),
+        {
+            "extension/package.json": _manifest(
+                name="widget", publisher="acme", version="0.1.0"
+            ),
+            "extension/out/main.js": TOKEN_LINE,
+        },
+    )
+    with open(os.path.join(root, "README.md"), "w", encoding="utf-8") as f:
+        f.write(TOKEN_LINE)
+
+
+def test_package_id_from_manifest_or_file_name():
+    """Manifests name the package; file names are the fallback."""
+    manifest = _manifest(name="@scope/pkg", version="2.0.0").encode("utf-8")
+    assert package_id("npm/pkg-9.9.9.tgz", manifest) == "@scope/pkg@2.0.0"
+    assert package_id("npm/left-pad-1.3.0.tgz") == "left-pad@1.3.0"
+    assert package_id("x/ms-python.python-2024.1.0-beta.vsix") == (
+        "ms-python.python@2024.1.0-beta"
+    )
+    assert package_id("x/no-version.zip", b"not json") == "no-version"
+
+
+def test_sweep_scans_only_new_artifacts():
+    """A second sweep skips indexed artifacts and picks up new versions."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        mirror = os.path.join(tmpdir, "mirror")
+        out_dir = os.path.join(tmpdir, "out")
+        _mirror(mirror)
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+
+        findings = scan_packages(mirror, out_dir, allowlist=allowlist)
+        assert [(f["package"], f["path"]) for f in findings] == [
+            ("left-pad@1.3.0", "npm/left-pad/-/left-pad-1.3.0.tgz!package/index.js"),
+            (
+                "acme.widget@0.1.0",
+                "vsx/acme/acme.widget-0.1.0.vsix!extension/out/main.js",
+            ),
+        ]
+        assert os.path.exists(os.path.join(out_dir, PACKAGE_INDEX_FILENAME))
+
+        assert scan_packages(mirror, out_dir, allowlist=allowlist) == []
+
+        _write_tgz(
+            os.path.join(mirror, "npm", "left-pad", "-", "left-pad-1.3.1.tgz"),
+            {"package/index.js": TOKEN_LINE},
+        )
+        findings = scan_packages(mirror, out_dir, allowlist=allowlist, jobs=2)
+        assert [f["package"] for f in findings] == ["left-pad@1.3.1"]
+
+
+def test_interrupted_sweep_keeps_findings():
+    """Artifacts an interrupted sweep recorded have their findings on disk."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        mirror = os.path.join(tmpdir, "mirror")
+        out_dir = os.path.join(tmpdir, "out")
+        _mirror(mirror)
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+
+        sweep = iter_scan_packages(mirror, out_dir, allowlist=allowlist)
+        first = next(sweep)
+        sweep.close()
+        assert first["package"] == "left-pad@1.3.0"
+
+        # The rerun only scans what the interrupted sweep did not finish
+        findings = scan_packages(mirror, out_dir, allowlist=allowlist)
+        assert [f["package"] for f in findings] == ["acme.widget@0.1.0"]
+
+        with open(os.path.join(out_dir, PACKAGE_FINDINGS_FILENAME)) as f:
+            saved = [json.loads(line) for line in f]
+        assert saved == [first] + findings
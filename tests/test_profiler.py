@@ -0,0 +1,83 @@
+"""
+test_profiler.py - Tests for --profile timing collection.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.engine import RuleSet  # noqa: E402
+from src.profiler import Profiler  # noqa: E402
+from src.rules import Allowlist, get_rules  # noqa: E402
+from src.scan_repo import scan_file, scan_path  # noqa: E402
+
+CONTENT = (
+    "token = ghp_FAKE_TOKEN_1234567890ABCDEFGHIJKLMNOPQR\n"
+    "_authToken=npm_FAKE_AUTHTOKEN_abcdefghij1234567890\n"
+)
+
+
+def test_profiled_scan_matches_unprofiled():
+    """Profiling records per-rule counts without changing the findings."""
+    rules = RuleSet(get_rules())
+    allowlist = Allowlist("/nonexistent/allowlist.txt")
+    profiler = Profiler()
+
+    plain = scan_file("a.txt", CONTENT, rules, allowlist)
+    profiled = scan_file("a.txt", CONTENT, rules, allowlist, profiler)
+
+    assert profiled == plain
+    report = profiler.report()
+    matches = {rule["rule_id"]: rule["matches"] for rule in report["rules"]}
+    assert matches["gh_token_ghp"] >= 1
+    assert sum(matches.values()) >= len(plain)
+
+
+def test_merge_keeps_slowest_files():
+    """Worker snapshots merge into totals and a bounded slowest-file list."""
+    parent = Profiler(top_files=2)
+    worker = Profiler()
+    for i, seconds in enumerate((0.1, 0.3, 0.2)):
+        worker.add_file(f"f{i}", 10, 0.0, seconds)
+    worker.add_rule("gh_token_ghp", 0.5, 2)
+
+    parent.merge(worker.snapshot(reset=True))
+    report = parent.report()
+
+    assert [entry["path"] for entry in report["slowest_files"]] == ["f1", "f2"]
+    assert report["totals"]["files"] == 3
+    assert report["totals"]["bytes"] == 30
+    assert report["rules"][0]["matches"] == 2
+    assert worker.snapshot()["rules"] == {}
+
+
+def test_profile_written_for_path_scan():
+    """A profiled directory scan writes every file and rule to the JSON file."""
+    sample_path = "sample-data/repo-sample"
+
+    if not os.path.exists(sample_path):
+        print(f"Warning: {sample_path} does not exist, skipping test")
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        profiler = Profiler()
+        findings = scan_path(
+            sample_path, Allowlist(os.path.join(tmpdir, "x")), profiler=profiler
+        )
+        output_path = os.path.join(tmpdir, "profile.json")
+        profiler.write(output_path)
+
+        with open(output_path, encoding="utf-8") as f:
+            profile = json.load(f)
+
+    assert profile["totals"]["files"] >= 1
+    assert profile["slowest_files"]
+    assert sum(rule["matches"] for rule in profile["rules"]) >= len(findings)
@@ -0,0 +1,117 @@
+"""
+test_ratelimit.py - Tests for the rate-limit-aware request scheduler.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.ratelimit import RateLimitedSession  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, text=""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+    def close(self):
+        pass
+
+
+class ScriptedSession:
+    """Returns queued responses, then plain 200s, and counts calls."""
+
+    def __init__(self, name, responses=()):
+        self.name = name
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        if self.responses:
+            return self.responses.pop(0)
+        return FakeResponse(headers={"X-RateLimit-Remaining": "4000"})
+
+    def close(self):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_exhausted_token_fails_over_to_next():
+    """A primary rate limit moves requests to another token without waiting."""
+    clock = FakeClock()
+    exhausted = ScriptedSession(
+        "a",
+        [
+            FakeResponse(
+                403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "4600"}
+            )
+        ],
+    )
+    spare = ScriptedSession("b")
+    session = RateLimitedSession([exhausted, spare], clock=clock, sleep=clock.sleep)
+
+    responses = [session.get("https://api.github.com/x") for _ in range(3)]
+
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert (exhausted.calls, spare.calls) == (1, 3)
+    assert clock.sleeps == []
+
+
+def test_retry_after_is_honoured():
+    """A secondary limit with Retry-After waits that long, then retries."""
+    clock = FakeClock()
+    limited = ScriptedSession(
+        "a", [FakeResponse(429, {"Retry-After": "30"}, "secondary rate limit")]
+    )
+    session = RateLimitedSession([limited], clock=clock, sleep=clock.sleep)
+
+    resp = session.get("https://api.github.com/x")
+
+    assert resp.status_code == 200
+    assert limited.calls == 2
+    assert clock.sleeps == [30.0]
+
+
+def test_low_quota_is_paced_until_reset():
+    """With little quota left, requests are spread over the reset window."""
+    clock = FakeClock()
+    headers = {"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": "1100"}
+    paced = ScriptedSession("a", [FakeResponse(headers=headers) for _ in range(3)])
+    session = RateLimitedSession([paced], clock=clock, sleep=clock.sleep)
+
+    for _ in range(3):
+        session.get("https://api.github.com/x")
+
+    # First response reveals the quota; the third waits 100s / 10 requests
+    assert clock.sleeps == [10.0]
+
+
+def test_plain_forbidden_is_not_retried():
+    """A 403 that is not a rate limit is returned immediately."""
+    clock = FakeClock()
+    forbidden = ScriptedSession(
+        "a", [FakeResponse(403, text="Resource not accessible")]
+    )
+    session = RateLimitedSession([forbidden], clock=clock, sleep=clock.sleep)
+
+    assert session.get("https://api.github.com/x").status_code == 403
+    assert forbidden.calls == 1
@@ -0,0 +1,191 @@
+"""
+test_remote.py - Tests for remote (GitHub API) scanning.
+
+Uses a fake session in place of the network, so no requests leave the
+machine and no token is needed.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import base64
+import io
+import os
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+from urllib.parse import unquote
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import remote  # noqa: E402
+from src.cache import ResultCache  # noqa: E402
+from src.scan_repo import scan_batch, scan_remote  # noqa: E402
+
+FAKE_FILES = {
+    ".github/workflows/publish.yml": 'GH_TOKEN: "ghp_FAKE_TOKEN_1234567890ABCDEFGHIJKLMNOPQR"\n',
+    ".npmrc": "_authToken=npm_FAKE_AUTHTOKEN_abcdefghij1234567890\n",
+    "README.md": "Nothing to see here\n",
+    "logo.png": "not fetched",
+}
+
+
+def _fake_tarball():
+    """Build a gzipped tarball of FAKE_FILES under a GitHub-style top dir."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for path, content in FAKE_FILES.items():
+            data = content.encode("utf-8")
+            if path == "logo.png":
+                data = b"\x89PNG\r\n\x1a\n\x00\x00"
+            info = tarfile.TarInfo(f"owner-repo-abc1234/{path}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200, headers=None, raw=None):
+        self._payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.raw = raw
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise remote.requests.exceptions.HTTPError(f"{self.status_code} error")
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Serves a tiny repository from FAKE_FILES and records requested URLs."""
+
+    def __init__(self):
+        self.urls = []
+        self.headers = {}
+
+    def get(self, url, headers=None, **kwargs):
+        self.urls.append(url)
+        etag = f'"etag-{len(url)}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return FakeResponse(None, status_code=304)
+        if url.endswith("/repos/owner/repo"):
+            return FakeResponse({"default_branch": "main"}, headers={"ETag": etag})
+        if "/git/trees/" in url:
+            tree = [
+                {"path": path, "type": "blob", "sha": f"sha-{path}"}
+                for path in FAKE_FILES
+            ]
+            return FakeResponse({"tree": tree}, headers={"ETag": etag})
+        if "/tarball" in url:
+            return FakeResponse(None, raw=io.BytesIO(_fake_tarball()))
+        path = unquote(url.split("/contents/", 1)[1])
+        encoded = base64.b64encode(FAKE_FILES[path].encode("utf-8")).decode("ascii")
+        return FakeResponse({"encoding": "base64", "content": encoded})
+
+    def close(self):
+        pass
+
+
+def test_remote_scan_fetches_text_files_concurrently(monkeypatch):
+    """Remote scans download only text files and report them in tree order."""
+    session = FakeSession()
+    monkeypatch.setattr(remote, "create_session", lambda *args, **kwargs: session)
+
+    findings = scan_remote("owner/repo", "FAKE_token", fetch_concurrency=4)
+
+    assert [(f["path"], f["rule_id"]) for f in findings] == [
+        (".github/workflows/publish.yml", "gh_token_ghp"),
+        (".npmrc", "npm_authtoken"),
+    ]
+    assert not any("logo.png" in url for url in session.urls)
+
+
+def test_remote_rescan_uses_etags_and_blob_cache(monkeypatch):
+    """An unchanged repository is rescanned from the cache with two requests."""
+    session = FakeSession()
+    monkeypatch.setattr(remote, "create_session", lambda *args, **kwargs: session)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ResultCache("fingerprint", tmpdir)
+        first = scan_remote("owner/repo", "FAKE_token", cache=cache)
+        session.urls.clear()
+        second = scan_remote("owner/repo", "FAKE_token", cache=cache)
+        cache.close()
+
+    assert second == first
+    assert len(first) == 2
+    assert session.urls == [
+        "https://api.github.com/repos/owner/repo",
+        "https://api.github.com/repos/owner/repo/git/trees/main?recursive=1",
+    ]
+
+
+def test_remote_tarball_mode_uses_one_request(monkeypatch):
+    """Tarball mode scans the same files from a single archive download."""
+    session = FakeSession()
+    monkeypatch.setattr(remote, "create_session", lambda *args, **kwargs: session)
+
+    findings = scan_remote("owner/repo", "FAKE_token", mode="tarball", ref="v1.0")
+
+    assert [(f["path"], f["rule_id"]) for f in findings] == [
+        (".github/workflows/publish.yml", "gh_token_ghp"),
+        (".npmrc", "npm_authtoken"),
+    ]
+    assert session.urls == ["https://api.github.com/repos/owner/repo/tarball/v1.0"]
+
+
+class BrokenStream(io.RawIOBase):
+    """A response body whose connection resets partway through."""
+
+    def __init__(self, data, fail_at):
+        self._data = io.BytesIO(data)
+        self._fail_at = fail_at
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._data.tell() >= self._fail_at:
+            raise remote.urllib3.exceptions.ProtocolError("Connection reset by peer")
+        chunk = self._data.read(min(len(buffer), self._fail_at - self._data.tell()))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+
+def test_tarball_failure_mid_stream_fails_only_that_target(monkeypatch):
+    """A broken download ends the repo's scan as failed; the sweep goes on."""
+    data = _fake_tarball()
+    session = FakeSession()
+    session_get = session.get
+
+    def get(url, **kwargs):
+        if "/tarball" in url:
+            return FakeResponse(None, raw=BrokenStream(data, len(data) // 2))
+        return session_get(url, **kwargs)
+
+    session.get = get
+    monkeypatch.setattr(remote, "create_session", lambda *args, **kwargs: session)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        local = os.path.join(tmpdir, "local")
+        os.makedirs(local)
+        with open(os.path.join(local, ".npmrc"), "w", encoding="utf-8") as f:
+            f.write(FAKE_FILES[".npmrc"])
+
+        findings, failed = scan_batch(
+            ["owner/repo", local],
+            os.path.join(tmpdir, "out"),
+            "FAKE_token",
+            remote_mode="tarball",
+        )
+
+    assert failed == ["owner/repo"]
+    assert [(f["repo"], f["rule_id"]) for f in findings] == [(local, "npm_authtoken")]
@@ -0,0 +1,137 @@
+"""
+test_report.py - Tests for the streaming report sinks.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import csv
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.report import (  # noqa: E402
+    CsvReportSink,
+    JsonLinesSink,
+    JsonReportSink,
+    ReportSink,
+    ReportSummary,
+    write_findings,
+)
+from src.scan_repo import print_summary  # noqa: E402
+
+FINDINGS = [
+    {
+        "path": "a.sh",
+        "line": 1,
+        "rule_id": "gh_token_ghp",
+        "desc": "GitHub token",
+        "match": "ghp_***REDACTED***OPQR",
+        "score": 95,
+        "snippet": 'TOKEN="ghp_FAKE"',
+    },
+    {
+        "path": "b.yml",
+        "line": 7,
+        "rule_id": "generic_secret",
+        "desc": "Generic secret",
+        "match": "pass***REDACTED***1234",
+        "score": 60,
+        "snippet": "password: ✓ FAKE",
+        "commit": "0123456789abcdef",
+    },
+]
+
+
+def test_sinks_stream_findings_in_one_pass():
+    """Sinks accept a generator and match the whole-list report layouts."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_path = os.path.join(tmpdir, "report.json")
+        csv_path = os.path.join(tmpdir, "report.csv")
+        jsonl_path = os.path.join(tmpdir, "report.jsonl")
+
+        summary = write_findings(
+            (finding for finding in FINDINGS),
+            [
+                JsonReportSink(json_path),
+                CsvReportSink(csv_path),
+                JsonLinesSink(jsonl_path),
+            ],
+        )
+
+        expected = {
+            "scan_summary": {
+                "total_findings": 2,
+                "critical": 1,
+                "high": 0,
+                "medium": 1,
+            },
+            "findings": FINDINGS,
+        }
+        with open(json_path, encoding="utf-8") as f:
+            assert f.read() == json.dumps(expected, indent=2, ensure_ascii=False)
+
+        with open(csv_path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert [row["path"] for row in rows] == ["a.sh", "b.yml"]
+        assert rows[0]["commit"] == "" and rows[1]["commit"] == "0123456789abcdef"
+
+        with open(jsonl_path, encoding="utf-8") as f:
+            assert [json.loads(line) for line in f] == FINDINGS
+
+        assert summary.as_dict() == expected["scan_summary"]
+        assert summary.exit_code() == 2
+
+
+def test_empty_json_report_matches_json_dump():
+    """An empty report is still the document json.dump would produce."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_path = os.path.join(tmpdir, "report.json")
+        write_findings([], [JsonReportSink(json_path)])
+
+        expected = {
+            "scan_summary": {
+                "total_findings": 0,
+                "critical": 0,
+                "high": 0,
+                "medium": 0,
+            },
+            "findings": [],
+        }
+        with open(json_path, encoding="utf-8") as f:
+            assert f.read() == json.dumps(expected, indent=2)
+
+
+def test_print_summary_accepts_findings_list(capsys):
+    """print_summary still takes a plain findings list, as before ReportSummary."""
+    summary = ReportSummary()
+    for finding in FINDINGS:
+        summary.add(finding)
+    print_summary(summary)
+    expected = capsys.readouterr().out
+
+    print_summary(FINDINGS)
+    assert capsys.readouterr().out == expected
+    assert "a.sh:1 [gh_token_ghp]" in expected
+
+    print_summary([])
+    assert capsys.readouterr().out == "✓ No token leaks detected.\n"
+
+
+def test_incomplete_sink_fails_at_construction():
+    """A sink without add() is rejected when created, not at its first finding."""
+
+    class NoAdd(ReportSink):
+        pass
+
+    try:
+        NoAdd()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("sink without add() was constructed")
@@ -0,0 +1,262 @@
+"""
+test_rules.py - Unit tests for rule definitions and allowlist handling.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.engine import RuleSet, get_ruleset  # noqa: E402
+from src.rules import (  # noqa: E402
+    Allowlist,
+    apply_path_boost,
+    get_rules,
+    load_rule_pack,
+)
+from src.walker import matches_file, parse_patterns  # noqa: E402
+from src.scan_repo import scan_file  # noqa: E402
+
+FAKE_TOKEN = "ghp_FAKE_TOKEN_1234567890ABCDEFGHIJKLMNOPQR"
+
+
+def test_allowlist_literal_and_digest_entries():
+    """Allowlist matches literal lines and sha256 digests, ignoring comments."""
+    digest = hashlib.sha256(b"FAKE_digest_only_token").hexdigest()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "allowlist.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# comment\n\n{FAKE_TOKEN}\nsha256:{digest.upper()}\n")
+
+        allowlist = Allowlist(path)
+
+        assert FAKE_TOKEN in allowlist
+        assert "FAKE_digest_only_token" in allowlist
+        assert "# comment" not in allowlist
+        assert len(allowlist) == 2
+
+        findings = scan_file("a.sh", f'TOKEN="{FAKE_TOKEN}"', get_rules(), allowlist)
+        assert findings == []
+
+
+def test_allowlist_reloads_only_on_change():
+    """refresh() is a no-op until the allowlist file changes."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "allowlist.txt")
+        allowlist = Allowlist(path)
+        assert FAKE_TOKEN not in allowlist
+        assert allowlist.refresh() is False
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(FAKE_TOKEN + "\n")
+        os.utime(path, ns=(1, 1))
+
+        assert allowlist.refresh() is True
+        assert FAKE_TOKEN in allowlist
+        assert allowlist.refresh() is False
+
+        os.remove(path)
+        assert allowlist.refresh() is True
+        assert FAKE_TOKEN not in allowlist
+
+
+def _write_pack(tmpdir, rules, name="pack.json"):
+    path = os.path.join(tmpdir, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"rules": rules}, f)
+    return path
+
+
+def test_rule_pack_extends_and_overrides_builtins():
+    """Pack rules are appended, and replace built-ins with the same id."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = _write_pack(
+            tmpdir,
+            [
+                {"id": "gh_token_ghp", "pattern": "ghp_[A-Za-z0-9_]{36,}", "score": 40},
+                {
+                    "id": "acme_key",
+                    "pattern": "acme_[a-z0-9]{16}",
+                    "score": 80,
+                    "keywords": ["acme_"],
+                    "paths": ["config/", "*.env"],
+                },
+            ],
+        )
+        rules = get_rules([path])
+        ids = [rule["id"] for rule in rules]
+
+        assert ids[: len(get_rules())] == [rule["id"] for rule in get_rules()]
+        assert ids[-1] == "acme_key"
+        assert rules[ids.index("gh_token_ghp")]["score"] == 40
+
+        ruleset = get_ruleset([path])
+        assert get_ruleset([path]) is ruleset
+        content = "key = acme_0123456789abcdef\n"
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+        for file_path, expected in (
+            ("config/app.ini", 1),
+            ("prod.env", 1),
+            ("src/app.js", 0),
+        ):
+            findings = scan_file(file_path, content, ruleset, allowlist)
+            assert len(findings) == expected
+        assert ruleset.scope_key("prod.env") != ruleset.scope_key("src/app.js")
+
+
+def test_keywordless_pack_rules_keep_their_flags():
+    """Rules without keywords join the fallback with their global flags scoped."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = _write_pack(
+            tmpdir,
+            [
+                {
+                    "id": "dotall",
+                    "pattern": "(?s)BEGIN.{0,40}END",
+                    "score": 50,
+                    "multiline": True,
+                },
+                {
+                    "id": "verbose",
+                    "pattern": "(?x) SECRET_ [0-9]{4}  # id",
+                    "score": 50,
+                },
+                {
+                    "id": "folded",
+                    "pattern": "token-[a-z]{4}",
+                    "score": 50,
+                    "ignore_case": True,
+                },
+            ],
+        )
+        ruleset = get_ruleset([path])
+        content = "BEGIN\nblock END\nSECRET_1234\nTOKEN-ABCD\n"
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+        for binary in (False, True):
+            buffer = content.encode("ascii") if binary else content
+            findings = scan_file("notes.txt", buffer, ruleset, allowlist)
+            assert [(f["rule_id"], f["line"]) for f in findings] == [
+                ("dotall", 1),
+                ("verbose", 3),
+                ("folded", 4),
+            ]
+
+
+def test_ignore_case_rule_keywords_match_any_case():
+    """Keywords of ignore_case rules prefilter case-insensitively."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = _write_pack(
+            tmpdir,
+            [
+                {
+                    "id": "acme_key",
+                    "pattern": "acme_key\\s*=\\s*[0-9a-f]{16}",
+                    "score": 80,
+                    "keywords": ["Acme_Key"],
+                    "ignore_case": True,
+                }
+            ],
+        )
+        ruleset = get_ruleset([path])
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+        content = "x = 1\nACME_KEY = 0123456789abcdef\n"
+
+        for buffer in (content, content.encode("utf-8")):
+            for sampled in (False, True):
+                findings = scan_file("a.ini", buffer, ruleset, allowlist, None, sampled)
+                assert [(f["rule_id"], f["line"]) for f in findings] == [
+                    ("acme_key", 2)
+                ]
+
+
+def test_path_dispatch_matches_scopes():
+    """Per-path rule subsets and boosts agree with matching every scope."""
+    scopes = [["*.env", "config/"], ["/deploy/*.yml"], ["ci", "!*.md"]]
+    rules = get_rules() + [
+        {
+            "id": f"scoped_{index}",
+            "description": "scoped",
+            "pattern": get_rules()[0]["pattern"],
+            "score": 95,
+            "paths": paths,
+        }
+        for index, paths in enumerate(scopes)
+    ]
+    ruleset = RuleSet(rules)
+    builtin = list(range(len(get_rules())))
+
+    for path in (
+        "prod.env",
+        "src/config/app.ini",
+        "deploy/app.yml",
+        "src/deploy/app.yml",
+        "ci/notes.md",
+        ".github/workflows/ci",
+        "README.md",
+    ):
+        expected = builtin + [
+            len(builtin) + index
+            for index, paths in enumerate(scopes)
+            if matches_file(parse_patterns(paths), path)
+        ]
+        path_rules = ruleset.for_path(path)
+        assert list(path_rules.indices) == expected, path
+        assert path_rules.boost + 50 == apply_path_boost(50, path)
+        assert min(95 + path_rules.boost, 100) == apply_path_boost(95, path)
+
+    # Files matching the same scopes share one dispatch table entry
+    unscoped = ruleset.for_path("a/b/readme.txt").indices
+    assert unscoped == tuple(builtin)
+    assert ruleset.for_path("c/notes.txt").indices is unscoped
+
+
+def test_rule_patterns_compile_lazily():
+    """Patterns compile only when a file contains their keywords."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = _write_pack(
+            tmpdir,
+            [
+                {
+                    "id": "lazy",
+                    "pattern": "lazy_[0-9]{8}",
+                    "score": 50,
+                    "keywords": ["lazy_"],
+                }
+            ],
+        )
+        rule = load_rule_pack(path)[0]
+        ruleset = get_ruleset([path])
+
+        scan_file("a.txt", "nothing here\n", ruleset, Allowlist(path + ".none"))
+        assert rule["pattern"]._compiled is None
+
+        scan_file("a.txt", "lazy_12345678\n", ruleset, Allowlist(path + ".none"))
+        assert rule["pattern"]._compiled is not None
+
+
+def test_rule_pack_validation():
+    """Malformed packs are rejected with the file and rule in the message."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for rules, message in (
+            ([{"id": "x", "pattern": "x"}], "score"),
+            ([{"id": "x", "pattern": "x", "score": 50, "keyword": ["x"]}], "unknown"),
+            ([{"pattern": "x", "score": 50}], "'id'"),
+            ([{"id": "x", "pattern": "abc(", "score": 50}], "invalid pattern"),
+        ):
+            path = _write_pack(tmpdir, rules, f"pack-{message.strip(chr(39))}.json")
+            try:
+                load_rule_pack(path)
+            except ValueError as e:
+                assert f"{path}: rule 1" in str(e)
+                assert message in str(e)
+            else:
+                raise AssertionError(f"pack with bad {message} was accepted")
@@ -17,6 +17,7 @@ from pathlib import Path
 # Add src to path (must be before local imports)
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.rules import Allowlist  # noqa: E402
 from src.scan_repo import scan_path, determine_exit_code  # noqa: E402
 from src.utils import redact_token  # noqa: E402
 
@@ -77,6 +78,49 @@ def test_scan_sample_repo():
             ), "Long tokens should be redacted"
 
 
+def test_parallel_scan_matches_serial():
+    """Test that --jobs scanning returns the serial findings in the same order."""
+    sample_path = "sample-data/repo-sample"
+
+    if not os.path.exists(sample_path):
+        print(f"Warning: {sample_path} does not exist, skipping test")
+        return
+
+    assert scan_path(sample_path, jobs=2) == scan_path(sample_path)
+
+
+def test_generic_rules_survive_sampling():
+    """Generic secrets are found in one-line configs and minified bundles."""
+    config = (
+        '{"name":"service","password": "Pr0dDbPassw0rd12345",'
+        + '"feature":"enabled",' * 80
+        + '"api_key": "abcdefghijklmnopqrstuvwxyz123456"}'
+    )
+    bundle = (
+        'var c={apiKey:"abcdefghijklmnopqrstuvwxyz123456"};'
+        + "function f(a){return a+1};" * 4000
+        + 'var d={password:"Pr0dDbPassw0rd12345"};'
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo = os.path.join(tmpdir, "repo")
+        os.makedirs(repo)
+        for name, content in (("config.json", config), ("app.min.js", bundle)):
+            with open(os.path.join(repo, name), "w", encoding="utf-8") as f:
+                f.write(content)
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+
+        found = sorted(
+            (f["path"], f["rule_id"], f.get("sampled", False))
+            for f in scan_path(repo, allowlist)
+        )
+    assert found == [
+        ("app.min.js", "generic_api_key", True),
+        ("app.min.js", "generic_secret", True),
+        ("config.json", "generic_api_key", False),
+        ("config.json", "generic_secret", False),
+    ]
+
+
 def test_exit_code_logic():
     """Test exit code determination."""
     # No findings
@@ -0,0 +1,101 @@
+"""
+test_startup.py - Tests for CLI cold start in local and hook modes.
+
+Each check runs a fresh interpreter, since the test process itself has
+already imported the remote modules.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = str(Path(__file__).parent.parent)
+
+# Modules only remote, batch or --jobs scans may load
+REMOTE_ONLY_MODULES = [
+    "requests",
+    "urllib3",
+    "charset_normalizer",
+    "idna",
+    "src.remote",
+    "src.ratelimit",
+    "concurrent.futures.process",
+]
+
+# Cumulative import time of src.scan_repo, in microseconds; generous so a
+# cold bytecode cache or a loaded CI runner does not fail the suite
+IMPORT_BUDGET_US = 100_000
+
+LOADED_AFTER_SCAN = """
+import json, sys
+from src import scan_repo
+out_dir = sys.argv[2]
+sys.argv = ["scan_repo", "--path", sys.argv[1], "--no-cache"]
+sys.argv += ["--out", out_dir + "/report.json", "--csv", out_dir + "/report.csv"]
+try:
+    scan_repo.main()
+except SystemExit:
+    pass
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def _python(*args):
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_local_scan_does_not_import_remote_modules():
+    """A --path scan runs without loading requests or the process pool."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo = os.path.join(tmpdir, "repo")
+        os.makedirs(repo)
+        with open(os.path.join(repo, "config.js"), "w", encoding="utf-8") as f:
+            f.write("token = ghp_FAKE_TOKEN_1234567890ABCDEFGHIJKLMNOPQR\n")
+
+        result = _python("-c", LOADED_AFTER_SCAN, repo, tmpdir)
+        loaded = set(json.loads(result.stdout.splitlines()[-1]))
+
+        with open(os.path.join(tmpdir, "report.json"), encoding="utf-8") as f:
+            assert len(json.load(f)["findings"]) == 1
+    assert "src.scan_repo" in loaded
+    assert [name for name in REMOTE_ONLY_MODULES if name in loaded] == []
+
+
+def test_moved_remote_names_load_lazily():
+    """src.utils still exposes fetch_repo_files, importing src.remote on use."""
+    code = (
+        "import sys\n"
+        "import src.utils\n"
+        "assert 'requests' not in sys.modules\n"
+        "from src.utils import fetch_repo_files\n"
+        "from src.remote import fetch_repo_files as moved\n"
+        "assert fetch_repo_files is moved and 'requests' in sys.modules\n"
+    )
+    _python("-c", code)
+
+
+def test_import_time_within_budget():
+    """Importing the CLI module stays within the cold-start budget."""
+    timings = []
+    for _ in range(3):
+        result = _python("-X", "importtime", "-c", "import src.scan_repo")
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            fields = [field.strip() for field in line.split("|")]
+            if len(fields) == 3 and fields[2] == "src.scan_repo":
+                timings.append(int(fields[1]))
+
+    assert len(timings) == 3
+    assert min(timings) < IMPORT_BUDGET_US, f"import took {min(timings)} us"
@@ -0,0 +1,109 @@
+"""
+test_walker.py - Tests for the local directory walker.
+
+Copyright (c) 2025 Rick Deacon / Knostic Labs
+Licensed under the MIT License
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path (must be before local imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.rules import Allowlist  # noqa: E402
+from src.scan_repo import scan_path  # noqa: E402
+from src.walker import FileWalker, IgnorePattern  # noqa: E402
+
+TOKEN_LINE = "token = ghp_FAKE_TOKEN_1234567890ABCDEFGHIJKLMNOPQR\n"
+
+
+def _write(root, rel_path, content=TOKEN_LINE):
+    path = os.path.join(root, *rel_path.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def _listed(root, **kwargs):
+    return [rel_path for _full, rel_path, _size in FileWalker(**kwargs).walk(root)]
+
+
+def test_ignore_pattern_semantics():
+    """Patterns follow .gitignore anchoring, directory and '**' rules."""
+    assert IgnorePattern("*.log").matches("a/b/debug.log", False)
+    assert not IgnorePattern("/out").matches("src/out", True)
+    assert IgnorePattern("/out").matches("out", True)
+    assert not IgnorePattern("cache/").matches("cache", False)
+    assert IgnorePattern("cache/").matches("cache", True)
+    assert IgnorePattern("docs/**/*.md").matches("docs/a/b/x.md", False)
+    assert IgnorePattern("**/fixtures").matches("tests/unit/fixtures", True)
+    assert IgnorePattern("gen/**").matches("gen/a/b.js", False)
+
+
+def test_walk_honours_gitignore_and_filters():
+    """Nested .gitignore files, negation, exclude, include and size apply."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write(tmpdir, ".gitignore", "*.log\n!keep.log\ncoverage/\n")
+        _write(tmpdir, "app.log")
+        _write(tmpdir, "keep.log")
+        _write(tmpdir, "coverage/lcov.txt")
+        _write(tmpdir, "src/.gitignore", "/generated.js\n")
+        _write(tmpdir, "src/generated.js")
+        _write(tmpdir, "src/main.js")
+        _write(tmpdir, "src/lib/generated.js")
+        _write(tmpdir, "src/big.txt", "x" * 2048)
+        _write(tmpdir, "logo.png", "not really a png")
+
+        assert _listed(tmpdir) == [
+            ".gitignore",
+            "keep.log",
+            "src/.gitignore",
+            "src/big.txt",
+            "src/main.js",
+            "src/lib/generated.js",
+        ]
+        assert _listed(tmpdir, exclude=["lib/", "keep.log"], max_file_size=1024) == [
+            ".gitignore",
+            "src/.gitignore",
+            "src/main.js",
+        ]
+        assert _listed(tmpdir, include=["*.js"]) == [
+            "src/main.js",
+            "src/lib/generated.js",
+        ]
+        assert "app.log" in _listed(tmpdir, use_gitignore=False)
+
+
+def test_scan_path_uses_walker():
+    """scan_path skips pruned files and binaries, but not high-risk secrets."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo = os.path.join(tmpdir, "repo")
+        _write(repo, ".gitignore", "secrets.env\n.env.local\n.npmrc\n*.pem\n*.log\n")
+        _write(repo, "secrets.env")
+        _write(repo, "app/.env.local")
+        _write(repo, "app/.npmrc")
+        _write(repo, "certs/server.pem")
+        _write(repo, "debug.log")
+        _write(repo, "config.js")
+        _write(repo, "blob.dat", "\x00" + TOKEN_LINE)
+        allowlist = Allowlist(os.path.join(tmpdir, "allowlist.txt"))
+
+        high_risk = {
+            "secrets.env",
+            "app/.env.local",
+            "app/.npmrc",
+            "certs/server.pem",
+        }
+        paths = {f["path"] for f in scan_path(repo, allowlist)}
+        assert paths == {"config.js"} | high_risk
+
+        walker = FileWalker(exclude=["certs/"])
+        paths = {f["path"] for f in scan_path(repo, allowlist, walker=walker)}
+        assert paths == {"config.js"} | high_risk - {"certs/server.pem"}
+
+        walker = FileWalker(use_gitignore=False)
+        paths = {f["path"] for f in scan_path(repo, allowlist, walker=walker)}
+        assert paths == {"config.js", "debug.log"} | high_risk